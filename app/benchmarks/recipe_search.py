@@ -0,0 +1,158 @@
+"""Benchmark of the keyword search of the recipes. Compares the indexes of the store
+(`tools.recipe_store.RecipeStore.keyword_rows`) with the scan of the columns with pandas
+(the former `RecipeDB.filter_keyword`) and reports the recipes that only one of them finds.
+
+The former search matched the whole keyword as one regular expression, the indexes match every word of the keyword
+as plain text (e.g. "tomato sauce" also finds "sauce with tomato" and "t.bone" does not find "t-bone").
+
+Run it in the app directory::
+
+    python -m benchmarks.recipe_search
+    python -m benchmarks.recipe_search --synthetic 100000 --keyword nudel
+"""
+import argparse
+import json
+import random
+import re
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+from typing import List
+from typing import Union
+
+import numpy
+import pandas
+
+from tools import recipe_store
+
+KEYWORDS = ["nudel", "Rice", "chicken", "käse", "ei", "t-bone", "tomato sauce", "zz", "t.bone", "(sauce"]
+"""Keywords of the benchmark: parts of words, whole words, short parts, other characters, multiple words and
+characters with a meaning in a regular expression"""
+
+SYLLABLES = ["nu", "del", "rice", "chick", "en", "kä", "se", "to", "ma", "sauce", "t-", "bone", "ei", "er", "ba"]
+
+
+def scan_rows(frame: pandas.DataFrame, keyword: str) -> Union[numpy.ndarray, None]:
+    """Find the recipes like the former `RecipeDB.filter_keyword`: the keyword as one case insensitive regular
+    expression with `str.contains` on every searched column
+
+    Args:
+        frame (pandas.DataFrame): The searched columns
+        keyword (str): The keyword
+
+    Returns:
+        Union[numpy.ndarray, None]: Sorted rows. None if the keyword is no valid regular expression
+            (the former search raised an error)
+    """
+    found = pandas.Series(False, index=frame.index)
+    try:
+        for column in recipe_store.SEARCH_COLUMNS:
+            found |= frame[column].str.contains(pat=keyword, case=False, na=False, regex=True)
+    except re.error:
+        return None
+    return numpy.flatnonzero(found.to_numpy())
+
+
+def measure(func: Callable[[], numpy.ndarray], repeat: int) -> float:
+    """Run the function repeat times
+
+    Args:
+        func (Callable[[], numpy.ndarray]): The search
+        repeat (int): Number of runs
+
+    Returns:
+        float: Median of the runs in milliseconds
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def synthetic_recipes(path: Path, count: int, seed: int = 42) -> None:
+    """Write count random recipes as JSON lines
+
+    Args:
+        path (Path): The JSON file
+        count (int): Number of recipes
+        seed (int, optional): Seed of the random words. Defaults to 42
+    """
+    rng = random.Random(seed)
+    words = ["".join(rng.choices(SYLLABLES, k=rng.randint(1, 4))) for _ in range(5000)]
+    with open(path, mode="w", encoding="utf-8") as file:
+        for row in range(count):
+            recipe = {
+                "_id": {"$oid": f"{row:024x}"},
+                "name": " ".join(rng.choices(words, k=4)).title(),
+                "description": " ".join(rng.choices(words, k=30)),
+                "recipeInstructions": " ".join(rng.choices(words, k=80)),
+            }
+            file.write(json.dumps(recipe) + "\n")
+
+
+def differences(expected: Union[numpy.ndarray, None], rows: numpy.ndarray) -> str:
+    """Describe the recipes that only the scan or only the index found
+
+    Args:
+        expected (Union[numpy.ndarray, None]): Rows of the scan. None if the scan failed
+        rows (numpy.ndarray): Rows of the index
+
+    Returns:
+        str: "none" or the number and the first rows of both sides
+    """
+    if expected is None:
+        return "invalid regular expression for the scan"
+    only_scan = numpy.setdiff1d(expected, rows)
+    only_index = numpy.setdiff1d(rows, expected)
+    if len(only_scan) == 0 and len(only_index) == 0:
+        return "none"
+    return (
+        f"only scan: {len(only_scan)} {only_scan[:5].tolist()}, only index: {len(only_index)} {only_index[:5].tolist()}"
+    )
+
+
+def run(store: recipe_store.RecipeStore, keywords: List[str], repeat: int) -> None:
+    """Print the time of both searches for every keyword
+
+    Args:
+        store (tools.recipe_store.RecipeStore): The recipes
+        keywords (List[str]): Keywords to search
+        repeat (int): Runs per keyword and search
+    """
+    frame = pandas.DataFrame(
+        {column: store.texts(column).to_numpy(missing=numpy.nan) for column in recipe_store.SEARCH_COLUMNS}
+    )
+    print(f"{store.size} recipes, median of {repeat} runs")
+    print(f"{'keyword':<16}{'scan':>8}{'index':>8}{'scan ms':>12}{'index ms':>12}{'speedup':>10}  differences")
+    for keyword in keywords:
+        expected = scan_rows(frame, keyword)
+        rows = store.keyword_rows(keyword)
+        scan = measure(lambda: scan_rows(frame, keyword), repeat)
+        index = measure(lambda: store.keyword_rows(keyword), repeat)
+        found = "error" if expected is None else len(expected)
+        print(
+            f"{keyword:<16}{found:>8}{len(rows):>8}{scan:>12.2f}{index:>12.3f}{scan / index:>10.0f}  "
+            f"{differences(expected, rows)}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark of the keyword search of the recipes")
+    parser.add_argument("json_path", nargs="?", type=Path, default=Path("data/recipeitems.json"))
+    parser.add_argument("--synthetic", type=int, default=0, help="Use this number of random recipes instead")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per keyword")
+    parser.add_argument("--keyword", action="append", dest="keywords", help="Keyword to search. Defaults to KEYWORDS")
+    args = parser.parse_args()
+    keywords = args.keywords or KEYWORDS
+
+    if args.synthetic:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_path = Path(tmp_dir) / "recipeitems.json"
+            synthetic_recipes(json_path, args.synthetic)
+            run(recipe_store.open_store(json_path), keywords, args.repeat)
+    else:
+        run(recipe_store.open_store(args.json_path), keywords, args.repeat)
@@ -5,5 +5,6 @@ from db.models.bewertung import BewertungRecipe
 from db.models.bewertung import BewertungRestaurant
 from db.models.cuisine import Cuisine
 from db.models.filter import FilterRest
+from db.models.geocode import Geocode
 from db.models.person import Person
 from db.models.restaurant import Restaurant
@@ -1,4 +1,6 @@
 """All DB functions for the Filter table"""
+import hashlib
+import json
 from typing import Iterable
 from typing import List
 from typing import Union
@@ -47,6 +49,7 @@ def create_filterRest(
         radius=filter_new.radius,
         rating=filter_new.rating,
         costs=filter_new.costs,
+        content_hash=filter_content_hash(filter_new),
         cuisines=__cuisine_scheme_to_model__(db, filter_new.cuisines),
         allergies=__allergies_scheme_to_model__(db, filter_new.allergies),
     )
@@ -88,6 +91,7 @@ def update_filterRest(
     db_person.filterRest.radius = str(updated_filter.radius)
     db_person.filterRest.rating = str(updated_filter.rating)
     db_person.filterRest.costs = updated_filter.costs
+    db_person.filterRest.content_hash = filter_content_hash(updated_filter)
     db_person.filterRest.cuisines = __cuisine_scheme_to_model__(db, updated_filter.cuisines)
     db_person.filterRest.allergies = __allergies_scheme_to_model__(db, updated_filter.allergies)
 
@@ -112,6 +116,39 @@ def get_filter_from_user(db: Session, user: scheme_user.UserBase) -> Union[Filte
     return db.query(FilterRest).filter(FilterRest.email == user.email).first()
 
 
+def get_filter_hash(db: Session, user: scheme_user.UserBase) -> Union[str, None]:
+    """Get the content hash of the saved Filter without loading the Filter
+
+    Args:
+        db (Session): Session to the DB
+        user (scheme_user.UserBase): Owner of the Filter
+
+    Returns:
+        Union[str, None]: The hash or None if there is no Filter (or it was saved without a hash)
+    """
+    return db.query(FilterRest.content_hash).filter(FilterRest.email == user.email).scalar()
+
+
+def filter_content_hash(filter_rest: scheme_filter.FilterRestDatabase) -> str:
+    """Hash all values of the Filter. The order of the cuisines and allergies does not matter
+
+    Args:
+        filter_rest (scheme_filter.FilterRestDatabase): The Filter to hash
+
+    Returns:
+        str: Hex digest of the sha256 hash
+    """
+    content = {
+        "manuell_location": str(filter_rest.manuell_location),
+        "radius": int(filter_rest.radius),
+        "rating": int(filter_rest.rating),
+        "costs": int(filter_rest.costs),
+        "cuisines": sorted(cuisine.name for cuisine in filter_rest.cuisines or []),
+        "allergies": sorted(allergie.name for allergie in filter_rest.allergies or []),
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()
+
+
 def __allergies_scheme_to_model__(
     db: Session, allergies: List[scheme_allergie.PydanticAllergies]
 ) -> Union[List[scheme_allergie.PydanticAllergies], scheme_allergie.PydanticAllergies, None]:
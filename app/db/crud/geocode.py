@@ -0,0 +1,65 @@
+"""All DB functions for the Geocode table"""
+import datetime
+from typing import Union
+
+from sqlalchemy import and_
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from db.base import Geocode
+from schemes import scheme_rest
+from tools.my_logging import logger
+
+
+def get_geocode(
+    db: Session, address: str, max_age: datetime.timedelta, max_age_not_found: datetime.timedelta
+) -> Union[Geocode, None]:
+    """Return the saved geocode of the address if it is not too old
+
+    Args:
+        db (Session): Session to the DB
+        address (str): The normalized address
+        max_age (datetime.timedelta): Maximum age of a found location
+        max_age_not_found (datetime.timedelta): Maximum age of an entry without a location
+
+    Returns:
+        Union[Geocode, None]: The saved geocode or None
+    """
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return (
+        db.query(Geocode)
+        .filter(Geocode.address == address)
+        .filter(
+            or_(
+                and_(Geocode.lat.isnot(None), Geocode.fetched_at >= now - max_age),
+                and_(Geocode.lat.is_(None), Geocode.fetched_at >= now - max_age_not_found),
+            )
+        )
+        .first()
+    )
+
+
+def save_geocode(db: Session, address: str, location: Union[scheme_rest.LocationBase, None]) -> Geocode:
+    """Add or replace the geocode of the address
+
+    Args:
+        db (Session): Session to the DB
+        address (str): The normalized address
+        location (Union[scheme_rest.LocationBase, None]): The found location or None if google found nothing
+
+    Returns:
+        Geocode: The saved geocode
+    """
+    db_geocode = db.merge(
+        Geocode(
+            address=address,
+            lat=location.lat if location else None,
+            lng=location.lng if location else None,
+            fetched_at=datetime.datetime.now(datetime.timezone.utc),
+        )
+    )
+    db.commit()
+
+    logger.info("Saved geocode to db... address:%s", address)
+
+    return db_geocode
@@ -1,8 +1,13 @@
 """All DB functions for the Bewertung table"""
+from typing import Callable
+from typing import Dict
+from typing import Iterable
 from typing import List
 from typing import Union
 
 import sqlalchemy
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import Session
 
 from db.base import BewertungRestaurant
@@ -42,6 +47,30 @@ def get_bewertung_from_user_to_rest(
     )
 
 
+def get_ratings_from_user_to_rests(
+    db: Session, user: scheme_user.UserBase, place_ids: Iterable[str] = None
+) -> Dict[str, float]:
+    """Return the ratings of one user to many restaurants with one query
+
+    Args:
+        db (Session): Session to the DB
+        user (scheme_user.UserBase): Specifie the User
+        place_ids (Iterable[str], optional): The place_ids of the restaurants. Defaults to None (all restaurants)
+
+    Returns:
+        Dict[str, float]: place_id -> rating. Restaurants without an assessment are missing
+    """
+    query = db.query(BewertungRestaurant.place_id, BewertungRestaurant.rating).filter(
+        BewertungRestaurant.person_email == user.email
+    )
+    if place_ids is not None:
+        place_ids = set(place_ids)
+        if not place_ids:
+            return {}
+        query = query.filter(BewertungRestaurant.place_id.in_(place_ids))
+    return dict(query.all())
+
+
 def get_all_user_bewertungen(db: Session, user: scheme_user.UserBase) -> Union[List[BewertungRestaurant], None]:
     """Return all bewertugen from one User
 
@@ -87,6 +116,7 @@ def create_bewertung(db: Session, assessment: scheme_rest.RestBewertungCreate) -
     )
     try:
         db.add(db_assessment)
+        __touch_ratings__(db, assessment.person.email)
         db.commit()
         db.refresh(db_assessment)
         logger.info(
@@ -101,6 +131,47 @@ def create_bewertung(db: Session, assessment: scheme_rest.RestBewertungCreate) -
         raise DuplicateEntry("Assessment already exist") from error
 
 
+def create_placeholder_bewertung(db: Session, user: scheme_user.UserBase, rest: scheme_rest.RestaurantBase) -> bool:
+    """Add the Restaurant and a Bewertung with rating 0 of the user if they do not exist yet.
+    Both rows are written in one transaction with INSERT ... ON CONFLICT DO NOTHING,
+    so concurrent calls for the same user and restaurant do not fail
+
+    Args:
+        db (Session): Session to the DB
+        user (scheme_user.UserBase): The owner of the Bewertung
+        rest (scheme_rest.RestaurantBase): The Restaurant
+
+    Raises:
+        UserNotFound: If the user does not exist
+
+    Returns:
+        bool: True if the Bewertung got created, False if it already existed
+    """
+    insert = __insert__(db)
+    try:
+        db.execute(
+            insert(Restaurant)
+            .values(place_id=rest.place_id, name=rest.name)
+            .on_conflict_do_nothing(index_elements=[Restaurant.place_id])
+        )
+        result = db.execute(
+            insert(BewertungRestaurant)
+            .values(person_email=user.email, place_id=rest.place_id, kommentar="", rating=0)
+            .on_conflict_do_nothing(index_elements=[BewertungRestaurant.person_email, BewertungRestaurant.place_id])
+        )
+        created = result.rowcount > 0
+        if created:
+            __touch_ratings__(db, user.email)
+        db.commit()
+    except sqlalchemy.exc.IntegrityError as error:
+        db.rollback()
+        raise UserNotFound(f"User {user.email} does not exist", user.email) from error
+
+    if created:
+        logger.info("Added placeholder assessment to db... place_id:%s\temail:%s", rest.place_id, user.email)
+    return created
+
+
 def update_bewertung(
     db: Session, old_bewertung: scheme_rest.RestBewertungCreate, new_bewertung: scheme_rest.RestBewertungCreate
 ) -> BewertungRestaurant:
@@ -126,6 +197,7 @@ def update_bewertung(
     if rows == 0:
         raise DatabaseException("Can not update assessment. Does the User and the Restaurant exist?")
 
+    __touch_ratings__(db, old_bewertung.person.email)
     db.commit()
     logger.info("Updated bewertung %s - %s", old_bewertung.person.email, old_bewertung.restaurant.place_id)
     return get_bewertung_from_user_to_rest(db, new_bewertung.person, new_bewertung.restaurant)
@@ -147,6 +219,22 @@ def delete_bewertung(db: Session, user: scheme_user.UserBase, rest: scheme_rest.
         .filter(BewertungRestaurant.person_email == user.email, BewertungRestaurant.place_id == rest.place_id)
         .delete()
     )
+    if rows > 0:
+        __touch_ratings__(db, user.email)
     db.commit()
     logger.info("Deleted bewertung %s - %s", user.email, rest.place_id)
     return rows
+
+
+def __touch_ratings__(db: Session, email: str) -> None:
+    # Signal the change of the ratings to the caches of all workers. Committed together with the assessment
+    db.query(Person).filter(Person.email == email).update(
+        {Person.ratings_version: Person.ratings_version + 1}, synchronize_session=False
+    )
+
+
+def __insert__(db: Session) -> Callable:
+    # The generic insert has no ON CONFLICT. Use the one of the dialect (sqlite or postgresql)
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
@@ -1,5 +1,7 @@
 """All DB functions for the Restaurant table"""
+import datetime
 from typing import List
+from typing import Union
 
 import sqlalchemy
 from sqlalchemy.orm import Session
@@ -23,6 +25,54 @@ def get_restaurant_by_id(db: Session, place_id: str) -> Restaurant:
     return db.query(Restaurant).filter(Restaurant.place_id == place_id).first()
 
 
+def get_restaurant_details(db: Session, place_id: str, max_age: datetime.timedelta) -> Union[Restaurant, None]:
+    """Return the Restaurant only if the saved details are younger than max_age
+
+    Args:
+        db (Session): Session to the DB
+        place_id (str): ID of the Restaurant to search
+        max_age (datetime.timedelta): Maximum age of the details
+
+    Returns:
+        Union[Restaurant, None]: The found restaurant or None if not found or the details are too old
+    """
+    oldest = datetime.datetime.now(datetime.timezone.utc) - max_age
+    return (
+        db.query(Restaurant)
+        .filter(Restaurant.place_id == place_id)
+        .filter(Restaurant.details_fetched_at >= oldest)
+        .first()
+    )
+
+
+def update_restaurant_details(db: Session, rest: scheme_rest.Restaurant) -> Restaurant:
+    """Save the details of the Restaurant and set the fetch time to now. Create the Restaurant if it does not exist
+
+    Args:
+        db (Session): Session to the DB
+        rest (scheme_rest.Restaurant): The Restaurant with the details from google
+
+    Returns:
+        Restaurant: The updated restaurant
+    """
+    db_rest = get_restaurant_by_id(db, rest.place_id)
+    if db_rest is None:
+        db_rest = Restaurant(place_id=rest.place_id, name=rest.name)
+        db.add(db_rest)
+
+    db_rest.homepage = rest.homepage
+    db_rest.maps_url = rest.maps_url
+    db_rest.phone_number = rest.phone_number
+    db_rest.address = rest.geometry.location.adr
+    db_rest.details_fetched_at = datetime.datetime.now(datetime.timezone.utc)
+    db.commit()
+    db.refresh(db_rest)
+
+    logger.info("Updated Restaurant details... place_id:%s", db_rest.place_id)
+
+    return db_rest
+
+
 def get_all_restaurants(db: Session, skip: int = 0, limit: int = 100) -> List[Restaurant]:
     """Return all Restaurants in the DB
 
@@ -51,6 +51,19 @@ def get_user_by_mail(db: Session, email: str) -> Union[Person, None]:
     return db.query(Person).filter(Person.email == email).first()
 
 
+def get_ratings_version(db: Session, email: str) -> Union[int, None]:
+    """Get the version of the restaurant ratings of the person. It changes with every change of the ratings
+
+    Args:
+        db (Session): Session to the DB
+        email (str): eMail to filter
+
+    Returns:
+        int | None: The version or None if the person does not exist
+    """
+    return db.query(Person.ratings_version).filter(Person.email == email).scalar()
+
+
 def update_user(db: Session, current_user: scheme_user.UserBase, new_user: scheme_user.UserCreate) -> Person:
     """Update the User in the Database. You can change the Mail or Password
 
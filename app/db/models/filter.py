@@ -34,6 +34,7 @@ class FilterRest(Base):
         radius (int): Radius of the search
         rating (int): Minimum rating of the google rating
         costs (int): Maximal costs of the google search
+        content_hash (str): Hash of all values of the filter to detect unchanged updates
 
         person (db.models.person.Person): Owner of the filter
         allergies (db.models.allergie.Allergie): Allergies of the Filter
@@ -47,6 +48,7 @@ class FilterRest(Base):
     radius = Column(Integer, nullable=False)
     rating = Column(Integer, nullable=False)
     costs = Column(Integer, nullable=False)
+    content_hash = Column(String(64), nullable=True)
 
     person = relationship("Person", back_populates="filterRest", passive_deletes=True)
     allergies = relationship("Allergie", secondary=association_table_filter_allergie, passive_deletes=True)
@@ -0,0 +1,25 @@
+"""Geocode structure for the DB"""
+from sqlalchemy import Column
+from sqlalchemy import DateTime
+from sqlalchemy import String
+
+from db.base import Base
+
+
+class Geocode(Base):
+    """
+    Model for SQLAlchemy for the geocode Table in the DB. Cache for the results of the Geocoding API
+
+    Attributes:
+        address (str): Primary Key. The normalized address that got searched
+        lat (str): Latitude. None if google found no result
+        lng (str): Longitude. None if google found no result
+        fetched_at (sqlalchemy.DateTime): Time of the google request
+    """
+
+    __tablename__ = "geocode"
+
+    address = Column(String, primary_key=True)
+    lat = Column(String, nullable=True)
+    lng = Column(String, nullable=True)
+    fetched_at = Column(DateTime(timezone=True), nullable=False)
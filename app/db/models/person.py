@@ -1,6 +1,7 @@
 """Person structure for the DB"""
 from sqlalchemy import Column
 from sqlalchemy import DateTime
+from sqlalchemy import Integer
 from sqlalchemy import String
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -16,6 +17,7 @@ class Person(Base):
         email (str): Primary Key
         hashed_password (str): Hashed Password of the user
         last_login (sqlalchemy.DateTime): Autamtic set on update
+        ratings_version (int): Increased with every change of the restaurant ratings. Used to invalidate the caches
         bewertungen (db.models.bewertung.BewertungRestaurant): Bewertungen of the Person
         filterRest (db.models.filter.Filter): Saved Filter of the Person
 
@@ -26,6 +28,7 @@ class Person(Base):
     email = Column(String, primary_key=True)
     hashed_password = Column(String, nullable=False)
     last_login = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    ratings_version = Column(Integer, default=0, server_default="0", nullable=False)
 
     bewertungenRest = relationship("BewertungRestaurant", back_populates="person", passive_deletes=True)
     bewertungenRezept = relationship("BewertungRecipe", back_populates="person", passive_deletes=True)
@@ -1,5 +1,6 @@
 """Restaurant structure for the DB"""
 from sqlalchemy import Column
+from sqlalchemy import DateTime
 from sqlalchemy import String
 from sqlalchemy.orm import relationship
 
@@ -13,6 +14,11 @@ class Restaurant(Base):
     Attributes:
         place_id (str): Primary Key
         name (str): Name of the Restaurant
+        homepage (str): Url of the homepage. Can be None
+        maps_url (str): Google maps url of the restaurant. Can be None
+        phone_number (str): Phonenumber of the restaurant. Can be None
+        address (str): Formatted address of the restaurant. Can be None
+        details_fetched_at (sqlalchemy.DateTime): Last time the details got fetched from google. None if never
         bewertungen (db.models.bewertung.BewertungRestaurant): Bewertungen of the person
 
     """
@@ -21,5 +27,10 @@ class Restaurant(Base):
 
     place_id = Column(String, primary_key=True)
     name = Column(String, nullable=False, autoincrement=False)
+    homepage = Column(String, nullable=True)
+    maps_url = Column(String, nullable=True)
+    phone_number = Column(String, nullable=True)
+    address = Column(String, nullable=True)
+    details_fetched_at = Column(DateTime(timezone=True), nullable=True)
 
     bewertungen = relationship("BewertungRestaurant", back_populates="restaurant", passive_deletes=True)
@@ -0,0 +1,50 @@
+"""Upgrade the tables of an existing Database. `Base.metadata.create_all` only creates missing tables,
+so columns that are added to an existing model must be added here too"""
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+from sqlalchemy import inspect
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateColumn
+
+from db.base import Base
+from tools.my_logging import logger
+
+ADDED_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "restaurant": ("homepage", "maps_url", "phone_number", "address", "details_fetched_at"),
+    "person": ("ratings_version",),
+    "filterRest": ("content_hash",),
+}
+"""Columns of the models that were added after the table got created. Every column must be nullable
+or have a server default, so the existing rows got a value"""
+
+
+def upgrade_tables(bind: Engine) -> List[str]:
+    """Add the missing `ADDED_COLUMNS` to the existing tables. Tables that do not exist are skipped,
+    they are created with all columns by `Base.metadata.create_all`
+
+    Args:
+        bind (sqlalchemy.engine.Engine): Connection to the DB
+
+    Returns:
+        List[str]: The added columns as "table.column"
+    """
+    inspector = inspect(bind)
+    added = []
+    with bind.begin() as connection:
+        for table_name, column_names in ADDED_COLUMNS.items():
+            if not inspector.has_table(table_name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table_name)}
+            table = Base.metadata.tables[table_name]
+            for column_name in column_names:
+                if column_name in existing:
+                    continue
+                column = CreateColumn(table.columns[column_name]).compile(dialect=bind.dialect)
+                table_sql = bind.dialect.identifier_preparer.format_table(table)
+                connection.execute(text(f"ALTER TABLE {table_sql} ADD COLUMN {column}"))
+                added.append(f"{table_name}.{column_name}")
+                logger.info("Added column to the DB... column:%s.%s", table_name, column_name)
+    return added
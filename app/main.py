@@ -9,18 +9,23 @@ from db.base import Base
 from db.crud.allergies import create_allergie
 from db.crud.cuisine import create_cuisine
 from db.database import engine
+from db.upgrade import upgrade_tables
 from schemes import Allergies
 from schemes import Cuisine
 from schemes import exceptions
 from schemes.exceptions import DuplicateEntry
+from services import service_res
+from tools import gapi
 from tools.my_logging import logger
 from tools.my_logging import setup_logging
+from tools.write_behind import write_queue
 from views import error
 from views import index
 from views import rating
 from views import recipe
 from views import restaurant
 from views import signin
+from views import status as status_view
 
 
 app = fastapi.FastAPI(title="Essensfindung")
@@ -42,6 +47,7 @@ def configure_routing():
     app.include_router(signin.router)
     app.include_router(error.router)
     app.include_router(rating.router)
+    app.include_router(status_view.router)
 
 
 def configure_database():
@@ -52,8 +58,9 @@ def configure_database():
 
 
 def create_database_table():
-    """Create the Table of the DB"""
+    """Create the Table of the DB and add new columns to existing tables"""
     Base.metadata.create_all(bind=engine, checkfirst=True)
+    upgrade_tables(engine)
 
 
 def add_all_allergies():
@@ -76,6 +83,21 @@ def add_all_cuisine():
                 pass
 
 
+@app.on_event("startup")
+async def startup():
+    """Open the pooled connections and start the write queue of the worker"""
+    await gapi.open_client()
+    write_queue.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Cancel the background prefetches, flush the write queue and close the pooled connections of the worker"""
+    await service_res.cancel_prefetch()
+    await write_queue.stop()
+    await gapi.close_client()
+
+
 @app.exception_handler(exceptions.DatabaseException)
 async def database_exception_handler(request: fastapi.Request, exc: exceptions.DatabaseException):
     """Exception Handler for all DatabaseExceptions made and unhandeld
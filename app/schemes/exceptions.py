@@ -12,6 +12,14 @@ class GoogleApiException(NoResultsException):
     """Exception if some Error from the Google API request are made"""
 
 
+class GoogleApiLimitException(GoogleApiException):
+    """Exception if the rate limit or the daily quota of the Google API is reached"""
+
+
+class GoogleApiUnavailableException(GoogleApiException):
+    """Exception if the Google API is not available and the circuit breaker rejects the request"""
+
+
 class NoneExcistingLocationException(GoogleApiException):
     """Exception if no result found with these zip code"""
 
@@ -92,6 +92,97 @@ class Restaurant(RestaurantBase):
     homepage: str = None
 
 
+class RestaurantCandidate:
+    """
+    Lightweight result of the nearby search for the filter and the selection.
+    Only the selected candidate got converted to a `Restaurant` with `to_restaurant`
+
+    Attributes:
+        place_id (str): ID from Google
+        name (str): Name of the Restaurant
+        rating (float): google rating. Defaults to None
+        lat (float): Latitude
+        lng (float): Longitude
+        own_rating (float): User rating. Defaults to None
+        price_level (int): google price level 0 - 4. Defaults to None
+        business_status (str): google business status e.g. OPERATIONAL or CLOSED_PERMANENTLY. Defaults to None
+    """
+
+    __slots__ = ("place_id", "name", "rating", "lat", "lng", "own_rating", "price_level", "business_status")
+
+    def __init__(
+        self,
+        place_id: str,
+        name: str,
+        rating: float,
+        lat: float,
+        lng: float,
+        own_rating: float = None,
+        price_level: int = None,
+        business_status: str = None,
+    ):
+        self.place_id = place_id
+        self.name = name
+        self.rating = rating
+        self.lat = lat
+        self.lng = lng
+        self.own_rating = own_rating
+        self.price_level = price_level
+        self.business_status = business_status
+
+    @classmethod
+    def from_result(cls, result: dict) -> "RestaurantCandidate":
+        """Create the candidate from one result of the google nearby search
+
+        Args:
+            result (dict): One entry of the "results" of the response
+
+        Returns:
+            RestaurantCandidate: The candidate
+        """
+        location = result["geometry"]["location"]
+        return cls(
+            place_id=result["place_id"],
+            name=result["name"],
+            rating=result.get("rating"),
+            lat=float(location["lat"]),
+            lng=float(location["lng"]),
+            price_level=result.get("price_level"),
+            business_status=result.get("business_status"),
+        )
+
+    def to_restaurant(self) -> Restaurant:
+        """Create the full Restaurant of the candidate
+
+        Returns:
+            Restaurant: The restaurant with the values of the candidate
+        """
+        return Restaurant(
+            place_id=self.place_id,
+            name=self.name,
+            geometry=Geometry(location=LocationRest(lat=str(self.lat), lng=str(self.lng))),
+            rating=self.rating,
+            own_rating=self.own_rating,
+        )
+
+    def copy(self) -> "RestaurantCandidate":
+        """Return a copy of the candidate
+
+        Returns:
+            RestaurantCandidate: The copy
+        """
+        return RestaurantCandidate(*(getattr(self, slot) for slot in self.__slots__))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, RestaurantCandidate):
+            return NotImplemented
+        return all(getattr(self, slot) == getattr(other, slot) for slot in self.__slots__)
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{slot}={getattr(self, slot)!r}" for slot in self.__slots__)
+        return f"RestaurantCandidate({values})"
+
+
 class RestBewertungBase(BaseModel):
     """
     BaseClass for the Bewertung
@@ -1,7 +1,8 @@
+import random
 from typing import List
 from typing import Union
 
-import pandas
+import numpy
 from sqlalchemy.orm import Session
 
 from db.crud import recipeBewertung as crud_recipeBewertung
@@ -14,7 +15,6 @@ from schemes.scheme_recipe import RecipeBewertungCreate
 from schemes.scheme_recipe import RecipeBewertungReturn
 from schemes.scheme_user import UserBase
 from tools.recipe_db import recipe_db
-from tools.recipe_db import RecipeDB
 
 
 def search_recipe(db_session: Session, user: UserBase, recipe_filter: FilterRecipe) -> Recipe:
@@ -27,16 +27,8 @@ def search_recipe(db_session: Session, user: UserBase, recipe_filter: FilterReci
     Returns:
         schemes.scheme_recipe.Recipe: The one choosen Recipe
     """
-    pd_random_recipe: pandas.DataFrame = __apply_filter(recipe_db.pd_frame, recipe_filter).sample()
-    random_recipe = Recipe(
-        id=pd_random_recipe["_id.$oid"].array[0],
-        name=pd_random_recipe["name"].array[0],
-        ingredients=pd_random_recipe["ingredients"].array[0],
-        url=pd_random_recipe["url"].array[0],
-        image=pd_random_recipe["image"].array[0],
-        cookTime=pd_random_recipe["cookTime"].array[0],
-        prepTime=pd_random_recipe["prepTime"].array[0],
-    )
+    rows = __apply_filter(recipe_filter)
+    random_recipe = recipe_db.get_recipe(int(random.choice(rows)))
 
     if not crud_recipeBewertung.get_bewertung_from_user_to_recipe(db=db_session, user=user, recipe=random_recipe):
         add_assessment(
@@ -47,15 +39,14 @@ def search_recipe(db_session: Session, user: UserBase, recipe_filter: FilterReci
     return random_recipe
 
 
-def __apply_filter(recipes: pandas.DataFrame, recipe_filter: FilterRecipe) -> pandas.DataFrame:
-    cooktime_bool = RecipeDB.filter_cooktime(user_pd_frame=recipes, total_time=recipe_filter.total_time)
-    keyword_bool = RecipeDB.filter_keyword(user_pd_frame=recipes, keyword=recipe_filter.keyword)
-    filter_bool = cooktime_bool & keyword_bool
+def __apply_filter(recipe_filter: FilterRecipe) -> numpy.ndarray:
+    keyword_rows = recipe_db.filter_keyword(keyword=recipe_filter.keyword)
+    rows = recipe_db.filter_cooktime(total_time=recipe_filter.total_time, rows=keyword_rows)
 
-    if not (True in filter_bool.value_counts()):
+    if len(rows) == 0:
         raise RecipeNotFound("No Recipe Found with these Filters")
 
-    return recipes[filter_bool]
+    return rows
 
 
 def get_assessments_from_user(db_session: Session, user: UserBase) -> Union[List[RecipeBewertungReturn], None]:
@@ -1,17 +1,30 @@
 """Main Module for the Restaurant-Search"""
-import random
+import asyncio
+import datetime
+import heapq
+import time
+from typing import Callable
+from typing import Dict
+from typing import Iterable
 from typing import List
+from typing import Set
 from typing import Union
 
 import httpx
+import numpy
 from sqlalchemy.orm import Session
 
+from db.base import Restaurant as DBRestaurant
 from db.crud import filter as crud_filter
+from db.crud import geocode as crud_geocode
 from db.crud import restaurant as crud_restaurant
 from db.crud import restBewertung as crud_restBewertung
+from db.crud import user as crud_user
+from db.database import SessionLocal
 from schemes.exceptions import DatabaseException
 from schemes.exceptions import DuplicateEntry
 from schemes.exceptions import GoogleApiException
+from schemes.exceptions import GoogleApiUnavailableException
 from schemes.exceptions import NoneExcistingLocationException
 from schemes.exceptions import NoResultsException
 from schemes.exceptions import UserNotFound
@@ -20,30 +33,91 @@ from schemes.scheme_filter import FilterRestDatabase
 from schemes.scheme_rest import LocationBase
 from schemes.scheme_rest import Restaurant
 from schemes.scheme_rest import RestaurantBase
+from schemes.scheme_rest import RestaurantCandidate
 from schemes.scheme_rest import RestBewertungCreate
 from schemes.scheme_rest import RestBewertungReturn
 from schemes.scheme_user import UserBase
 from tools import gapi
+from tools.cache import TTLCache
+from tools.config import settings
+from tools.my_logging import logger
+from tools.sampling import WeightedSampler
+from tools.write_behind import write_queue
 
+geocode_cache = TTLCache(maxsize=settings.GEOCODE_CACHE_SIZE, ttl=settings.GEOCODE_MAX_AGE_HOURS * 3600)
+"""Cache of `get_coordinates_from_location`. Contains the location or None if google found nothing"""
 
-def get_coordinates_from_location(location: str) -> LocationBase:
-    """Convert a string containing an address into coordinates
+RestaurantPredicate = Callable[[Dict[str, numpy.ndarray], FilterRest], numpy.ndarray]
+"""Filter for `apply_filter`. Gets the columns of the candidates and the filter and returns True for every
+restaurant to keep"""
+
+rating_cache = TTLCache(maxsize=settings.RATING_CACHE_SIZE, ttl=None)
+"""Cache of `get_ratings_from_user`. Contains (place_id -> rating, ratings_version, last check) of every user"""
+
+candidate_pools = TTLCache(maxsize=settings.CANDIDATE_POOL_SIZE, ttl=settings.CANDIDATE_POOL_TTL)
+"""Weighted candidates of the last search of every user. Contains (candidates, sampler, shown indexes)"""
+
+_prefetch_tasks: Set[asyncio.Future] = set()
+
+_NOT_CACHED = object()
+
+
+def normalize_address(location: str) -> str:
+    """Normalize an address for the geocode cache (lower case and single spaces)
+
+    Args:
+        location (str): The address/zipcode string
+
+    Returns:
+        str: The normalized address
+    """
+    return " ".join(location.casefold().split())
+
+
+async def get_coordinates_from_location(db_session: Session, location: str) -> LocationBase:
+    """Convert a string containing an address into coordinates.
+    The results (also no results) are cached in the memory and in the DB
 
     Args:
+        db_session (sqlalchemy.orm.Session): Session to the DB -> See `db: Session = Depends(get_db)`
         location (str): The address/zipcode string to search
 
     Raises:
         NoneExcistingLocationException: Raises if the location was not found
+        GoogleApiException: Raises if the request to the Google API failed. Nothing is cached
+        GoogleApiLimitException: Raises if the rate limit or the daily quota of the Google API is reached
+        GoogleApiUnavailableException: Raises if the circuit breaker of the Google API is open
 
     Returns:
         schemes.scheme_rest.LocationBase: Location with the coordinates
     """
-    try:
-        results = gapi.geocode(location)
-        location = results[0].get("geometry").get("location")
-        return LocationBase(**location)
-    except GoogleApiException as error:
-        raise NoneExcistingLocationException(f"Invalid location {location} - no results") from error
+    address = normalize_address(location)
+    not_found_max_age = datetime.timedelta(minutes=settings.GEOCODE_NOT_FOUND_MAX_AGE_MINUTES)
+
+    coordinates = geocode_cache.get(address, _NOT_CACHED)
+    if coordinates is _NOT_CACHED:
+        db_geocode = crud_geocode.get_geocode(
+            db_session, address, datetime.timedelta(hours=settings.GEOCODE_MAX_AGE_HOURS), not_found_max_age
+        )
+        if db_geocode is not None:
+            coordinates = LocationBase(lat=db_geocode.lat, lng=db_geocode.lng) if db_geocode.lat else None
+        else:
+            try:
+                results = await gapi.geocode(location)
+                coordinates = LocationBase(**results[0].get("geometry").get("location"))
+            except NoneExcistingLocationException:
+                # Only an address without a result is cached, not a failed or rejected request
+                coordinates = None
+            crud_geocode.save_geocode(db_session, address, coordinates)
+
+        if coordinates is None:
+            geocode_cache.set(address, None, ttl=not_found_max_age.total_seconds())
+        else:
+            geocode_cache.set(address, coordinates)
+
+    if coordinates is None:
+        raise NoneExcistingLocationException(f"Invalid location {location} - no results")
+    return coordinates.copy()
 
 
 def get_assessments_from_user(db_session: Session, user: UserBase) -> Union[List[RestBewertungReturn], None]:
@@ -86,6 +160,9 @@ def add_assessment(db_session: Session, assessment: RestBewertungCreate) -> Rest
     """
     try:
         created_assessment = crud_restBewertung.create_bewertung(db_session, assessment)
+        __write_rating_cache__(
+            db_session, assessment.person.email, created_assessment.place_id, created_assessment.rating
+        )
         return RestBewertungReturn(
             name=created_assessment.restaurant.name,
             email=created_assessment.person_email,
@@ -118,6 +195,9 @@ def update_assessment(
         updated_assessment = crud_restBewertung.update_bewertung(db_session, old_assessment, new_assessment)
     except DatabaseException as error:
         raise error
+    __write_rating_cache__(
+        db_session, old_assessment.person.email, old_assessment.restaurant.place_id, updated_assessment.rating
+    )
     return RestBewertungReturn(
         name=updated_assessment.restaurant.name,
         email=updated_assessment.person_email,
@@ -145,9 +225,56 @@ def delete_assessment(db_session: Session, user: UserBase, rest: RestaurantBase)
     rows = crud_restBewertung.delete_bewertung(db_session, user, rest)
     if rows == 0:
         raise DatabaseException("Can not delete assessment. Does the user and restaurant excist?")
+    __write_rating_cache__(db_session, user.email, rest.place_id, None)
     return rows
 
 
+def get_ratings_from_user(db_session: Session, user: UserBase) -> Dict[str, float]:
+    """Get the ratings of the user to all restaurants. The ratings are cached in `rating_cache` and updated by
+    `add_assessment`, `update_assessment` and `delete_assessment`. Every `settings.RATING_CACHE_SYNC_SECONDS`
+    the version of the ratings in the DB is checked to notice changes of other workers
+
+    Args:
+        db_session (sqlalchemy.orm.Session): Session to the DB -> See `db: Session = Depends(get_db)`
+        user (schemes.scheme_user.UserBase): The owner of the ratings
+
+    Returns:
+        Dict[str, float]: place_id -> rating. Do not modify it!
+    """
+    now = time.monotonic()
+    entry = rating_cache.get(user.email)
+    if entry is not None:
+        ratings, version, checked = entry
+        if settings.RATING_CACHE_SYNC_SECONDS <= 0 or now - checked < settings.RATING_CACHE_SYNC_SECONDS:
+            return ratings
+        if crud_user.get_ratings_version(db_session, user.email) == version:
+            rating_cache.set(user.email, (ratings, version, now))
+            return ratings
+
+    # Read the version first. A change in between only leads to an unnecessary reload later
+    version = crud_user.get_ratings_version(db_session, user.email)
+    ratings = crud_restBewertung.get_ratings_from_user_to_rests(db_session, user)
+    rating_cache.set(user.email, (ratings, version, now))
+    return ratings
+
+
+def __write_rating_cache__(db_session: Session, email: str, place_id: str, rating: Union[float, None]) -> None:
+    entry = rating_cache.pop(email)
+    if entry is None:
+        return
+    ratings, version, checked = entry
+    new_version = crud_user.get_ratings_version(db_session, email)
+    # If another worker changed the ratings in between the whole map is loaded again
+    if version is None or new_version != version + 1:
+        return
+    ratings = dict(ratings)
+    if rating is None:
+        ratings.pop(place_id, None)
+    else:
+        ratings[place_id] = rating
+    rating_cache.set(email, (ratings, new_version, checked))
+
+
 def get_rest_filter_from_user(db_session: Session, user: UserBase) -> Union[FilterRestDatabase, None]:
     """Return the saved Filter from the Database if found one
 
@@ -188,7 +315,8 @@ def create_rest_filter(db_session: Session, filter_rest: FilterRestDatabase, use
 
 
 def update_rest_filter(db_session: Session, filter_updated: FilterRestDatabase, user: UserBase) -> FilterRestDatabase:
-    """Update a Filter from a User. Need the full information of the filter (not only the new one)
+    """Update a Filter from a User. Need the full information of the filter (not only the new one).
+    Nothing is written if the saved filter has the same content hash
 
     Args:
         db_session (sqlalchemy.orm.Session): Session to the Database
@@ -201,6 +329,10 @@ def update_rest_filter(db_session: Session, filter_updated: FilterRestDatabase,
     Returns:
         schemes.scheme_filter.FilterRestDatabase: The updated Filter
     """
+    if crud_filter.get_filter_hash(db_session, user) == crud_filter.filter_content_hash(filter_updated):
+        logger.debug("Filter unchanged... user:%s", user.email)
+        return filter_updated
+
     try:
         db_filter_rest = crud_filter.update_filterRest(db_session, filter_updated, user)
         filter_rest = FilterRestDatabase.from_orm(db_filter_rest)
@@ -209,9 +341,10 @@ def update_rest_filter(db_session: Session, filter_updated: FilterRestDatabase,
         raise error
 
 
-def search_for_restaurant(db_session: Session, user: UserBase, user_f: FilterRest) -> Restaurant:
+async def search_for_restaurant(db_session: Session, user: UserBase, user_f: FilterRest) -> Restaurant:
     """Do a full search for a Restaurant. This does the google search, weights the result with the user rating
-    and choose one of the restaurants according to the weights
+    and choose one of the restaurants according to the weights. The weighted candidates are stored in
+    `candidate_pools` for `reroll_restaurant`
 
     Args:
         db_session (sqlalchemy.orm.Session): Session to the DB -> See `db: Session = Depends(get_db)`
@@ -225,91 +358,420 @@ def search_for_restaurant(db_session: Session, user: UserBase, user_f: FilterRes
     Returns:
         schemes.scheme_rest.Restaurant: The one choosen Restaurant where the user have to go now!
     """
-    google_rests: List[Restaurant] = gapi.search_restaurant(user_f)
-    filterd_rests: List[Restaurant] = apply_filter(google_rests, user_f)
+    restaurants = await search_for_restaurants(db_session, user, user_f, count=1)
+    return restaurants[0]
+
+
+async def search_for_restaurants(
+    db_session: Session, user: UserBase, user_f: FilterRest, count: int = 1
+) -> List[Restaurant]:
+    """Do a full search and choose count different restaurants according to the weights.
+    All restaurants come from the same google search and their details are fetched concurrently
+
+    Args:
+        db_session (sqlalchemy.orm.Session): Session to the DB -> See `db: Session = Depends(get_db)`
+        user (schemes.scheme_user.UserBase): User that contain the mail address
+        user_f (schemes.scheme_filter.FilterRest): Filter that are needed for the search
+        count (int, optional): Number of restaurants. Limited by `settings.RESTAURANT_MAX_SUGGESTIONS`
+            and the number of found restaurants. Defaults to 1
+
+    Raises:
+        schemes.exceptions.NoResultsException: If no Results are found
+        schemes.exceptions.GoogleApiException: If no communication with the Google API are possible
+
+    Returns:
+        List[schemes.scheme_rest.Restaurant]: The choosen Restaurants in the order of the draws
+    """
+    google_rests: List[RestaurantCandidate] = await gapi.search_restaurant(user_f)
+    filterd_rests: List[RestaurantCandidate] = apply_filter(google_rests, user_f)
 
     if len(filterd_rests) == 0:
         raise NoResultsException("There are no Restaurants found with these parameters")
 
-    user_rests: List[Restaurant] = fill_user_rating(db_session, filterd_rests, user)
-    restaurant = select_restaurant(user_rests)
+    user_rests: List[RestaurantCandidate] = fill_user_rating(db_session, filterd_rests, user)
+    sampler = restaurant_sampler(user_rests)
+    indexes = sampler.sample_distinct(__suggestions__(count))
+    candidate_pools.set(user.email, (user_rests, sampler, set(indexes)))
+    start_prefetch_details(user_rests, sampler.weights, exclude=indexes)
+
+    return await __show_restaurants__(db_session, user, [user_rests[index] for index in indexes])
+
+
+async def reroll_restaurant(db_session: Session, user: UserBase) -> Restaurant:
+    """Choose another restaurant of the last search of the user without a new google search.
+    Restaurants that are already shown are skipped until all restaurants of the search are shown
+
+    Args:
+        db_session (sqlalchemy.orm.Session): Session to the DB -> See `db: Session = Depends(get_db)`
+        user (schemes.scheme_user.UserBase): User that contain the mail address
+
+    Raises:
+        schemes.exceptions.NoResultsException: If there is no search of the user in the last
+            `settings.CANDIDATE_POOL_TTL` seconds
+        schemes.exceptions.GoogleApiException: If no communication with the Google API are possible
+
+    Returns:
+        schemes.scheme_rest.Restaurant: The next choosen Restaurant
+    """
+    restaurants = await reroll_restaurants(db_session, user, count=1)
+    return restaurants[0]
+
+
+async def reroll_restaurants(db_session: Session, user: UserBase, count: int = 1) -> List[Restaurant]:
+    """Choose count other restaurants of the last search of the user without a new google search.
+    See `reroll_restaurant`
+
+    Args:
+        db_session (sqlalchemy.orm.Session): Session to the DB -> See `db: Session = Depends(get_db)`
+        user (schemes.scheme_user.UserBase): User that contain the mail address
+        count (int, optional): Number of restaurants. Limited by `settings.RESTAURANT_MAX_SUGGESTIONS`
+            and the number of found restaurants. Defaults to 1
+
+    Raises:
+        schemes.exceptions.NoResultsException: If there is no search of the user in the last
+            `settings.CANDIDATE_POOL_TTL` seconds
+        schemes.exceptions.GoogleApiException: If no communication with the Google API are possible
+
+    Returns:
+        List[schemes.scheme_rest.Restaurant]: The next choosen Restaurants
+    """
+    pool = candidate_pools.get(user.email)
+    if pool is None:
+        raise NoResultsException("The search is expired. Please search again")
+    rests, sampler, shown = pool
+
+    count = min(__suggestions__(count), len(rests))
+    indexes = sampler.sample_distinct(count, exclude=shown)
+    if len(indexes) < count:
+        logger.debug("All restaurants of the search are shown... start again user:%s", user.email)
+        shown.clear()
+        indexes += sampler.sample_distinct(count - len(indexes), exclude=indexes)
+    shown.update(indexes)
+
+    return await __show_restaurants__(db_session, user, [rests[index] for index in indexes])
+
+
+def __suggestions__(count: int) -> int:
+    return max(1, min(count, settings.RESTAURANT_MAX_SUGGESTIONS))
+
+
+async def __show_restaurants__(
+    db_session: Session, user: UserBase, candidates: List[RestaurantCandidate]
+) -> List[Restaurant]:
+    results = await asyncio.gather(
+        *[__show_restaurant__(db_session, user, candidate) for candidate in candidates], return_exceptions=True
+    )
+    restaurants = [result for result in results if isinstance(result, Restaurant)]
+    errors = [result for result in results if not isinstance(result, Restaurant)]
+    # Skip the restaurants without details as long as one restaurant can be shown
+    if errors and (not restaurants or not all(isinstance(error, GoogleApiException) for error in errors)):
+        raise errors[0]
+    return restaurants
+
+
+async def __show_restaurant__(db_session: Session, user: UserBase, candidate: RestaurantCandidate) -> Restaurant:
+    restaurant = await fill_restaurant_details(db_session, candidate.to_restaurant())
+
+    if restaurant.place_id not in get_ratings_from_user(db_session, user):
+        # The shown restaurant gets an empty assessment, the response does not wait for it
+        write_queue.enqueue(
+            db_session,
+            lambda session: __add_placeholder__(session, user, restaurant),
+            key=("placeholder", user.email, restaurant.place_id),
+        )
+    return restaurant
+
+
+def __add_placeholder__(db_session: Session, user: UserBase, restaurant: Restaurant) -> None:
+    if crud_restBewertung.create_placeholder_bewertung(db_session, user, restaurant):
+        __write_rating_cache__(db_session, user.email, restaurant.place_id, 0)
+
+
+async def fill_restaurant_details(db_session: Session, restaurant: Restaurant) -> Restaurant:
+    """Add the details (homepage, maps url, phone number and address) to the restaurant.
+    The details are taken from the DB if they are younger than `settings.GOOGLE_DETAILS_MAX_AGE_HOURS`
+    otherwise they are fetched from google and saved in the DB with the write queue.
+    If google is not available expired details are used
+
+    Args:
+        db_session (sqlalchemy.orm.Session): Session to the DB -> See `db: Session = Depends(get_db)`
+        restaurant (schemes.scheme_rest.Restaurant): The restaurant with the place_id
+
+    Raises:
+        schemes.exceptions.GoogleApiException: If no communication with the Google API are possible
+
+    Returns:
+        schemes.scheme_rest.Restaurant: The restaurant with the details
+    """
+    max_age = datetime.timedelta(hours=settings.GOOGLE_DETAILS_MAX_AGE_HOURS)
+    db_rest = crud_restaurant.get_restaurant_details(db_session, restaurant.place_id, max_age)
+    if db_rest is not None:
+        return __details_from_db__(restaurant, db_rest)
 
     try:
-        restaurant = gapi.place_details(restaurant)
+        restaurant = await gapi.place_details(restaurant)
+    except (GoogleApiUnavailableException, httpx.TransportError) as error:
+        # Use the expired details if google is not available
+        db_rest = crud_restaurant.get_restaurant_by_id(db_session, restaurant.place_id)
+        if db_rest is None or db_rest.details_fetched_at is None:
+            raise GoogleApiException("Can't communicate with the Google API") from error
+        return __details_from_db__(restaurant, db_rest)
     except httpx.HTTPError as error:
         raise GoogleApiException("Can't communicate with the Google API") from error
 
-    if not crud_restaurant.get_restaurant_by_id(db_session, restaurant.place_id):
-        crud_restaurant.create_restaurant(db_session, restaurant)
-    if not crud_restBewertung.get_bewertung_from_user_to_rest(db_session, user, restaurant):
-        add_assessment(db_session, RestBewertungCreate(name=restaurant.name, person=user, restaurant=restaurant))
+    write_queue.enqueue(
+        db_session,
+        lambda session: crud_restaurant.update_restaurant_details(session, restaurant),
+        key=("details", restaurant.place_id),
+    )
+    return restaurant
+
+
+def start_prefetch_details(
+    rests: List[RestaurantCandidate], weights: List[float], exclude: Iterable[int] = ()
+) -> Union[asyncio.Future, None]:
+    """Fetch the details of the `settings.GOOGLE_DETAILS_PREFETCH` best weighted restaurants in the background
+    with `prefetch_details`. A later reroll or search finds them in the DB
+
+    Args:
+        rests (List[schemes.scheme_rest.RestaurantCandidate]): The candidates of the search
+        weights (List[float]): Weight of every candidate
+        exclude (Iterable[int], optional): Indexes to skip (e.g. the shown restaurant). Defaults to ()
+
+    Returns:
+        Union[asyncio.Future, None]: The background task or None if the prefetch is disabled
+    """
+    if settings.GOOGLE_DETAILS_PREFETCH <= 0:
+        return None
+    exclude = set(exclude)
+    best = heapq.nlargest(
+        settings.GOOGLE_DETAILS_PREFETCH,
+        (index for index in range(len(rests)) if index not in exclude),
+        key=weights.__getitem__,
+    )
+    task = asyncio.ensure_future(prefetch_details([rests[index] for index in best]))
+    _prefetch_tasks.add(task)
+    task.add_done_callback(_prefetch_tasks.discard)
+    return task
+
+
+async def prefetch_details(
+    rests: List[RestaurantCandidate], session_factory: Callable[[], Session] = SessionLocal
+) -> int:
+    """Fetch the details of the restaurants from google and save them in the DB with the write queue. Max
+    `settings.GOOGLE_DETAILS_PREFETCH_CONCURRENCY` requests run at once. Restaurants with details in the DB are
+    skipped and the prefetch stops if less than `settings.GOOGLE_DETAILS_PREFETCH_MIN_QUOTA` requests
+    of the daily quota are left. Errors are only logged
+
+    Args:
+        rests (List[schemes.scheme_rest.RestaurantCandidate]): The restaurants to prefetch
+        session_factory (Callable[[], Session], optional): Creates the sessions to the DB. Defaults to SessionLocal
+
+    Returns:
+        int: Number of fetched details
+    """
+    semaphore = asyncio.Semaphore(settings.GOOGLE_DETAILS_PREFETCH_CONCURRENCY)
+    max_age = datetime.timedelta(hours=settings.GOOGLE_DETAILS_MAX_AGE_HOURS)
+
+    async def prefetch(candidate: RestaurantCandidate) -> bool:
+        async with semaphore:
+            remaining = gapi.quota.remaining
+            if remaining is not None and remaining < settings.GOOGLE_DETAILS_PREFETCH_MIN_QUOTA:
+                return False
+            # No session is open while google answers, so the prefetches hold no connection of the pool
+            with session_factory() as session:
+                if crud_restaurant.get_restaurant_details(session, candidate.place_id, max_age) is not None:
+                    return False
+            try:
+                restaurant = await gapi.place_details(candidate.to_restaurant())
+            except (GoogleApiException, httpx.HTTPError) as error:
+                logger.debug("Prefetch of the details failed... place_id:%s error:%s", candidate.place_id, error)
+                return False
+            with session_factory() as session:
+                # The session is only used if the write queue is not running
+                write_queue.enqueue(
+                    session,
+                    lambda db_session: crud_restaurant.update_restaurant_details(db_session, restaurant),
+                    key=("details", restaurant.place_id),
+                )
+            return True
+
+    fetched = await asyncio.gather(*[prefetch(candidate) for candidate in rests])
+    return sum(fetched)
+
+
+async def cancel_prefetch() -> None:
+    """Cancel all running prefetches of details. Called on the shutdown of the application"""
+    tasks = list(_prefetch_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def __details_from_db__(restaurant: Restaurant, db_rest: DBRestaurant) -> Restaurant:
+    restaurant.homepage = db_rest.homepage
+    restaurant.maps_url = db_rest.maps_url
+    restaurant.phone_number = db_rest.phone_number
+    restaurant.geometry.location.adr = db_rest.address
     return restaurant
 
 
-def fill_user_rating(db_session: Session, rests: List[Restaurant], user: UserBase) -> List[Restaurant]:
+def fill_user_rating(
+    db_session: Session, rests: List[RestaurantCandidate], user: UserBase
+) -> List[RestaurantCandidate]:
     """Search in the connected DB if one restaurant got already rated from the user
-    and if so add the value to the restaurant
+    and if so add the value to the restaurant. The ratings are taken from `get_ratings_from_user`
 
     Args:
         db_session (sqlalchemy.orm.Session): Session to the DB -> See `db: Session = Depends(get_db)`
-        google_res (List[schemes.scheme_rest.Restaurant]): Restaurants for lookup
+        google_res (List[schemes.scheme_rest.RestaurantCandidate]): Restaurants for lookup
 
     Returns:
-        List[schemes.scheme_rest.Restaurant]: Return of the input List with the user rating if one got found
+        List[schemes.scheme_rest.RestaurantCandidate]: Return of the input List with the user rating if one got found
     """
+    ratings = get_ratings_from_user(db_session, user)
     for rest in rests:
-        assessment = crud_restBewertung.get_bewertung_from_user_to_rest(db_session, user, rest)
-        if assessment is not None:
-            rest.own_rating = assessment.rating
+        if rest.place_id in ratings:
+            rest.own_rating = ratings[rest.place_id]
 
     return rests
 
 
-def apply_filter(rests: List[Restaurant], user_f: FilterRest) -> List[Restaurant]:
-    """Apply all filter (current only Rating)
+def apply_filter(
+    rests: List[RestaurantCandidate], user_f: FilterRest, predicates: List[RestaurantPredicate] = None
+) -> List[RestaurantCandidate]:
+    """Apply all filter in one pass over the columns of the candidates. A candidate is kept
+    if all predicates keep it. The order of the candidates does not change
 
     Args:
-        rests (List[schemes.scheme_rest.Restaurant]): List of all Restarants to apply the filter
-        filter (schemes.scheme_filter.FilterRest): The Filter with all informations
+        rests (List[schemes.scheme_rest.RestaurantCandidate]): List of all Restarants to apply the filter
+        user_f (schemes.scheme_filter.FilterRest): The Filter with all informations
+        predicates (List[RestaurantPredicate], optional): The filter to apply. Defaults to `REST_PREDICATES`
 
     Returns:
-        List[schemes.scheme_rest.Restaurant]: The filtered List of the restaurants
+        List[schemes.scheme_rest.RestaurantCandidate]: The filtered List of the restaurants
     """
-    return filter_rating(rests, user_f.rating)
+    if not rests:
+        return []
+    columns = candidate_columns(rests)
+    keep = numpy.ones(len(rests), dtype=bool)
+    for predicate in REST_PREDICATES if predicates is None else predicates:
+        keep &= predicate(columns, user_f)
+    return [rests[index] for index in numpy.flatnonzero(keep)]
 
 
-def filter_rating(rests: List[Restaurant], rating: int) -> List[Restaurant]:
-    """Remove all Restaurants from the list under the given rating
+def candidate_columns(rests: List[RestaurantCandidate]) -> Dict[str, numpy.ndarray]:
+    """Build one array for every attribute of the candidates. Missing numbers are NaN
 
     Args:
-        rests (List[schemes.scheme_rest.Restaurant]): List of all Restarants to filter
-        rating (int): All under this number got removed
+        rests (List[schemes.scheme_rest.RestaurantCandidate]): The candidates
 
     Returns:
-        List[schemes.scheme_rest.Restaurant]: Filtered List based ob the rating
+        Dict[str, numpy.ndarray]: Attribute name -> values of all candidates
     """
-    for res in rests:
-        if res.rating < rating:
-            rests.remove(res)
-    return rests
+    columns = {}
+    for slot in RestaurantCandidate.__slots__:
+        values = [getattr(rest, slot) for rest in rests]
+        if slot in ("rating", "own_rating", "price_level", "lat", "lng"):
+            columns[slot] = numpy.array([numpy.nan if value is None else value for value in values], dtype=float)
+        else:
+            columns[slot] = numpy.array(values, dtype=object)
+    return columns
+
+
+def filter_rating(columns: Dict[str, numpy.ndarray], user_f: FilterRest) -> numpy.ndarray:
+    """Remove all Restaurants under the rating of the filter. Restaurants without a rating are only kept
+    if the filter got no minimum rating (0)
+
+    Args:
+        columns (Dict[str, numpy.ndarray]): Columns of the candidates from `candidate_columns`
+        user_f (schemes.scheme_filter.FilterRest): The Filter with the minimum rating
+
+    Returns:
+        numpy.ndarray: True for every restaurant to keep
+    """
+    rating = columns["rating"]
+    if user_f.rating <= 0:
+        return numpy.ones(len(rating), dtype=bool)
+    with numpy.errstate(invalid="ignore"):
+        return rating >= user_f.rating
+
+
+def filter_price_level(columns: Dict[str, numpy.ndarray], user_f: FilterRest) -> numpy.ndarray:
+    """Remove all Restaurants over the costs of the filter. Restaurants without a price level are kept
+
+    Args:
+        columns (Dict[str, numpy.ndarray]): Columns of the candidates from `candidate_columns`
+        user_f (schemes.scheme_filter.FilterRest): The Filter with the maximum costs
+
+    Returns:
+        numpy.ndarray: True for every restaurant to keep
+    """
+    price_level = columns["price_level"]
+    with numpy.errstate(invalid="ignore"):
+        return numpy.isnan(price_level) | (price_level <= user_f.costs)
+
+
+def filter_duplicates(columns: Dict[str, numpy.ndarray], user_f: FilterRest) -> numpy.ndarray:
+    """Keep only the first of the same restaurant (e.g. found for more than one cuisine)
+
+    Args:
+        columns (Dict[str, numpy.ndarray]): Columns of the candidates from `candidate_columns`
+        user_f (schemes.scheme_filter.FilterRest): Not used
+
+    Returns:
+        numpy.ndarray: True for every restaurant to keep
+    """
+    seen = set()
+    keep = numpy.zeros(len(columns["place_id"]), dtype=bool)
+    for index, place_id in enumerate(columns["place_id"]):
+        if place_id not in seen:
+            seen.add(place_id)
+            keep[index] = True
+    return keep
+
+
+def filter_closed(columns: Dict[str, numpy.ndarray], user_f: FilterRest) -> numpy.ndarray:
+    """Remove all Restaurants that are closed permanently
+
+    Args:
+        columns (Dict[str, numpy.ndarray]): Columns of the candidates from `candidate_columns`
+        user_f (schemes.scheme_filter.FilterRest): Not used
+
+    Returns:
+        numpy.ndarray: True for every restaurant to keep
+    """
+    return columns["business_status"] != "CLOSED_PERMANENTLY"
+
+
+REST_PREDICATES: List[RestaurantPredicate] = [filter_rating, filter_price_level, filter_duplicates, filter_closed]
+"""All filter that `apply_filter` uses. Add new predicates here"""
+
+
+def restaurant_sampler(rests: List[RestaurantCandidate], seed: Union[int, None] = None) -> WeightedSampler:
+    """Build the sampler to select restaurants with specific weight. weight = user_rating * 4 + google_rating * 2.
+    If None rating found it will be count as 0. Reuse it to draw more than one restaurant
+
+    Args:
+        rests (List[schemes.scheme_rest.RestaurantCandidate]): The Rating of the Restaurants are optional
+        seed (Union[int, None], optional): Seed for reproducible draws. Defaults to None
+
+    Returns:
+        tools.sampling.WeightedSampler: Sampler for the indexes of the restaurants
+    """
+    weights = [(rest.own_rating or 0) * 4 + (rest.rating or 0) * 2 for rest in rests]
+    return WeightedSampler(weights, seed=seed)
 
 
-def select_restaurant(rests: List[Restaurant]) -> Restaurant:
+def select_restaurant(rests: List[RestaurantCandidate], seed: Union[int, None] = None) -> RestaurantCandidate:
     """Select one restaurant with specific weight. weight = user_rating * 4 + google_rating * 2.
-    If None rating found it will be count as 0
+    If None rating found it will be count as 0. If all weights are 0 every restaurant got the same chance
 
     Args:
-        user_res (List[schemes.scheme_rest.Restaurant]): The Rating of the Restaurants are optional
+        rests (List[schemes.scheme_rest.RestaurantCandidate]): The Rating of the Restaurants are optional
+        seed (Union[int, None], optional): Seed for reproducible draws. Defaults to None
 
     Returns:
-        schemes.scheme_rest.Restaurant: The random chooses restaurant
+        schemes.scheme_rest.RestaurantCandidate: The random chooses restaurant
     """
-    weights: List[int] = []
-    for res in rests:
-        if res.own_rating is None:
-            res.own_rating = 0
-        if res.rating is None:
-            res.rating = 0
-        weights.append(res.own_rating * 4 + res.rating * 2)
-
-    return random.choices(rests, weights=weights, k=1)[0]
+    return rests[restaurant_sampler(rests, seed).sample()]
@@ -56,6 +56,7 @@ function change_restaurant_url() {
     } else {
         var new_link = "/findrestaurant?rating=" + rating + "&costs=" + costs + "&radius=" + radius + "&lat=" + latitude + "&lng=" + longitude + "&manuell_location=" + location;
     }
+    new_link += "&count=" + get_count();
     document.getElementById("search_restaurant").href = new_link;
     document.getElementById("search_restaurant_from_modal").href = new_link;
 }
@@ -93,6 +94,10 @@ function get_rating() {
     }
 }
 
+function get_count() {
+    return document.getElementById('restaurant_filter_count').value;
+}
+
 function get_radius() {
     return document.getElementById('restaurant_filter_radius').value;
 }
@@ -144,6 +149,7 @@ function update_allergies_selected() {
 function update_restaurant_modal_on_show() {
     update_radius_text(document.getElementById('restaurant_filter_radius').value);
     update_costs_text(document.getElementById('restaurant_filter_costs').value);
+    update_count_text(document.getElementById('restaurant_filter_count').value);
     update_cuisine_selected();
     update_allergies_selected();
 }
@@ -172,6 +178,10 @@ function update_radius_text(val) {
     document.getElementById('restaurant_filter_radius_text').value = val + " km";
 }
 
+function update_count_text(val) {
+    document.getElementById('restaurant_filter_count_text').value = val + (val == 1 ? " Restaurant" : " Restaurants");
+}
+
 function update_costs_text(val) {
     if (val == 0) {
         document.getElementById('restaurant_filter_costs_text').value = "Kostenlos";
@@ -0,0 +1,18 @@
+import asyncio
+
+import pytest
+
+from services import service_res
+from tools import gapi
+
+
+@pytest.fixture(autouse=True)
+def reset_caches():
+    gapi.nearby_cache.clear()
+    gapi.inflight.clear()
+    gapi.breaker.reset()
+    service_res.geocode_cache.clear()
+    service_res.rating_cache.clear()
+    service_res.candidate_pools.clear()
+    yield
+    asyncio.run(gapi.close_client())
@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+from tools.cache import SingleFlight
+from tools.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_ttl_cache_expire():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=60, clock=clock)
+    cache.set("key", "value")
+    cache.set("short", "value", ttl=5)
+
+    assert cache.get("key") == "value"
+    assert cache.get("short") == "value"
+
+    clock.now = 10
+    assert cache.get("short") is None
+    assert cache.get("key") == "value"
+
+    clock.now = 61
+    assert cache.get("key") is None
+    assert cache.stats() == {"hits": 3, "misses": 2, "size": 2, "maxsize": 10}
+
+    # Expired entries are still available as fallback
+    assert cache.get_stale("key") == "value"
+    assert cache.get_stale("other") is None
+
+
+def test_ttl_cache_lru():
+    cache = TTLCache(maxsize=2, ttl=None)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    # a is now the most recently used entry
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.pop("c") == 3
+    assert len(cache) == 1
+
+    cache.clear()
+    assert cache.stats() == {"hits": 0, "misses": 0, "size": 0, "maxsize": 2}
+
+
+def test_single_flight():
+    single_flight = SingleFlight()
+    started = []
+
+    async def call(value: int) -> int:
+        started.append(value)
+        await asyncio.sleep(0.01)
+        return value
+
+    async def run():
+        return await asyncio.gather(
+            single_flight.do("a", lambda: call(1)),
+            single_flight.do("a", lambda: call(2)),
+            single_flight.do("b", lambda: call(3)),
+        )
+
+    assert asyncio.run(run()) == [1, 1, 3]
+    assert started == [1, 3]
+    assert single_flight.stats() == {"calls": 2, "deduplicated": 1, "inflight": 0}
+
+
+def test_single_flight_error():
+    single_flight = SingleFlight()
+
+    async def call() -> int:
+        await asyncio.sleep(0.01)
+        raise ValueError("failed")
+
+    async def run():
+        return await asyncio.gather(single_flight.do("a", call), single_flight.do("a", call), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+
+    # The next call starts a new request
+    with pytest.raises(ValueError):
+        asyncio.run(single_flight.do("a", call))
+    assert single_flight.calls == 2
+
+
+def test_single_flight_cancel():
+    single_flight = SingleFlight()
+    cancelled = []
+
+    async def call() -> int:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return 1
+
+    async def run():
+        first = asyncio.ensure_future(single_flight.do("a", call))
+        second = asyncio.ensure_future(single_flight.do("a", call))
+        await asyncio.sleep(0)
+
+        # The call continues as long as one caller waits
+        first.cancel()
+        await asyncio.sleep(0.01)
+        assert not cancelled
+
+        second.cancel()
+        await asyncio.gather(first, second, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert cancelled == [True]
@@ -0,0 +1,74 @@
+from tools.circuit_breaker import BreakerState
+from tools.circuit_breaker import CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_circuit_breaker():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_rate=0.5, window=4, min_calls=4, open_seconds=30, clock=clock)
+
+    # Stay closed until min_calls are reached
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == BreakerState.CLOSED
+
+    # Open with 4 of 4 failed calls
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == BreakerState.OPEN
+    assert not breaker.allow()
+
+    # Only one trial call if half open
+    clock.now = 30
+    assert breaker.allow()
+    assert breaker.state == BreakerState.HALF_OPEN
+    assert not breaker.allow()
+
+    # Failed trial opens again
+    breaker.record_failure()
+    assert breaker.state == BreakerState.OPEN
+    assert not breaker.allow()
+
+    # Successful trial closes
+    clock.now = 60
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == BreakerState.CLOSED
+    assert breaker.allow()
+
+    stats = breaker.stats()
+    assert stats["rejected"] == 3
+    assert [transition["to"] for transition in stats["transitions"]] == [
+        "open",
+        "half_open",
+        "open",
+        "half_open",
+        "closed",
+    ]
+
+
+def test_circuit_breaker_release():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_rate=0.5, window=2, min_calls=2, open_seconds=30, clock=clock)
+    for _ in range(2):
+        breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == BreakerState.OPEN
+
+    # A trial without a result allows the next trial
+    clock.now = 30
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+    breaker.reset()
+    assert breaker.state == BreakerState.CLOSED
+    assert breaker.stats()["calls_in_window"] == 0
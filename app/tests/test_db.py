@@ -1,5 +1,9 @@
+import datetime
+
 import pytest
 from sqlalchemy import create_engine
+from sqlalchemy import inspect
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
 
 from db.base import Base
@@ -8,15 +12,22 @@ from db.crud import restBewertung
 from db.crud.allergies import create_allergie
 from db.crud.cuisine import create_cuisine
 from db.crud.filter import create_filterRest
+from db.crud.filter import filter_content_hash
+from db.crud.filter import get_filter_from_user
+from db.crud.filter import get_filter_hash
 from db.crud.filter import update_filterRest
 from db.crud.restaurant import create_restaurant
 from db.crud.restaurant import delete_restaurant
 from db.crud.restaurant import get_all_restaurants
 from db.crud.restaurant import get_restaurant_by_id
+from db.crud.restaurant import get_restaurant_details
+from db.crud.restaurant import update_restaurant_details
 from db.crud.user import create_user
 from db.crud.user import delete_user
+from db.crud.user import get_ratings_version
 from db.crud.user import get_user_by_mail
 from db.crud.user import update_user
+from db.upgrade import upgrade_tables
 from schemes import Allergies
 from schemes import Cuisine
 from schemes import scheme_allergie
@@ -95,6 +106,41 @@ def test_restaurant(db_session: SessionTesting):
         create_restaurant(db_session, rest_add_2)
 
 
+def test_restaurant_details(db_session: SessionTesting):
+    max_age = datetime.timedelta(hours=1)
+    rest = scheme_rest.Restaurant(
+        place_id="1234",
+        name="Rest 1 nice",
+        geometry=scheme_rest.Geometry(location=scheme_rest.LocationRest(lat="47", lng="9", adr="Street 1")),
+        homepage="https://nice.rest/",
+        maps_url="https://maps.google.com/?cid=1",
+        phone_number="+49 1234",
+    )
+
+    # No details without a restaurant
+    assert get_restaurant_details(db_session, rest.place_id, max_age) is None
+
+    # No details for a restaurant that was only created
+    create_restaurant(db_session, rest)
+    assert get_restaurant_details(db_session, rest.place_id, max_age) is None
+
+    # Save the details
+    update_restaurant_details(db_session, rest)
+    rest_return = get_restaurant_details(db_session, rest.place_id, max_age)
+    assert rest_return.homepage == rest.homepage
+    assert rest_return.maps_url == rest.maps_url
+    assert rest_return.phone_number == rest.phone_number
+    assert rest_return.address == rest.geometry.location.adr
+
+    # Details are too old
+    assert get_restaurant_details(db_session, rest.place_id, datetime.timedelta(seconds=-1)) is None
+
+    # Create the restaurant with the details
+    rest.place_id = "567"
+    update_restaurant_details(db_session, rest)
+    assert get_restaurant_details(db_session, rest.place_id, max_age).name == rest.name
+
+
 def test_user(db_session: SessionTesting):
     # Add two users
     # ...first user
@@ -191,6 +237,14 @@ def test_restaurant_bewertung(db_session: SessionTesting):
     assert assessment_ret.rating == assessment_add_1_1.rating
     assert assessment_ret.zeitstempel is not None
 
+    # Get the ratings of one user to many rests
+    place_ids = [rest_add_1.place_id, rest_add_2.place_id, fake_rest.place_id]
+    ratings_ret = restBewertung.get_ratings_from_user_to_rests(db_session, user_add_1, place_ids)
+    assert ratings_ret == {rest_add_1.place_id: 1.5, rest_add_2.place_id: 2.5}
+    assert restBewertung.get_ratings_from_user_to_rests(db_session, user_add_2, place_ids) == {rest_add_2.place_id: 3.5}
+    assert restBewertung.get_ratings_from_user_to_rests(db_session, fake_user, place_ids) == {}
+    assert restBewertung.get_ratings_from_user_to_rests(db_session, user_add_1, []) == {}
+
     # Update assessment
     updated_1_1 = assessment_add_1_1.copy()
     updated_1_1.comment = "UPDATED"
@@ -244,6 +298,31 @@ def test_restaurant_bewertung(db_session: SessionTesting):
         restBewertung.create_bewertung(db_session, assessment_add_2_2)
 
 
+def test_placeholder_bewertung(db_session: SessionTesting):
+    user = scheme_user.UserCreate(email="test1@demo.lol", password="password1")
+    rest = scheme_rest.RestaurantBase(place_id="1234", name="Rest 1")
+    create_user(db_session, user)
+    version = get_ratings_version(db_session, user.email)
+
+    # Restaurant and assessment are created once
+    assert restBewertung.create_placeholder_bewertung(db_session, user, rest) is True
+    assert restBewertung.create_placeholder_bewertung(db_session, user, rest) is False
+    assert get_restaurant_by_id(db_session, rest.place_id).name == rest.name
+    assessment_ret = restBewertung.get_bewertung_from_user_to_rest(db_session, user, rest)
+    assert assessment_ret.rating == 0
+    assert assessment_ret.kommentar == ""
+    assert get_ratings_version(db_session, user.email) == version + 1
+
+    # Existing restaurant and assessment are not changed
+    restBewertung.update_bewertung(
+        db_session,
+        scheme_rest.RestBewertungCreate(name=rest.name, person=user, restaurant=rest),
+        scheme_rest.RestBewertungCreate(name=rest.name, rating=4, person=user, restaurant=rest),
+    )
+    assert restBewertung.create_placeholder_bewertung(db_session, user, rest) is False
+    assert restBewertung.get_bewertung_from_user_to_rest(db_session, user, rest).rating == 4
+
+
 def test_recipe_bewertung(db_session: SessionTesting):
     fake_user = scheme_user.UserBase(email="fake@nope.ok")
     fake_rest = scheme_recipe.RecipeBase(id="884488")
@@ -392,6 +471,9 @@ def test_filterRest(db_session: SessionTesting, add_allergies, add_cuisines):
     assert filterRest_update.radius == filterRest_return.radius
     assert filterRest_update.rating == filterRest_return.rating
     # assert filterRest_update.cuisines.value == filterRest_return.cuisine
+    assert filter_content_hash(filterRest_update) == get_filter_hash(db_session, person1)
+    assert filter_content_hash(filterRest_update) != filter_content_hash(filterRest_person1)
+    assert get_filter_hash(db_session, person_fail) is None
 
     # Try updated with non existing User
     with pytest.raises(UserNotFound):
@@ -412,3 +494,54 @@ def test_cuisine_add(db_session: SessionTesting):
     for cuisine in Cuisine:
         added_allergie = create_cuisine(db_session, cuisine)
         assert cuisine.value == added_allergie.name
+
+
+def test_upgrade_tables(tmp_path):
+    old_engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    # Tables like they were created by the first version
+    with old_engine.begin() as connection:
+        connection.execute(
+            text("CREATE TABLE restaurant (place_id VARCHAR NOT NULL PRIMARY KEY, name VARCHAR NOT NULL)")
+        )
+        connection.execute(text("INSERT INTO restaurant (place_id, name) VALUES ('42', 'Alt')"))
+        connection.execute(
+            text(
+                "CREATE TABLE person (email VARCHAR NOT NULL PRIMARY KEY, hashed_password VARCHAR NOT NULL,"
+                " last_login DATETIME DEFAULT (CURRENT_TIMESTAMP) NOT NULL)"
+            )
+        )
+        connection.execute(text("INSERT INTO person (email, hashed_password) VALUES ('alt@mail.de', 'x')"))
+        connection.execute(
+            text(
+                'CREATE TABLE "filterRest" (email VARCHAR NOT NULL PRIMARY KEY REFERENCES person (email),'
+                " manuell_location VARCHAR(5) NOT NULL, radius INTEGER NOT NULL, rating INTEGER NOT NULL,"
+                " costs INTEGER NOT NULL)"
+            )
+        )
+        connection.execute(
+            text(
+                'INSERT INTO "filterRest" (email, manuell_location, radius, rating, costs)'
+                " VALUES ('alt@mail.de', '88045', 5000, 3, 2)"
+            )
+        )
+
+    added = upgrade_tables(old_engine)
+    assert "restaurant.details_fetched_at" in added
+    assert "person.ratings_version" in added
+    assert "filterRest.content_hash" in added
+    assert upgrade_tables(old_engine) == []
+    # Missing tables are created as usual
+    assert "association_filter_cuisine" not in inspect(old_engine).get_table_names()
+    Base.metadata.create_all(bind=old_engine)
+
+    with sessionmaker(bind=old_engine)() as session:
+        restaurant = get_restaurant_by_id(session, "42")
+        assert restaurant.name == "Alt"
+        assert restaurant.homepage is None
+        assert restaurant.details_fetched_at is None
+        # Existing users got the server default
+        assert get_user_by_mail(session, "alt@mail.de").email == "alt@mail.de"
+        assert get_ratings_version(session, "alt@mail.de") == 0
+        # Filters of the old version got no hash until the next update
+        assert get_filter_from_user(session, UserBase(email="alt@mail.de")).radius == 5000
+        assert get_filter_hash(session, UserBase(email="alt@mail.de")) is None
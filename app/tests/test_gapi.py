@@ -1,3 +1,4 @@
+import asyncio
 import json
 from typing import List
 
@@ -7,8 +8,19 @@ from pytest_httpx import HTTPXMock
 from pytest_mock import MockerFixture
 
 from schemes import Cuisine
+from schemes.exceptions import GoogleApiException
+from schemes.exceptions import GoogleApiLimitException
+from schemes.exceptions import GoogleApiUnavailableException
+from schemes.exceptions import NoneExcistingLocationException
+from schemes.scheme_cuisine import PydanticCuisine
+from schemes.scheme_filter import FilterRest
+from schemes.scheme_rest import LocationBase
 from schemes.scheme_rest import Restaurant
+from schemes.scheme_rest import RestaurantCandidate
 from tools import gapi
+from tools.circuit_breaker import BreakerState
+from tools.ratelimit import QuotaBudget
+from tools.ratelimit import TokenBucket
 
 
 @pytest.fixture
@@ -18,8 +30,8 @@ def fake_nearby_search() -> dict:
 
 
 @pytest.fixture
-def fake_nearby_search_restaurants(fake_nearby_search: str) -> List[Restaurant]:
-    return [Restaurant(**value) for value in fake_nearby_search.get("results")]
+def fake_nearby_search_restaurants(fake_nearby_search: str) -> List[RestaurantCandidate]:
+    return [RestaurantCandidate.from_result(value) for value in fake_nearby_search.get("results")]
 
 
 @pytest.fixture
@@ -35,13 +47,29 @@ def fake_restaurants() -> List[Restaurant]:
         return [Restaurant(**value) for value in fake_restaurants]
 
 
+@pytest.fixture
+def rest_filter() -> FilterRest:
+    return FilterRest(
+        cuisines=[
+            PydanticCuisine(name=Cuisine.ITALIAN.value),
+            PydanticCuisine(name=Cuisine.GERMAN.value),
+            PydanticCuisine(name=Cuisine.DOENER.value),
+        ],
+        allergies=None,
+        rating=3,
+        costs=3,
+        radius=5000,
+        location=LocationBase(lat="42", lng="42"),
+    )
+
+
 @pytest.mark.parametrize("status_code", [100, 200, 300, 400])
 def test_nearby_search(
     mocker: MockerFixture,
     httpx_mock: HTTPXMock,
     status_code: int,
     fake_nearby_search: dict,
-    fake_nearby_search_restaurants: List[Restaurant],
+    fake_nearby_search_restaurants: List[RestaurantCandidate],
 ):
     # Fake Datas
     params: dict = {
@@ -60,17 +88,187 @@ def test_nearby_search(
 
     if status_code != 200:
         with pytest.raises(httpx.HTTPStatusError):
-            gapi.nearby_search(params)
+            asyncio.run(gapi.nearby_search(params))
     else:
-        restaurants = gapi.nearby_search(params)
+        restaurants = asyncio.run(gapi.nearby_search(params))
         assert fake_nearby_search_restaurants == restaurants
 
 
+def test_nearby_search_cache(
+    mocker: MockerFixture,
+    httpx_mock: HTTPXMock,
+    fake_nearby_search: dict,
+    fake_nearby_search_restaurants: List[RestaurantCandidate],
+):
+    params: dict = {
+        "keyword": Cuisine.DOENER.value,
+        "location": "47.65,9.48",
+        "opennow": True,
+        "radius": 5000,
+        "maxprice": 2,
+        "type": "restaurant",
+        "language": "de",
+    }
+    httpx_mock.add_response(status_code=200, json=fake_nearby_search)
+    mocker.patch("tools.config.Setting.GOOGLE_API_KEY", "42")
+
+    assert asyncio.run(gapi.nearby_search(dict(params))) == fake_nearby_search_restaurants
+
+    # Some meters away is the same grid cell
+    params["location"] = "47.6501,9.4801"
+    assert asyncio.run(gapi.nearby_search(dict(params))) == fake_nearby_search_restaurants
+    assert len(httpx_mock.get_requests()) == 1
+
+    # Other keyword needs a new request
+    params["keyword"] = Cuisine.ITALIAN.value
+    asyncio.run(gapi.nearby_search(dict(params)))
+    assert len(httpx_mock.get_requests()) == 2
+    assert gapi.nearby_cache.hits == 1
+
+
+def test_nearby_search_pages(
+    mocker: MockerFixture,
+    httpx_mock: HTTPXMock,
+    fake_nearby_search: dict,
+    fake_nearby_search_restaurants: List[RestaurantCandidate],
+):
+    params: dict = {"keyword": Cuisine.DOENER.value, "location": "47.65,9.48", "radius": 5000}
+    pages = [
+        dict(fake_nearby_search, next_page_token="page2"),
+        {"html_attributions": [], "results": [], "status": "INVALID_REQUEST"},
+        dict(fake_nearby_search, next_page_token="page3"),
+        fake_nearby_search,
+    ]
+
+    def next_page(request: httpx.Request, *args, **kwargs) -> httpx.Response:
+        return httpx.Response(status_code=200, json=pages.pop(0))
+
+    httpx_mock.add_callback(next_page)
+    mocker.patch("tools.config.Setting.GOOGLE_API_KEY", "42")
+    sleep = mocker.patch("tools.gapi.asyncio.sleep")
+
+    # Stop after max_pages and retry the page token until it is valid
+    restaurants = asyncio.run(gapi.nearby_search(params, max_pages=2))
+    assert restaurants == fake_nearby_search_restaurants * 2
+    assert [request.url.params.get("pagetoken") for request in httpx_mock.get_requests()] == [None, "page2", "page2"]
+    assert sleep.call_count == 2
+    assert "key" not in params and "pagetoken" not in params
+
+    # Enough results after the first page
+    gapi.nearby_cache.clear()
+    pages[:] = [dict(fake_nearby_search, next_page_token="page2")] * 2
+    restaurants = asyncio.run(gapi.nearby_search(params, min_results=20))
+    assert len(restaurants) == 20
+    assert len(httpx_mock.get_requests()) == 4
+
+    # No time left for the next page. The incomplete result is cached for a shorter time
+    mocker.patch("tools.config.Setting.GOOGLE_PAGE_TOKEN_DELAY", 2)
+    mocker.patch("tools.config.Setting.GOOGLE_NEARBY_PARTIAL_CACHE_TTL", 60)
+    now = mocker.patch.object(gapi.nearby_cache, "_clock", return_value=1000.0)
+    restaurants = asyncio.run(gapi.nearby_search(params, deadline=1))
+    assert len(restaurants) == 20
+    assert len(httpx_mock.get_requests()) == 5
+    assert len(gapi.nearby_cache) == 2
+
+    # The same search again from the cache
+    assert asyncio.run(gapi.nearby_search(params, deadline=1)) == restaurants
+    assert len(httpx_mock.get_requests()) == 5
+
+    # After the partial ttl the pages are loaded again
+    now.return_value = 1061.0
+    pages.append(dict(fake_nearby_search, next_page_token="page2"))
+    asyncio.run(gapi.nearby_search(params, deadline=1))
+    assert len(httpx_mock.get_requests()) == 6
+
+
+def test_nearby_search_coalesce(
+    mocker: MockerFixture,
+    httpx_mock: HTTPXMock,
+    fake_nearby_search: dict,
+    fake_nearby_search_restaurants: List[RestaurantCandidate],
+):
+    params: dict = {"keyword": Cuisine.DOENER.value, "location": "47.65,9.48", "radius": 5000}
+    httpx_mock.add_response(status_code=200, json=fake_nearby_search)
+    mocker.patch("tools.config.Setting.GOOGLE_API_KEY", "42")
+
+    async def search_together():
+        return await asyncio.gather(*[gapi.nearby_search(dict(params)) for _ in range(3)])
+
+    results = asyncio.run(search_together())
+    assert all(result == fake_nearby_search_restaurants for result in results)
+    # Everyone got an own copy
+    assert results[0][0] is not results[1][0]
+    assert len(httpx_mock.get_requests()) == 1
+    assert gapi.inflight.deduplicated == 2
+
+
+def test_google_api_limits(
+    mocker: MockerFixture, httpx_mock: HTTPXMock, fake_place_details: dict, fake_restaurants: List[Restaurant]
+):
+    httpx_mock.add_response(status_code=200, json=fake_place_details[0])
+    mocker.patch("tools.config.Setting.GOOGLE_API_KEY", "42")
+    mocker.patch.object(gapi, "quota", QuotaBudget(limit=1))
+
+    asyncio.run(gapi.place_details(fake_restaurants[0]))
+
+    # Daily quota used up
+    with pytest.raises(GoogleApiLimitException):
+        asyncio.run(gapi.place_details(fake_restaurants[0]))
+    assert gapi.quota.stats() == {"limit": 1, "used": 1, "remaining": 0}
+
+    # Rate limit reached
+    mocker.patch.dict(gapi.rate_limits, {"details": TokenBucket(rate=1, capacity=0, max_wait=0)})
+    with pytest.raises(GoogleApiLimitException):
+        asyncio.run(gapi.place_details(fake_restaurants[0]))
+    assert len(httpx_mock.get_requests()) == 1
+
+
+def test_google_api_circuit_breaker(
+    mocker: MockerFixture,
+    httpx_mock: HTTPXMock,
+    fake_nearby_search: dict,
+    fake_nearby_search_restaurants: List[RestaurantCandidate],
+):
+    params: dict = {"keyword": Cuisine.DOENER.value, "location": "47.65,9.48", "radius": 5000}
+    mocker.patch("tools.config.Setting.GOOGLE_API_KEY", "42")
+    mocker.patch.object(gapi.nearby_cache, "ttl", -1)
+    mocker.patch.object(gapi.breaker, "min_calls", 3)
+
+    # Fill the cache with an (already expired) result
+    httpx_mock.add_response(status_code=200, json=fake_nearby_search)
+    asyncio.run(gapi.nearby_search(dict(params)))
+
+    # Open the circuit after two failed requests. The expired result is used
+    httpx_mock.reset(assert_all_responses_were_requested=False)
+    httpx_mock.add_response(status_code=503)
+    for _ in range(2):
+        with pytest.raises(httpx.HTTPStatusError):
+            asyncio.run(gapi.nearby_search(dict(params)))
+    assert gapi.breaker.state == BreakerState.OPEN
+
+    assert asyncio.run(gapi.nearby_search(dict(params))) == fake_nearby_search_restaurants
+    assert len(httpx_mock.get_requests()) == 3
+
+    # Reject immediately if nothing is cached
+    params["keyword"] = Cuisine.ITALIAN.value
+    with pytest.raises(GoogleApiUnavailableException):
+        asyncio.run(gapi.nearby_search(dict(params)))
+    assert len(httpx_mock.get_requests()) == 3
+    assert gapi.stats()["circuit_breaker"]["rejected"] == 2
+
+
+def test_restaurant_candidate(fake_nearby_search: dict):
+    for result in fake_nearby_search.get("results"):
+        candidate = RestaurantCandidate.from_result(result)
+        assert candidate.to_restaurant() == Restaurant.parse_obj(result)
+        assert candidate.copy() == candidate and candidate.copy() is not candidate
+
+
 def test_place_details(
     httpx_mock: HTTPXMock,
     fake_place_details: dict,
     fake_restaurants: List[Restaurant],
-    fake_nearby_search_restaurants: List[Restaurant],
+    fake_nearby_search_restaurants: List[RestaurantCandidate],
     mocker: MockerFixture,
 ):
 
@@ -80,5 +278,76 @@ def test_place_details(
     # Mock other functions
     mocker.patch("tools.config.Setting.GOOGLE_API_KEY", "42")
 
-    restaurant = gapi.place_details(fake_nearby_search_restaurants[0])
+    restaurant = asyncio.run(gapi.place_details(fake_nearby_search_restaurants[0].to_restaurant()))
     assert fake_restaurants[0] == restaurant
+
+
+def test_geocode(httpx_mock: HTTPXMock):
+    location = {"geometry": {"location": {"lat": 47.65, "lng": 9.48}}}
+    httpx_mock.add_response(status_code=200, json={"status": "OK", "results": [location]})
+    httpx_mock.add_response(status_code=200, json={"status": "ZERO_RESULTS", "results": []})
+    httpx_mock.add_response(status_code=200, json={"status": "REQUEST_DENIED", "results": []})
+
+    assert asyncio.run(gapi.geocode("88045 Friedrichshafen")) == [location]
+    with pytest.raises(NoneExcistingLocationException):
+        asyncio.run(gapi.geocode("Nirgendwo"))
+    # A failed request is no missing location
+    with pytest.raises(GoogleApiException) as error:
+        asyncio.run(gapi.geocode("88045 Friedrichshafen"))
+    assert not isinstance(error.value, NoneExcistingLocationException)
+
+
+def test_shared_client():
+    asyncio.run(gapi.open_client())
+    client = gapi.get_client()
+    assert client is gapi.get_client()
+    assert not client.is_closed
+
+    asyncio.run(gapi.close_client())
+    assert client.is_closed
+    assert gapi.get_client() is not client
+
+
+def test_search_restaurant_concurrent(
+    mocker: MockerFixture, rest_filter: FilterRest, fake_nearby_search_restaurants: List[RestaurantCandidate]
+):
+    keywords = [cuisine.name for cuisine in rest_filter.cuisines]
+    running = 0
+    max_running = 0
+
+    async def fake_search(params: dict, **kwargs) -> List[RestaurantCandidate]:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        index = keywords.index(params["keyword"])
+        # The first cuisine finishes last
+        await asyncio.sleep(0.01 * (len(keywords) - index))
+        running -= 1
+        return [fake_nearby_search_restaurants[index]]
+
+    mocker.patch("tools.config.Setting.GOOGLE_MAX_CONCURRENT_SEARCHES", 2)
+    mocker.patch("tools.gapi.nearby_search", side_effect=fake_search)
+
+    restaurants = asyncio.run(gapi.search_restaurant(rest_filter))
+    assert restaurants == fake_nearby_search_restaurants[: len(keywords)]
+    assert max_running == 2
+
+
+def test_search_restaurant_cancel_on_error(mocker: MockerFixture, rest_filter: FilterRest):
+    cancelled = []
+
+    async def fake_search(params: dict, **kwargs) -> List[RestaurantCandidate]:
+        if params["keyword"] == Cuisine.GERMAN.value:
+            raise httpx.ConnectError("No connection")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(params["keyword"])
+            raise
+        return []
+
+    mocker.patch("tools.gapi.nearby_search", side_effect=fake_search)
+
+    with pytest.raises(GoogleApiException):
+        asyncio.run(gapi.search_restaurant(rest_filter))
+    assert sorted(cancelled) == sorted([Cuisine.ITALIAN.value, Cuisine.DOENER.value])
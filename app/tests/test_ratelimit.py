@@ -0,0 +1,68 @@
+import asyncio
+import datetime
+
+from tools.ratelimit import QuotaBudget
+from tools.ratelimit import TokenBucket
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 0.0
+
+    def clock(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def test_token_bucket():
+    fake_time = FakeTime()
+    bucket = TokenBucket(rate=2, capacity=2, max_wait=1, clock=fake_time.clock, sleep=fake_time.sleep)
+
+    async def acquire_all(count: int):
+        return [await bucket.acquire() for _ in range(count)]
+
+    # Burst of two, then wait 0.5s for every token until max_wait
+    assert asyncio.run(acquire_all(2)) == [True, True]
+    assert fake_time.now == 0
+    assert asyncio.run(acquire_all(1)) == [True]
+    assert fake_time.now == 0.5
+
+    # Fail fast if the wait would be too long
+    bucket.max_wait = 0.1
+    assert asyncio.run(acquire_all(1)) == [False]
+    assert bucket.stats()["rejected"] == 1
+
+    # Refill after some time
+    fake_time.now += 10
+    assert bucket.tokens == 2
+
+
+def test_token_bucket_queue():
+    fake_time = FakeTime()
+    bucket = TokenBucket(rate=1, capacity=1, max_wait=2, clock=fake_time.clock, sleep=lambda _: asyncio.sleep(0))
+
+    async def acquire_together():
+        return await asyncio.gather(*[bucket.acquire() for _ in range(4)])
+
+    # One token now, two reserved tokens in the next two seconds and one rejected
+    assert sorted(asyncio.run(acquire_together())) == [False, True, True, True]
+
+
+def test_quota_budget():
+    day = datetime.date(2022, 1, 1)
+    budget = QuotaBudget(limit=2, today=lambda: day)
+
+    assert budget.consume()
+    assert budget.consume()
+    assert not budget.consume()
+    assert budget.stats() == {"limit": 2, "used": 2, "remaining": 0}
+
+    day = datetime.date(2022, 1, 2)
+    assert budget.remaining == 2
+    assert budget.consume()
+
+    unlimited = QuotaBudget(limit=0)
+    assert all(unlimited.consume() for _ in range(100))
+    assert unlimited.remaining is None
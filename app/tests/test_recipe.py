@@ -1,7 +1,6 @@
 from datetime import timedelta
 
 import numpy as np
-import pandas
 import pytest
 from pytest_mock import MockerFixture
 from sqlalchemy import create_engine
@@ -55,54 +54,52 @@ def created_user(db_session: SessionTesting):
     return new_user
 
 
-def test_create_dataframe():
+def test_create_recipe_db():
     try:
         RecipeDB()
     except Exception:
-        assert False, "Can not create Panda_Dataframe"
+        assert False, "Can not load the recipe store"
     else:
-        assert True, "Dataframe created"
+        assert True, "Recipe store loaded"
 
 
 def test_filter_cooktime(recipe_db: RecipeDB, recipe_filter: FilterRecipe):
-    recipe_df = recipe_db.filter_cooktime(recipe_db.pd_frame, recipe_filter.total_time)
-    assert recipe_df is not None
+    recipe_rows = recipe_db.filter_cooktime(recipe_filter.total_time)
+    seconds = recipe_db.store.total_time.seconds[recipe_rows]
+    assert (seconds <= recipe_filter.total_time.total_seconds()).all()
+    assert (seconds[:-1] <= seconds[1:]).all()
 
 
 def test_filter_keyword(recipe_db: RecipeDB, recipe_filter: FilterRecipe):
-    recipe_df = recipe_db.filter_keyword(recipe_db.pd_frame, recipe_filter.keyword)
-    assert recipe_df is not None
+    recipe_rows = recipe_db.filter_keyword(recipe_filter.keyword)
+    assert len(recipe_rows) > 0
+    assert (recipe_rows[:-1] < recipe_rows[1:]).all()
+
+
+def test_get_recipe(recipe_db: RecipeDB):
+    recipe = recipe_db.get_recipe(0)
+    assert recipe.id
+    assert recipe.name
 
 
 def test_search_recipe(
     mocker: MockerFixture, recipe_filter: FilterRecipe, created_user: User, db_session: SessionTesting
 ):
-    random_recipe_df = pandas.DataFrame(
-        {
-            "_id.$oid": "11123123123",
-            "name": "Lecker Fleisch",
-            "ingredients": "Alles kochen",
-            "url": "https://random.url/",
-            "image": np.nan,
-            "cookTime": pandas.Timedelta(timedelta(minutes=20)),
-            "prepTime": pandas.Timedelta(timedelta(minutes=10)),
-        },
-        index=[0],
-    )
-
     random_recipe = Recipe(
-        id=random_recipe_df["_id.$oid"][0],
-        name=random_recipe_df["name"][0],
-        ingredients=random_recipe_df["ingredients"][0],
-        url=random_recipe_df["url"][0],
-        image=random_recipe_df["image"][0],
-        cookTime=random_recipe_df["cookTime"][0],
-        prepTime=random_recipe_df["prepTime"][0],
+        id="11123123123",
+        name="Lecker Fleisch",
+        ingredients="Alles kochen",
+        url="https://random.url/",
+        image=None,
+        cookTime=timedelta(minutes=20),
+        prepTime=timedelta(minutes=10),
     )
 
-    mocker.patch("pandas.DataFrame.sample", return_value=random_recipe_df)
+    mocker.patch("random.choice", return_value=42)
+    get_recipe = mocker.patch("tools.recipe_db.RecipeDB.get_recipe", return_value=random_recipe)
     recipe_return = service_rec.search_recipe(db_session=db_session, user=created_user, recipe_filter=recipe_filter)
     assert recipe_return == random_recipe
+    get_recipe.assert_called_once_with(42)
 
 
 def test_search_recipe_cooktime_error(
@@ -113,7 +110,7 @@ def test_search_recipe_cooktime_error(
     db_session: SessionTesting,
 ):
     recipe_filter.total_time = timedelta(seconds=0)
-    mocked_return = pandas.core.series.Series(data=[False for _ in range(recipe_db.pd_frame.shape[0])])
+    mocked_return = np.empty(0, dtype=np.int32)
     mocker.patch("tools.recipe_db.RecipeDB.filter_cooktime", return_value=mocked_return)
 
     with pytest.raises(RecipeNotFound):
@@ -128,7 +125,7 @@ def test_search_recipe_keyword_error(
     db_session: SessionTesting,
 ):
     recipe_filter.keyword = "So etwas steht nicht in der DB"
-    mocked_return = pandas.core.series.Series(data=[False for _ in range(recipe_db.pd_frame.shape[0])])
+    mocked_return = np.empty(0, dtype=np.int32)
     mocker.patch("tools.recipe_db.RecipeDB.filter_keyword", return_value=mocked_return)
 
     with pytest.raises(RecipeNotFound):
@@ -0,0 +1,279 @@
+import json
+import math
+import mmap
+import os
+import random
+from pathlib import Path
+from typing import List
+
+import numpy
+import pytest
+from pytest_mock import MockerFixture
+
+from tools import recipe_store
+from tools.recipe_store import StringColumn
+from tools.recipe_store import TokenIndex
+from tools.recipe_store import TotalTimeIndex
+from tools.recipe_store import TrigramIndex
+
+
+RECIPES = [
+    {
+        "_id": {"$oid": "5160756b96cc62079cc2db15"},
+        "name": "Drop Biscuits and Sausage Gravy",
+        "ingredients": "Biscuits\n3 cups All-purpose Flour",
+        "url": "http://thepioneerwoman.com/cooking/2013/03/drop-biscuits-and-sausage-gravy/",
+        "image": "http://static.thepioneerwoman.com/cooking/files/2013/03/bisgrav.jpg",
+        "cookTime": "PT30M",
+        "prepTime": "PT10M",
+        "description": "Late Saturday afternoon, after Marlboro Man had returned home",
+    },
+    {
+        "_id": {"$oid": "5160756d96cc62079cc2db16"},
+        "name": "Hot Roast Beef Sandwiches",
+        "ingredients": "12 whole Dinner Rolls Or Small Sandwich Buns (I Used Whole Wheat)",
+        "url": "http://thepioneerwoman.com/cooking/2013/03/hot-roast-beef-sandwiches/",
+        "cookTime": "PT20M",
+        "prepTime": "Nicht definiert",
+        "recipeInstructions": "Bake the rolls",
+    },
+    {
+        "_id": {"$oid": "5160756f96cc6207a37ff777"},
+        "name": "Bandnudeln mit Käse",
+        "ingredients": "Nudeln",
+        "url": "http://www.101cookbooks.com/archives/bandnudeln.html",
+        "image": "http://static.thepioneerwoman.com/cooking/files/2013/03/bisgrav.jpg",
+        "prepTime": "PT1H5M",
+        "description": ["Not a text"],
+    },
+]
+
+
+def write_recipes(path: Path, recipes: List[dict]) -> None:
+    with open(path, mode="w", encoding="utf-8") as file:
+        for recipe in recipes:
+            file.write(json.dumps(recipe, ensure_ascii=False) + "\n")
+
+
+@pytest.fixture
+def json_path(tmp_path: Path) -> Path:
+    path = tmp_path / "recipeitems.json"
+    write_recipes(path, RECIPES)
+    return path
+
+
+def test_string_column():
+    column = StringColumn.from_values(["Käse", None, "Nudeln", "Käse"])
+
+    assert column.unique == 2
+    assert column.codes.tolist() == [0, -1, 1, 0]
+    assert [column[row] for row in range(len(column))] == ["Käse", None, "Nudeln", "Käse"]
+    assert column.to_numpy(missing="-").tolist() == ["Käse", "-", "Nudeln", "Käse"]
+
+    empty = StringColumn.from_values([None])
+    assert empty.unique == 0
+    assert empty.to_numpy().tolist() == [None]
+
+
+def test_string_column_find():
+    column = StringColumn.from_values(["ab", "cd", "abc", "ab"])
+
+    assert column.find(b"ab").tolist() == [0, 2]
+    # "b" + "c" of the first two values is no match
+    assert column.find(b"bc").tolist() == [2]
+    assert column.find(b"x").tolist() == []
+
+
+def test_token_index():
+    index = TokenIndex.build(
+        ["drop biscuits\x00biscuits", "hot roast beef\x00", "bandnudeln mit käse\x00", "käse biscuits"]
+    )
+
+    assert len(index) == 8
+    assert [index.token(token_id) for token_id in range(3)] == [b"bandnudeln", b"beef", b"biscuits"]
+    assert index.lookup("biscuits") == 2
+    assert index.lookup("nudeln") == -1
+    assert index.lookup("zzz") == -1
+    assert index.rows(index.lookup("biscuits")).tolist() == [0, 3]
+
+    assert index.search(["käse"]).tolist() == [2, 3]
+    assert index.search(["käse", "biscuits"]).tolist() == [3]
+    assert index.search(["käse", "beef"]).tolist() == []
+    assert index.search(["käse", "unknown"]).tolist() == []
+
+
+def test_trigram_index():
+    tokens = TokenIndex.build(["bandnudeln nudeln käse\x00", "nudel\x00", "käsespätzle\x00"])
+    index = TrigramIndex.build(tokens)
+    token_ids = {tokens.token(token_id): token_id for token_id in range(len(tokens))}
+
+    candidates = [tokens.token(token_id) for token_id in index.candidates(b"nudel")]
+    assert candidates == [b"bandnudeln", b"nudel", b"nudeln"]
+    assert index.candidates("käse".encode("utf-8")).tolist() == [
+        token_ids["käse".encode("utf-8")],
+        token_ids["käsespätzle".encode("utf-8")],
+    ]
+    assert index.candidates(b"xyz").tolist() == []
+
+    # Candidates are only a preselection
+    assert [tokens.token(token_id) for token_id in tokens.find(b"nud")] == [b"bandnudeln", b"nudel", b"nudeln"]
+    assert tokens.union(index.candidates(b"nudel"), 3).tolist() == [0, 1]
+
+
+def test_intersect_sorted():
+    first = numpy.array([1, 3, 5, 7, 9])
+    assert recipe_store.intersect_sorted([first]).tolist() == [1, 3, 5, 7, 9]
+    assert recipe_store.intersect_sorted([first, numpy.array([0, 3, 9, 10])]).tolist() == [3, 9]
+    assert recipe_store.intersect_sorted([first, numpy.array([3, 9]), numpy.array([2, 9])]).tolist() == [9]
+    assert recipe_store.intersect_sorted([first, numpy.array([], dtype=int)]).tolist() == []
+
+
+def test_total_time_index():
+    rng = numpy.random.default_rng(3)
+    cook = rng.choice([numpy.nan, 0, 300, 600, 1200, 1800], size=500)
+    prep = rng.choice([numpy.nan, 0, 60, 600, 3600], size=500)
+    index = TotalTimeIndex.build(cook, prep)
+    total = cook + prep
+
+    assert len(index.order) == numpy.count_nonzero(numpy.isfinite(total))
+    assert (numpy.diff(index.sorted_seconds) >= 0).all()
+    for limit in [-1, 0, 59, 600, 1000, 1800, 5400, 10000]:
+        expected = numpy.flatnonzero(total <= limit)
+        assert index.count(limit) == len(expected)
+        assert sorted(index.rows(limit).tolist()) == expected.tolist()
+        # Fewer and more rows than recipes in time
+        for size in [0, 5, 100, 500]:
+            rows = numpy.sort(rng.choice(500, size=size, replace=False)).astype(numpy.int32)
+            assert index.rows(limit, rows).tolist() == rows[total[rows] <= limit].tolist(), (limit, size)
+
+
+def test_build_store(json_path: Path):
+    store = recipe_store.build_store(json_path)
+
+    assert store.path == json_path.with_suffix(".store")
+    assert store.size == 3
+    assert store.meta["source"]["sha256"] == recipe_store.file_checksum(json_path)
+
+    ids = store.texts("id")
+    assert [ids[row] for row in range(store.size)] == [recipe["_id"]["$oid"] for recipe in RECIPES]
+    assert store.texts("name")[2] == "Bandnudeln mit Käse"
+    assert store.texts("recipeInstructions")[1] == "Bake the rolls"
+    # Missing or no text
+    assert store.texts("image")[1] is None
+    assert store.texts("description")[2] is None
+    # Same image only once in the blob
+    assert store.texts("image").unique == 1
+
+    assert store.search[1] == "hot roast beef sandwiches\x00\x00bake the rolls\x00"
+    assert store.search[2] == "bandnudeln mit käse\x00\x00\x00"
+
+    assert store.tokens.search(["biscuits", "gravy"]).tolist() == [0]
+    assert store.tokens.search(["käse"]).tolist() == [2]
+
+    # Memory mapped and read-only
+    assert isinstance(store.texts("name").blob, mmap.mmap)
+    assert isinstance(store.times("cookTime"), numpy.memmap)
+    with pytest.raises(ValueError):
+        store.times("cookTime")[0] = 0
+
+    assert store.times("cookTime")[:2].tolist() == [1800, 1200]
+    assert math.isnan(store.times("cookTime")[2])
+    assert store.times("prepTime")[2] == 3900
+    assert math.isnan(store.times("prepTime")[1])
+
+    # Only the first recipe got both times
+    assert store.total_time.seconds[0] == 2400
+    assert store.cooktime_rows(2400).tolist() == [0]
+    assert store.cooktime_rows(2399).tolist() == []
+    assert store.cooktime_rows(10**9, numpy.array([1, 2], dtype=numpy.int32)).tolist() == []
+
+
+def test_keyword_rows(json_path: Path):
+    store = recipe_store.build_store(json_path)
+
+    assert store.keyword_rows("NUDEL").tolist() == [2]
+    assert store.keyword_rows("Käse nudeln").tolist() == [2]
+    assert store.keyword_rows("roll").tolist() == [1]
+    assert store.keyword_rows("ee").tolist() == [1]
+    assert store.keyword_rows("afternoon,").tolist() == [0]
+    assert store.keyword_rows("afternoon;").tolist() == []
+    assert store.keyword_rows("biscuits käse").tolist() == []
+    assert store.keyword_rows("--").tolist() == []
+    assert store.keyword_rows("  ").tolist() == [0, 1, 2]
+    # Only name, description and recipeInstructions are searched
+    assert store.keyword_rows("thepioneerwoman").tolist() == []
+
+
+def test_keyword_rows_words(json_path: Path):
+    store = recipe_store.build_store(json_path)
+
+    # Every word is searched on its own and in every column, not the keyword as one phrase
+    assert store.keyword_rows("käse bandnudeln").tolist() == [2]
+    assert store.keyword_rows("roast rolls").tolist() == [1]
+    # The words are plain text and no regular expressions
+    assert store.keyword_rows("b.scuits").tolist() == []
+    assert store.keyword_rows("roast|käse").tolist() == []
+    assert store.keyword_rows("(gravy").tolist() == []
+
+
+def test_keyword_rows_like_scan(tmp_path: Path):
+    rng = random.Random(7)
+    syllables = ["nu", "del", "bra", "ten", "kä", "se", "ri", "ce", "-", " ", ", ", "ß", "o"]
+    recipes = [
+        {
+            "_id": {"$oid": str(row)},
+            "name": "".join(rng.choices(syllables, k=8)).title(),
+            "description": "".join(rng.choices(syllables, k=20)),
+            "recipeInstructions": "".join(rng.choices(syllables, k=30)),
+        }
+        for row in range(300)
+    ]
+    json_path = tmp_path / "recipeitems.json"
+    write_recipes(json_path, recipes)
+    store = recipe_store.build_store(json_path)
+
+    for _ in range(300):
+        keyword = "".join(rng.choices(syllables, k=rng.randint(1, 4)))
+        words = keyword.lower().split()
+        texts = [
+            "\x00".join(recipe[column].lower() for column in ("name", "description", "recipeInstructions"))
+            for recipe in recipes
+        ]
+        expected = [row for row, text in enumerate(texts) if all(word in text for word in words)]
+        assert store.keyword_rows(keyword).tolist() == expected, keyword
+
+
+def test_open_store(json_path: Path, mocker: MockerFixture):
+    build = mocker.spy(recipe_store, "build_store")
+
+    assert recipe_store.open_store(json_path).size == 3
+    assert build.call_count == 1
+
+    # Up to date -> load the store
+    assert recipe_store.open_store(json_path).size == 3
+    assert build.call_count == 1
+
+    # Same content with a new modification time -> only the checksum is calculated
+    stat = json_path.stat()
+    os.utime(json_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert recipe_store.open_store(json_path).size == 3
+    assert build.call_count == 1
+    assert recipe_store.open_store(json_path).meta["source"]["mtime_ns"] == stat.st_mtime_ns + 10**9
+
+    # Changed content -> build again
+    write_recipes(json_path, RECIPES[:2])
+    assert recipe_store.open_store(json_path).size == 2
+    assert build.call_count == 2
+
+    # Other layout of the store -> build again
+    meta_path = json_path.with_suffix(".store") / "meta.json"
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    meta["version"] = -1
+    meta_path.write_text(json.dumps(meta), encoding="utf-8")
+    assert recipe_store.open_store(json_path).size == 2
+    assert build.call_count == 3
+
+    # Without the source the store is still usable
+    json_path.unlink()
+    assert recipe_store.open_store(json_path, json_path.with_suffix(".store")).size == 2
+    assert build.call_count == 3
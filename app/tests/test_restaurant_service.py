@@ -1,3 +1,4 @@
+import asyncio
 import json
 from typing import List
 
@@ -11,21 +12,32 @@ import db
 from db.base_class import Base
 from db.crud.allergies import create_allergie
 from db.crud.cuisine import create_cuisine
+from db.crud.restaurant import create_restaurant
+from db.crud.restBewertung import create_bewertung
 from db.crud.user import create_user
 from schemes import Allergies
 from schemes import Cuisine
 from schemes import scheme_allergie
 from schemes import scheme_cuisine
+from schemes.exceptions import GoogleApiException
+from schemes.exceptions import GoogleApiLimitException
+from schemes.exceptions import GoogleApiUnavailableException
+from schemes.exceptions import NoneExcistingLocationException
+from schemes.exceptions import NoResultsException
 from schemes.scheme_allergie import PydanticAllergies
 from schemes.scheme_cuisine import PydanticCuisine
 from schemes.scheme_filter import FilterRest
 from schemes.scheme_filter import FilterRestDatabase
 from schemes.scheme_rest import LocationBase
 from schemes.scheme_rest import Restaurant
+from schemes.scheme_rest import RestaurantBase
+from schemes.scheme_rest import RestaurantCandidate
+from schemes.scheme_rest import RestBewertungCreate
 from schemes.scheme_user import User
 from schemes.scheme_user import UserBase
 from schemes.scheme_user import UserCreate
 from services import service_res
+from tools.ratelimit import QuotaBudget
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./tests/test_db.db"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
@@ -59,6 +71,17 @@ def rated_restaurants() -> List[Restaurant]:
         return [Restaurant(**value) for value in fake_restaurants]
 
 
+@pytest.fixture
+def rated_candidates() -> List[RestaurantCandidate]:
+    with open("tests/example_restaurants_with_own_rating.json", "r", encoding="utf8") as file:
+        candidates = []
+        for value in json.load(file):
+            candidate = RestaurantCandidate.from_result(value)
+            candidate.own_rating = value.get("own_rating")
+            candidates.append(candidate)
+        return candidates
+
+
 @pytest.fixture
 def google_api_restaurants() -> List[Restaurant]:
     with open("tests/example_restaurants.json", "r", encoding="utf8") as file:
@@ -72,6 +95,46 @@ def add_cuisines(db_session: SessionTesting) -> None:
         create_cuisine(db_session, cuisine)
 
 
+def test_get_coordinates_from_location(db_session: SessionTesting, mocker: MockerFixture):
+    geocode = mocker.patch("tools.gapi.geocode", return_value=[{"geometry": {"location": {"lat": 47.65, "lng": 9.48}}}])
+
+    location = asyncio.run(service_res.get_coordinates_from_location(db_session, "88045 Friedrichshafen"))
+    assert location == LocationBase(lat="47.65", lng="9.48")
+
+    # Same address with other spelling from the memory
+    location = asyncio.run(service_res.get_coordinates_from_location(db_session, " 88045  friedrichshafen"))
+    assert location == LocationBase(lat="47.65", lng="9.48")
+
+    # From the DB after a restart
+    service_res.geocode_cache.clear()
+    location = asyncio.run(service_res.get_coordinates_from_location(db_session, "88045 Friedrichshafen"))
+    assert location == LocationBase(lat="47.65", lng="9.48")
+    assert geocode.call_count == 1
+
+    # Also cache addresses without a result
+    geocode.side_effect = NoneExcistingLocationException("No geocode result")
+    for _ in range(2):
+        with pytest.raises(NoneExcistingLocationException):
+            asyncio.run(service_res.get_coordinates_from_location(db_session, "Nirgendwo"))
+    assert geocode.call_count == 2
+
+    # Do not cache if the limit of the Google API is reached
+    geocode.side_effect = GoogleApiLimitException("Too many requests")
+    for _ in range(2):
+        with pytest.raises(GoogleApiLimitException):
+            asyncio.run(service_res.get_coordinates_from_location(db_session, "Irgendwo"))
+    assert geocode.call_count == 4
+
+    # A valid address is not cached as missing if the Google API is not available or the request failed
+    for side_effect in [GoogleApiUnavailableException("Circuit open"), GoogleApiException("REQUEST_DENIED")]:
+        geocode.side_effect = side_effect
+        with pytest.raises(type(side_effect)):
+            asyncio.run(service_res.get_coordinates_from_location(db_session, "Überall"))
+    geocode.side_effect = None
+    location = asyncio.run(service_res.get_coordinates_from_location(db_session, "Überall"))
+    assert location == LocationBase(lat="47.65", lng="9.48")
+
+
 def test_get_rest_filter_from_user(db_session: SessionTesting, add_allergies, mocker: MockerFixture):
     allergies = [db.base.Allergie(name=Allergies.LACTOSE.value), db.base.Allergie(name=Allergies.WHEAT.value)]
     cuisines = [PydanticCuisine(name=Cuisine.GERMAN.value), PydanticCuisine(name=Cuisine.DOENER.value)]
@@ -123,7 +186,7 @@ def test_create_rest_filter(db_session: SessionTesting, add_allergies, add_cuisi
     assert scheme_filter_rest == created_rest
 
 
-def test_update_rest_filter(db_session: SessionTesting, add_allergies, add_cuisines):
+def test_update_rest_filter(db_session: SessionTesting, add_allergies, add_cuisines, mocker: MockerFixture):
     allergies = [db.base.Allergie(name=Allergies.LACTOSE.value), db.base.Allergie(name=Allergies.WHEAT.value)]
     cuisines = [PydanticCuisine(name=Cuisine.GERMAN.value), PydanticCuisine(name=Cuisine.DOENER.value)]
     db_user = create_user(db_session, UserCreate(email="nice@ok.test", password="geheim"))
@@ -147,28 +210,45 @@ def test_update_rest_filter(db_session: SessionTesting, add_allergies, add_cuisi
 
     assert updated_scheme_filter_rest == service_res.update_rest_filter(db_session, updated_scheme_filter_rest, user)
 
+    # Same filter again (other order of the cuisines) -> no write
+    update = mocker.spy(service_res.crud_filter, "update_filterRest")
+    unchanged = updated_scheme_filter_rest.copy()
+    unchanged.cuisines = list(reversed(unchanged.cuisines))
+    assert unchanged == service_res.update_rest_filter(db_session, unchanged, user)
+    update.assert_not_called()
+
+    unchanged.radius = 1000
+    assert service_res.update_rest_filter(db_session, unchanged, user).radius == 1000
+    update.assert_called_once()
+
 
 def test_search_for_restaurant(
     httpx_mock: HTTPXMock,
     db_session: SessionTesting,
     rated_restaurants: List[Restaurant],
-    google_api_restaurants: List[Restaurant],
+    rated_candidates: List[RestaurantCandidate],
     mocker: MockerFixture,
 ):
     # mocking...
     # ...random
     random_res = rated_restaurants[1]
-    mocker.patch("random.choices", return_value=[random_res])
+    mocker.patch("tools.sampling.WeightedSampler.sample", return_value=1)
 
     # ...fill_user_rating currently not function
-    mocker.patch("services.service_res.fill_user_rating", return_value=rated_restaurants)
+    mocker.patch("services.service_res.fill_user_rating", return_value=rated_candidates)
 
     # ...googleapi
-    mocker.patch("tools.gapi.search_restaurant", return_value=google_api_restaurants)
+    mocker.patch("tools.gapi.search_restaurant", return_value=rated_candidates)
     mocker.patch("tools.config.Setting.GOOGLE_API_KEY", "42")
 
     url = f"https://maps.googleapis.com/maps/api/place/details/json?key=42&place_id={random_res.place_id}"
-    httpx_mock.add_response(status_code=200, json={"result": random_res.dict()}, url=url)
+    details = {
+        "website": random_res.homepage,
+        "url": random_res.maps_url,
+        "international_phone_number": random_res.phone_number,
+        "formatted_address": random_res.geometry.location.adr,
+    }
+    httpx_mock.add_response(status_code=200, json={"result": details}, url=url)
 
     filter = FilterRest(
         cuisines=[scheme_cuisine.PydanticCuisine(name=Cuisine.DOENER.value)],
@@ -183,33 +263,293 @@ def test_search_for_restaurant(
     user = UserCreate(email="test@ok.de", password="geheim")
     create_user(db_session, user)
 
-    return_res = service_res.search_for_restaurant(db_session, user, filter)
+    return_res = asyncio.run(service_res.search_for_restaurant(db_session, user, filter))
     assert return_res == random_res
 
 
-def test_fill_user_rating():
-    pass
+def test_reroll_restaurant(
+    db_session: SessionTesting, rated_candidates: List[RestaurantCandidate], mocker: MockerFixture
+):
+    async def no_details(db_session, restaurant: Restaurant) -> Restaurant:
+        return restaurant
 
+    search = mocker.patch("tools.gapi.search_restaurant", return_value=rated_candidates)
+    mocker.patch("services.service_res.fill_restaurant_details", side_effect=no_details)
+    user = UserCreate(email="test@ok.de", password="geheim")
+    create_user(db_session, user)
+    for candidate in rated_candidates:
+        candidate.own_rating = None
+        create_restaurant(db_session, RestaurantBase(place_id=candidate.place_id, name=candidate.name))
+
+    # Without a search there is nothing to reroll
+    with pytest.raises(NoResultsException):
+        asyncio.run(service_res.reroll_restaurant(db_session, user))
+
+    user_f = FilterRest(
+        cuisines=[PydanticCuisine(name=Cuisine.DOENER.value)],
+        rating=1,
+        costs=4,
+        radius=5000,
+        location=LocationBase(lat="47.65", lng="9.48"),
+    )
+    shown = [asyncio.run(service_res.search_for_restaurant(db_session, user, user_f)).place_id]
+    for _ in range(len(rated_candidates) - 1):
+        shown.append(asyncio.run(service_res.reroll_restaurant(db_session, user)).place_id)
 
-def test_select_restaurant(rated_restaurants: List[Restaurant], mocker: MockerFixture):
-    # mock random
-    random_res = rated_restaurants[1]
-    mocker.patch("random.choices", return_value=[random_res])
+    # Every restaurant once and only one google search
+    assert sorted(shown) == sorted(candidate.place_id for candidate in rated_candidates)
+    assert search.call_count == 1
+
+    # Start again if all are shown
+    assert asyncio.run(service_res.reroll_restaurant(db_session, user)).place_id in shown
+
+
+def test_search_for_restaurants(
+    db_session: SessionTesting, rated_candidates: List[RestaurantCandidate], mocker: MockerFixture
+):
+    started = []
+
+    async def no_details(db_session, restaurant: Restaurant) -> Restaurant:
+        started.append(restaurant.place_id)
+        await asyncio.sleep(0)
+        # All details are requested before the first one is finished
+        assert len(started) == 3
+        if restaurant.place_id == started[0]:
+            raise GoogleApiException("No details")
+        return restaurant
+
+    search = mocker.patch("tools.gapi.search_restaurant", return_value=rated_candidates)
+    mocker.patch("services.service_res.fill_restaurant_details", side_effect=no_details)
+    mocker.patch("tools.config.Setting.RESTAURANT_MAX_SUGGESTIONS", 3)
+    user = UserCreate(email="test@ok.de", password="geheim")
+    create_user(db_session, user)
+    user_f = FilterRest(
+        cuisines=[PydanticCuisine(name=Cuisine.DOENER.value)],
+        rating=1,
+        costs=4,
+        radius=5000,
+        location=LocationBase(lat="47.65", lng="9.48"),
+    )
+
+    # Limited by RESTAURANT_MAX_SUGGESTIONS and the restaurant without details is skipped
+    restaurants = asyncio.run(service_res.search_for_restaurants(db_session, user, user_f, count=10))
+    assert [restaurant.place_id for restaurant in restaurants] == started[1:]
+    assert search.call_count == 1
+
+    # Reroll draws the other restaurants of the same search
+    started.clear()
+    restaurants = asyncio.run(service_res.reroll_restaurants(db_session, user, count=3))
+    assert len(restaurants) == 2
+    assert len(set(started)) == 3
+    assert search.call_count == 1
+
+    # If all restaurants fail the error is raised
+    mocker.patch("services.service_res.fill_restaurant_details", side_effect=GoogleApiException("No details"))
+    with pytest.raises(GoogleApiException):
+        asyncio.run(service_res.search_for_restaurants(db_session, user, user_f, count=3))
+
+
+def test_fill_restaurant_details(
+    httpx_mock: HTTPXMock,
+    db_session: SessionTesting,
+    google_api_restaurants: List[Restaurant],
+    mocker: MockerFixture,
+):
+    mocker.patch("tools.config.Setting.GOOGLE_API_KEY", "42")
+    restaurant = google_api_restaurants[0]
+    url = f"https://maps.googleapis.com/maps/api/place/details/json?key=42&place_id={restaurant.place_id}"
+    httpx_mock.add_response(status_code=200, json={"result": {"website": "https://nice.rest/"}}, url=url)
+
+    # First call got the details from google
+    return_res = asyncio.run(service_res.fill_restaurant_details(db_session, restaurant.copy(deep=True)))
+    assert return_res.homepage == "https://nice.rest/"
+
+    # Second call got the details from the DB
+    return_res = asyncio.run(service_res.fill_restaurant_details(db_session, restaurant.copy(deep=True)))
+    assert return_res.homepage == "https://nice.rest/"
+    assert len(httpx_mock.get_requests()) == 1
+
+    # Expired details are used if google is not available
+    mocker.patch("tools.config.Setting.GOOGLE_DETAILS_MAX_AGE_HOURS", 0)
+    mocker.patch("tools.gapi.place_details", side_effect=GoogleApiUnavailableException("Not available"))
+    return_res = asyncio.run(service_res.fill_restaurant_details(db_session, restaurant.copy(deep=True)))
+    assert return_res.homepage == "https://nice.rest/"
+
+
+def test_prefetch_details(
+    httpx_mock: HTTPXMock,
+    db_session: SessionTesting,
+    rated_candidates: List[RestaurantCandidate],
+    mocker: MockerFixture,
+):
+    mocker.patch("tools.config.Setting.GOOGLE_API_KEY", "42")
+    mocker.patch("tools.config.Setting.GOOGLE_DETAILS_PREFETCH", 3)
+    httpx_mock.add_response(status_code=200, json={"result": {"website": "https://nice.rest/"}})
+    prefetch = mocker.patch("services.service_res.prefetch_details")
+    weights = [float(index) for index in range(len(rated_candidates))]
+
+    # The best weighted restaurants without the shown one
+    async def start():
+        return service_res.start_prefetch_details(rated_candidates, weights, exclude={len(weights) - 1})
+
+    asyncio.run(start())
+    best = rated_candidates[-4:-1]
+    assert prefetch.call_args.args[0] == best[::-1]
+    mocker.stopall()
+
+    # Fetch the details and skip the ones in the DB. All prefetches share the session of the test
+    mocker.patch("tools.config.Setting.GOOGLE_API_KEY", "42")
+    mocker.patch("tools.config.Setting.GOOGLE_DETAILS_PREFETCH_CONCURRENCY", 1)
+    fetched = asyncio.run(service_res.prefetch_details(best, session_factory=lambda: db_session))
+    assert fetched == 3
+    assert asyncio.run(service_res.prefetch_details(best, session_factory=lambda: db_session)) == 0
+    assert len(httpx_mock.get_requests()) == 3
+    restaurant = asyncio.run(service_res.fill_restaurant_details(db_session, best[0].to_restaurant()))
+    assert restaurant.homepage == "https://nice.rest/"
+
+    # Stop if the quota is low
+    mocker.patch("tools.gapi.quota", QuotaBudget(limit=50))
+    fetched = asyncio.run(service_res.prefetch_details(rated_candidates[:3], session_factory=lambda: db_session))
+    assert fetched == 0
+    assert len(httpx_mock.get_requests()) == 3
+
+
+def test_prefetch_details_without_session(mocker: MockerFixture, rated_candidates: List[RestaurantCandidate]):
+    open_sessions = []
+
+    class FakeSession:
+        def __enter__(self):
+            open_sessions.append(self)
+            return self
+
+        def __exit__(self, *args):
+            open_sessions.remove(self)
+
+    async def place_details(restaurant: Restaurant) -> Restaurant:
+        # No connection of the pool waits for google
+        assert open_sessions == []
+        return restaurant
+
+    mocker.patch("tools.gapi.place_details", side_effect=place_details)
+    mocker.patch("db.crud.restaurant.get_restaurant_details", return_value=None)
+    update = mocker.patch("db.crud.restaurant.update_restaurant_details")
+
+    fetched = asyncio.run(service_res.prefetch_details(rated_candidates[:2], session_factory=FakeSession))
+    assert fetched == 2
+    assert update.call_count == 2
+
+
+def test_fill_user_rating(db_session: SessionTesting, rated_candidates: List[RestaurantCandidate]):
+    user = UserCreate(email="test@ok.de", password="geheim")
+    create_user(db_session, user)
+    for candidate in rated_candidates[:2]:
+        restaurant = RestaurantBase(place_id=candidate.place_id, name=candidate.name)
+        create_restaurant(db_session, restaurant)
+        create_bewertung(
+            db_session, RestBewertungCreate(name=candidate.name, rating=4, person=user, restaurant=restaurant)
+        )
+
+    candidates = [candidate.copy() for candidate in rated_candidates[:3]]
+    for candidate in candidates:
+        candidate.own_rating = None
+
+    return_rests = service_res.fill_user_rating(db_session, candidates, user)
+    assert [rest.own_rating for rest in return_rests] == [4, 4, None]
+
+
+def test_apply_filter():
+    user_f = FilterRest(
+        cuisines=[PydanticCuisine(name=Cuisine.DOENER.value)],
+        rating=3,
+        costs=2,
+        radius=5000,
+        location=LocationBase(lat="47.65", lng="9.48"),
+    )
+    rests = [
+        RestaurantCandidate("1", "Low 1", rating=2.0, lat=47.65, lng=9.48),
+        RestaurantCandidate("2", "Low 2", rating=2.9, lat=47.65, lng=9.48),
+        RestaurantCandidate("3", "Good", rating=4.5, lat=47.65, lng=9.48, price_level=2),
+        RestaurantCandidate("3", "Good again", rating=4.5, lat=47.65, lng=9.48, price_level=2),
+        RestaurantCandidate("4", "Expensive", rating=4.0, lat=47.65, lng=9.48, price_level=4),
+        RestaurantCandidate("5", "Closed", rating=5.0, lat=47.65, lng=9.48, business_status="CLOSED_PERMANENTLY"),
+        RestaurantCandidate("6", "No rating", rating=None, lat=47.65, lng=9.48),
+        RestaurantCandidate("7", "No price", rating=3.0, lat=47.65, lng=9.48, business_status="OPERATIONAL"),
+    ]
+
+    assert [rest.name for rest in service_res.apply_filter(rests, user_f)] == ["Good", "No price"]
+    assert service_res.apply_filter([], user_f) == []
+
+    # Own predicates
+    only_rating = service_res.apply_filter(rests, user_f, predicates=[service_res.filter_rating])
+    assert [rest.place_id for rest in only_rating] == ["3", "3", "4", "5", "7"]
+
+    # Without a minimum rating also restaurants without a rating are kept
+    user_f.rating = 0
+    only_rating = service_res.apply_filter(rests, user_f, predicates=[service_res.filter_rating])
+    assert [rest.place_id for rest in only_rating] == ["1", "2", "3", "3", "4", "5", "6", "7"]
+
+
+def test_rating_cache(db_session: SessionTesting, mocker: MockerFixture):
+    user = UserCreate(email="test@ok.de", password="geheim")
+    create_user(db_session, user)
+    rest_1 = RestaurantBase(place_id="1234", name="Rest 1")
+    rest_2 = RestaurantBase(place_id="5678", name="Rest 2")
+    create_restaurant(db_session, rest_1)
+    create_restaurant(db_session, rest_2)
+    assessment = RestBewertungCreate(name="Rest 1", rating=2, person=user, restaurant=rest_1)
+    service_res.add_assessment(db_session, assessment)
+
+    get_ratings = mocker.spy(service_res.crud_restBewertung, "get_ratings_from_user_to_rests")
+    assert service_res.get_ratings_from_user(db_session, user) == {"1234": 2}
+
+    # Changes of the assessments are written through the cache
+    service_res.add_assessment(db_session, RestBewertungCreate(name="Rest 2", rating=3, person=user, restaurant=rest_2))
+    service_res.update_assessment(db_session, assessment, RestBewertungCreate(**dict(assessment, rating=5)))
+    assert service_res.get_ratings_from_user(db_session, user) == {"1234": 5, "5678": 3}
+    service_res.delete_assessment(db_session, user, rest_2)
+    assert service_res.get_ratings_from_user(db_session, user) == {"1234": 5}
+    assert get_ratings.call_count == 1
+
+    # Changes of other workers are found with the version in the DB
+    create_bewertung(db_session, RestBewertungCreate(name="Rest 2", rating=1, person=user, restaurant=rest_2))
+    assert service_res.get_ratings_from_user(db_session, user) == {"1234": 5}
+    mocker.patch("tools.config.Setting.RATING_CACHE_SYNC_SECONDS", 0.000001)
+    assert service_res.get_ratings_from_user(db_session, user) == {"1234": 5, "5678": 1}
+    assert get_ratings.call_count == 2
+
+
+def test_select_restaurant(rated_candidates: List[RestaurantCandidate], mocker: MockerFixture):
+    # mock the sampler
+    random_res = rated_candidates[1]
+    mocker.patch("tools.sampling.WeightedSampler.sample", return_value=1)
 
     # Does it return 1 restuarant
-    return_res = service_res.select_restaurant(rated_restaurants)
+    return_res = service_res.select_restaurant(rated_candidates)
     assert return_res == random_res
 
     # No error when rating = 0
-    rated_restaurants[5].own_rating = 0
-    rated_restaurants[7].rating = 0
+    rated_candidates[5].own_rating = 0
+    rated_candidates[7].rating = 0
 
-    return_res = service_res.select_restaurant(rated_restaurants)
+    return_res = service_res.select_restaurant(rated_candidates)
     assert return_res == random_res
 
-    # No error when rating = None
-    rated_restaurants[5].own_rating = None
-    rated_restaurants[7].rating = None
+    # No error when rating = None and the candidates are not changed
+    rated_candidates[5].own_rating = None
+    rated_candidates[7].rating = None
 
-    return_res = service_res.select_restaurant(rated_restaurants)
+    return_res = service_res.select_restaurant(rated_candidates)
     assert return_res == random_res
+    assert rated_candidates[5].own_rating is None
+    assert rated_candidates[7].rating is None
+
+
+def test_select_restaurant_seed(rated_candidates: List[RestaurantCandidate]):
+    first = service_res.select_restaurant(rated_candidates, seed=42)
+    assert all(service_res.select_restaurant(rated_candidates, seed=42) is first for _ in range(5))
+
+    # All weights 0
+    for candidate in rated_candidates:
+        candidate.rating = None
+        candidate.own_rating = None
+    assert service_res.select_restaurant(rated_candidates, seed=42) in rated_candidates
@@ -0,0 +1,51 @@
+from collections import Counter
+
+import pytest
+
+from tools.sampling import WeightedSampler
+
+
+def test_weighted_sampler():
+    sampler = WeightedSampler([1, 0, 3, 6], seed=42)
+    counts = Counter(sampler.sample() for _ in range(10000))
+    assert counts[1] == 0
+    assert 800 < counts[0] < 1200
+    assert 2700 < counts[2] < 3300
+    assert 5700 < counts[3] < 6300
+
+    # Same seed same draws
+    assert [WeightedSampler([1, 2, 3], seed=1).sample() for _ in range(10)] == [
+        WeightedSampler([1, 2, 3], seed=1).sample() for _ in range(10)
+    ]
+
+
+def test_weighted_sampler_uniform():
+    sampler = WeightedSampler([0, 0, 0, 0], seed=42)
+    counts = Counter(sampler.sample() for _ in range(10000))
+    assert all(2200 < counts[index] < 2800 for index in range(4))
+
+
+def test_weighted_sampler_distinct():
+    sampler = WeightedSampler([1, 0, 1000, 2, 0], seed=42)
+    for _ in range(100):
+        drawn = sampler.sample_distinct(3)
+        assert sorted(drawn) == [0, 2, 3]
+
+    # Weight 0 only if all others are drawn
+    drawn = sampler.sample_distinct(10)
+    assert len(drawn) == 5
+    assert sorted(drawn[3:]) == [1, 4]
+
+    assert sorted(WeightedSampler([0, 0, 0], seed=42).sample_distinct(2)) in ([0, 1], [0, 2], [1, 2])
+    assert WeightedSampler([0, 0, 0], seed=42).sample_distinct(5, exclude=[0, 2]) == [1]
+    assert sorted(sampler.sample_distinct(5, exclude={2, 3})) == [0, 1, 4]
+    assert WeightedSampler([5], seed=42).sample_distinct(0) == []
+
+
+def test_weighted_sampler_errors():
+    with pytest.raises(ValueError):
+        WeightedSampler([1, -1])
+    with pytest.raises(ValueError):
+        WeightedSampler([1, float("nan")])
+    with pytest.raises(ValueError):
+        WeightedSampler([]).sample()
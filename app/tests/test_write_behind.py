@@ -0,0 +1,113 @@
+import asyncio
+from unittest.mock import MagicMock
+
+from tools.write_behind import WriteBehindQueue
+
+
+def test_write_queue_inline():
+    session = MagicMock()
+    queue = WriteBehindQueue(maxsize=10, batch_size=5, session_factory=MagicMock())
+    job = MagicMock()
+
+    # Without a running worker the job runs with the session of the caller
+    queue.enqueue(session, job, key="key")
+    job.assert_called_once_with(session)
+    assert len(queue) == 0
+
+    async def run():
+        queue.maxsize = 0
+        queue.start()
+        queue.enqueue(session, job)
+        await queue.stop()
+
+    asyncio.run(run())
+    assert job.call_count == 2
+    assert queue.stats()["applied"] == 0
+
+
+def test_write_queue_batches():
+    sessions = []
+
+    def session_factory():
+        sessions.append(MagicMock())
+        return sessions[-1]
+
+    queue = WriteBehindQueue(maxsize=10, batch_size=2, session_factory=session_factory)
+    written = []
+
+    async def run():
+        queue.start()
+        assert queue.running
+        queue.enqueue(None, lambda _: written.append("filter-1"), key=("filter", "a"))
+        queue.enqueue(None, lambda _: written.append("details"), key=("details", "b"))
+        queue.enqueue(None, lambda _: written.append("filter-2"), key=("filter", "a"))
+        queue.enqueue(None, lambda _: written.append("other"))
+        # The response does not wait for the writes
+        assert written == []
+        assert queue.stats()["depth"] == 3
+        await queue.stop()
+
+    asyncio.run(run())
+    # Last write wins on the position of the first one
+    assert written == ["filter-2", "details", "other"]
+    assert len(sessions) == 2
+    assert queue.stats() == {
+        "depth": 0,
+        "maxsize": 10,
+        "running": False,
+        "coalesced": 1,
+        "applied": 3,
+        "failed": 0,
+    }
+
+
+def test_write_queue_full_and_failed():
+    session = MagicMock()
+    batch_session = MagicMock()
+    queue = WriteBehindQueue(maxsize=1, batch_size=10, session_factory=lambda: batch_session)
+    inline = MagicMock()
+
+    def fail(_):
+        raise ValueError("Write failed")
+
+    async def run():
+        queue.start()
+        queue.enqueue(session, fail)
+        # Full queue -> run immediately
+        queue.enqueue(session, inline)
+        inline.assert_called_once_with(session)
+        await queue.stop()
+
+    asyncio.run(run())
+    assert queue.stats()["failed"] == 1
+    batch_session.__enter__.return_value.rollback.assert_called_once()
+
+
+def test_write_queue_session_error():
+    failing = True
+
+    def session_factory():
+        if failing:
+            raise RuntimeError("db down")
+        return MagicMock()
+
+    queue = WriteBehindQueue(maxsize=10, batch_size=10, session_factory=session_factory)
+    written = []
+
+    async def run():
+        nonlocal failing
+        queue.start()
+        queue.enqueue(None, lambda _: written.append("lost"))
+        await asyncio.sleep(0.1)
+        # The worker survives a batch without a session
+        assert queue.running
+        assert queue.stats()["depth"] == 0
+        assert queue.stats()["failed"] == 1
+
+        failing = False
+        queue.enqueue(None, lambda _: written.append("written"))
+        await queue.stop()
+
+    asyncio.run(run())
+    assert written == ["written"]
+    assert queue.stats()["applied"] == 1
@@ -0,0 +1,187 @@
+"""In-memory caches that are shared by all requests of one worker"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import Hashable
+from typing import Union
+
+
+class TTLCache:
+    """LRU cache with a time to live for every entry
+
+    Note:
+        The cache only live in one worker. Every worker got his own entries
+
+    Args:
+        maxsize (int): Maximum number of entries. The least recently used entry got removed if full
+        ttl (Union[float, None]): Seconds until an entry expires. None means entries never expire
+        clock (Callable[[], float], optional): Timer in seconds. Defaults to time.monotonic
+
+    Attributes:
+        hits (int): Number of successful lookups
+        misses (int): Number of lookups without a (valid) entry
+    """
+
+    def __init__(self, maxsize: int, ttl: Union[float, None], clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the value of the key if it exists and is not expired
+
+        Args:
+            key (Hashable): Key of the entry
+            default (Any, optional): Return value if nothing found. Defaults to None.
+
+        Returns:
+            Any: The cached value or the default
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > self._clock()):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            # Expired entries are kept until they are replaced or evicted to serve them with `get_stale`
+            self.misses += 1
+            return default
+
+    def get_stale(self, key: Hashable, default: Any = None) -> Any:
+        """Return the value of the key even if it is expired. Use it as fallback if the source is not available
+
+        Args:
+            key (Hashable): Key of the entry
+            default (Any, optional): Return value if nothing found. Defaults to None.
+
+        Returns:
+            Any: The cached value or the default
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        return default if entry is None else entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: Union[float, None] = ...) -> None:
+        """Add or replace an entry
+
+        Args:
+            key (Hashable): Key of the entry
+            value (Any): Value to cache
+            ttl (Union[float, None], optional): Overwrite the ttl of the cache for this entry
+        """
+        ttl = self.ttl if ttl is ... else ttl
+        expires = None if ttl is None else self._clock() + ttl
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove an entry and return the value of it
+
+        Args:
+            key (Hashable): Key of the entry
+            default (Any, optional): Return value if nothing found. Defaults to None.
+
+        Returns:
+            Any: The removed value or the default
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """Return the counters of the cache
+
+        Returns:
+            dict: hits, misses, size and maxsize of the cache
+        """
+        return {"hits": self.hits, "misses": self.misses, "size": len(self), "maxsize": self.maxsize}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key. Only the first caller starts the call,
+    all other callers with the same key wait for the same result (or exception)
+
+    Note:
+        The result is shared between all callers. Do not modify it!
+
+    Attributes:
+        calls (int): Number of started calls
+        deduplicated (int): Number of callers that joined a call in flight
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.deduplicated = 0
+        self._inflight: Dict[Hashable, list] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable]) -> Any:
+        """Run func or wait for the call with the same key in flight.
+        The call got cancelled if all waiting callers got cancelled
+
+        Args:
+            key (Hashable): Key of the call. Use the normalized request
+            func (Callable[[], Awaitable]): Function to start the call
+
+        Returns:
+            Any: The result of the call
+        """
+        entry = self._inflight.get(key)
+        if entry is None:
+            task = asyncio.ensure_future(func())
+            entry = [task, 0]
+            self._inflight[key] = entry
+            task.add_done_callback(lambda _: self.__remove__(key, task))
+            self.calls += 1
+        else:
+            task = entry[0]
+            self.deduplicated += 1
+
+        entry[1] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if entry[1] == 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            entry[1] -= 1
+
+    def stats(self) -> dict:
+        """Return the counters
+
+        Returns:
+            dict: calls, deduplicated and the number of calls in flight
+        """
+        return {"calls": self.calls, "deduplicated": self.deduplicated, "inflight": len(self._inflight)}
+
+    def clear(self) -> None:
+        """Reset the counters. Calls in flight are not affected"""
+        self.calls = 0
+        self.deduplicated = 0
+
+    def __remove__(self, key: Hashable, task: asyncio.Future) -> None:
+        entry = self._inflight.get(key)
+        if entry is not None and entry[0] is task:
+            del self._inflight[key]
@@ -0,0 +1,153 @@
+"""Circuit breaker to fail fast if an external API is not available"""
+import datetime
+import time
+from collections import deque
+from enum import Enum
+from typing import Callable
+
+from tools.my_logging import logger
+
+
+class BreakerState(Enum):
+    """
+    States of the circuit breaker
+
+    Attributes:
+        CLOSED: All calls are allowed
+        OPEN: All calls are rejected
+        HALF_OPEN: One trial call is allowed to check if the API is available again
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Open the circuit if the error rate of the last calls is too high.
+    After open_seconds one trial call is allowed (half open). The circuit closes if it succeed
+    and opens again if it fails
+
+    Note:
+        The circuit breaker only live in one worker. Every worker got his own state
+
+    Args:
+        name (str): Name for the logging
+        failure_rate (float): Error rate (0 - 1) of the last calls that opens the circuit
+        window (int): Number of the last calls for the error rate
+        min_calls (int): Minimum number of calls in the window before the circuit can open
+        open_seconds (float): Seconds until the circuit goes half open
+        clock (Callable[[], float], optional): Timer in seconds. Defaults to time.monotonic
+
+    Attributes:
+        state (BreakerState): Current state
+        rejected (int): Number of rejected calls
+        transitions (deque): The last 20 state changes as dict with time, from and to
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float,
+        window: int,
+        min_calls: int,
+        open_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.state = BreakerState.CLOSED
+        self.rejected = 0
+        self.transitions = deque(maxlen=20)
+        self._clock = clock
+        self._results = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._trial_running = False
+
+    def allow(self) -> bool:
+        """Check if a call is allowed. Every allowed call must be finished with
+        `record_success`, `record_failure` or `release`
+
+        Returns:
+            bool: False if the call is rejected
+        """
+        if self.state == BreakerState.OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self.__transition__(BreakerState.HALF_OPEN)
+
+        if self.state == BreakerState.CLOSED:
+            return True
+        if self.state == BreakerState.HALF_OPEN and not self._trial_running:
+            self._trial_running = True
+            return True
+
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        """Record a successful call"""
+        self._trial_running = False
+        if self.state == BreakerState.HALF_OPEN:
+            self._results.clear()
+            self.__transition__(BreakerState.CLOSED)
+        self._results.append(True)
+
+    def record_failure(self) -> None:
+        """Record a failed call"""
+        self._trial_running = False
+        if self.state == BreakerState.HALF_OPEN:
+            self.__open__()
+            return
+
+        self._results.append(False)
+        failures = self._results.count(False)
+        if (
+            self.state == BreakerState.CLOSED
+            and len(self._results) >= self.min_calls
+            and failures / len(self._results) >= self.failure_rate
+        ):
+            self.__open__()
+
+    def release(self) -> None:
+        """Finish an allowed call without a result (e.g. the call was not made)"""
+        self._trial_running = False
+
+    def reset(self) -> None:
+        """Close the circuit and forget all recorded calls"""
+        self._results.clear()
+        self.rejected = 0
+        self._trial_running = False
+        if self.state != BreakerState.CLOSED:
+            self.__transition__(BreakerState.CLOSED)
+
+    def stats(self) -> dict:
+        """Return the state for the monitoring
+
+        Returns:
+            dict: state, error rate of the window, rejected calls and the last transitions
+        """
+        failures = self._results.count(False)
+        return {
+            "state": self.state.value,
+            "error_rate": failures / len(self._results) if self._results else 0.0,
+            "calls_in_window": len(self._results),
+            "rejected": self.rejected,
+            "transitions": list(self.transitions),
+        }
+
+    def __open__(self) -> None:
+        self._opened_at = self._clock()
+        self._results.clear()
+        self.__transition__(BreakerState.OPEN)
+
+    def __transition__(self, state: BreakerState) -> None:
+        logger.warning("Circuit breaker %s: %s -> %s", self.name, self.state.value, state.value)
+        self.transitions.append(
+            {
+                "time": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "from": self.state.value,
+                "to": state.value,
+            }
+        )
+        self.state = state
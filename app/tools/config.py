@@ -23,6 +23,55 @@ class Setting:
         SECRET_KEY (str): Key that is used for the JWT hashing
         ALGORITHM (str): Used hash algorit. Defaults to HS256
         ACCESS_TOKEN_EXPIRE_MINUTES (int): How long JWT - Token is valid in Minutes. Defaults to 30
+        GOOGLE_HTTP2 (bool): Use HTTP/2 for the Google API connections. Defaults to True
+        GOOGLE_MAX_CONNECTIONS (int): Maximum open connections to the Google API per worker. Defaults to 20
+        GOOGLE_MAX_KEEPALIVE_CONNECTIONS (int): Maximum idle connections that are kept alive. Defaults to 10
+        GOOGLE_KEEPALIVE_EXPIRY (float): Seconds until an idle connection got closed. Defaults to 30
+        GOOGLE_CONNECT_TIMEOUT (float): Seconds to connect to the Google API. Defaults to 2
+        GOOGLE_READ_TIMEOUT (float): Seconds to wait for a response of the Google API. Defaults to 5
+        GOOGLE_BREAKER_FAILURE_RATE (float): Error rate (0 - 1) that opens the circuit breaker. Defaults to 0.5
+        GOOGLE_BREAKER_WINDOW (int): Number of the last requests for the error rate. Defaults to 20
+        GOOGLE_BREAKER_MIN_CALLS (int): Minimum requests in the window to open the circuit breaker. Defaults to 5
+        GOOGLE_BREAKER_OPEN_SECONDS (float): Seconds until the open circuit breaker allows a trial request.
+            Defaults to 30
+        GOOGLE_MAX_CONCURRENT_SEARCHES (int): Maximum parallel nearby searches of one restaurant search. Defaults to 4
+        GOOGLE_NEARBY_CACHE_TTL (float): Seconds a nearby search result got cached. Defaults to 300
+        GOOGLE_NEARBY_PARTIAL_CACHE_TTL (float): Seconds a nearby search result without the pages after the deadline
+            got cached. Defaults to 60
+        GOOGLE_NEARBY_CACHE_SIZE (int): Maximum number of cached nearby searches. Defaults to 512
+        GOOGLE_NEARBY_CACHE_PRECISION (int): Geohash length for the location of the cache key. Defaults to 7 (~150m)
+        GOOGLE_NEARBY_MAX_PAGES (int): Maximum result pages (20 results each) of a nearby search. Defaults to 3
+        GOOGLE_NEARBY_MIN_RESULTS (int): Stop loading pages if a nearby search got this many results.
+            Defaults to 0 (load all pages)
+        GOOGLE_NEARBY_DEADLINE (float): Seconds after no further page of a nearby search is loaded. Defaults to 5
+        GOOGLE_PAGE_TOKEN_DELAY (float): Seconds to wait until a next_page_token is valid. Defaults to 2
+        GOOGLE_PAGE_TOKEN_RETRIES (int): Retries if the next_page_token is not valid yet. Defaults to 2
+        GOOGLE_DETAILS_MAX_AGE_HOURS (float): Hours the place details in the DB are used before fetch them
+            again from google. Defaults to 168 (one week)
+        GOOGLE_DETAILS_PREFETCH (int): Number of the best weighted restaurants of a search whose details are fetched
+            in the background. Defaults to 0 (disabled)
+        GOOGLE_DETAILS_PREFETCH_CONCURRENCY (int): Maximum parallel detail requests of one prefetch. Defaults to 2
+        GOOGLE_DETAILS_PREFETCH_MIN_QUOTA (int): Stop the prefetch if less requests of the daily quota are left.
+            Defaults to 100
+        GOOGLE_RATE_NEARBY (float): Nearby search requests per second of a worker. Defaults to 10
+        GOOGLE_RATE_DETAILS (float): Place details requests per second of a worker. Defaults to 10
+        GOOGLE_RATE_GEOCODE (float): Geocoding requests per second of a worker. Defaults to 5
+        GOOGLE_RATE_BURST (float): Maximum burst of requests per endpoint. Defaults to 20
+        GOOGLE_RATE_MAX_WAIT (float): Maximum seconds a request waits for the rate limit. Defaults to 2
+        GOOGLE_DAILY_QUOTA (int): Maximum requests per day of a worker. 0 is unlimited. Defaults to 0
+        GEOCODE_CACHE_SIZE (int): Maximum number of geocoded addresses in the memory of a worker. Defaults to 1024
+        GEOCODE_MAX_AGE_HOURS (float): Hours a geocoded address is used. Defaults to 720 (30 days)
+        GEOCODE_NOT_FOUND_MAX_AGE_MINUTES (float): Minutes an address without result is not searched again.
+            Defaults to 10
+        RATING_CACHE_SIZE (int): Maximum number of users with cached ratings in a worker. Defaults to 1024
+        RATING_CACHE_SYNC_SECONDS (float): Seconds until a worker checks in the DB if the cached ratings of a user
+            got changed by another worker. 0 disables the check (only with one worker). Defaults to 5
+        CANDIDATE_POOL_SIZE (int): Maximum number of users with a stored search for a reroll. Defaults to 1024
+        CANDIDATE_POOL_TTL (float): Seconds a search can be rerolled. Defaults to 900
+        RESTAURANT_MAX_SUGGESTIONS (int): Maximum number of restaurants of one search. Defaults to 5
+        WRITE_QUEUE_SIZE (int): Maximum number of pending writes in the background. 0 writes immediately.
+            Defaults to 1000
+        WRITE_QUEUE_BATCH_SIZE (int): Maximum number of background writes with one DB session. Defaults to 50
         SQL_LITE (bool): Automatic set to True if POSTGRES_SERVER is set
         POSTGRES_USER (str): User for the DB
         POSTGRES_PASSWORD (str): Password for the user
@@ -36,6 +85,47 @@ class Setting:
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    GOOGLE_HTTP2: bool = os.getenv("GOOGLE_HTTP2", "True").lower() in ("true", "1")
+    GOOGLE_MAX_CONNECTIONS: int = int(os.getenv("GOOGLE_MAX_CONNECTIONS", "20"))
+    GOOGLE_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("GOOGLE_MAX_KEEPALIVE_CONNECTIONS", "10"))
+    GOOGLE_KEEPALIVE_EXPIRY: float = float(os.getenv("GOOGLE_KEEPALIVE_EXPIRY", "30"))
+    GOOGLE_CONNECT_TIMEOUT: float = float(os.getenv("GOOGLE_CONNECT_TIMEOUT", "2"))
+    GOOGLE_READ_TIMEOUT: float = float(os.getenv("GOOGLE_READ_TIMEOUT", "5"))
+    GOOGLE_BREAKER_FAILURE_RATE: float = float(os.getenv("GOOGLE_BREAKER_FAILURE_RATE", "0.5"))
+    GOOGLE_BREAKER_WINDOW: int = int(os.getenv("GOOGLE_BREAKER_WINDOW", "20"))
+    GOOGLE_BREAKER_MIN_CALLS: int = int(os.getenv("GOOGLE_BREAKER_MIN_CALLS", "5"))
+    GOOGLE_BREAKER_OPEN_SECONDS: float = float(os.getenv("GOOGLE_BREAKER_OPEN_SECONDS", "30"))
+    GOOGLE_MAX_CONCURRENT_SEARCHES: int = int(os.getenv("GOOGLE_MAX_CONCURRENT_SEARCHES", "4"))
+    GOOGLE_NEARBY_CACHE_TTL: float = float(os.getenv("GOOGLE_NEARBY_CACHE_TTL", "300"))
+    GOOGLE_NEARBY_PARTIAL_CACHE_TTL: float = float(os.getenv("GOOGLE_NEARBY_PARTIAL_CACHE_TTL", "60"))
+    GOOGLE_NEARBY_CACHE_SIZE: int = int(os.getenv("GOOGLE_NEARBY_CACHE_SIZE", "512"))
+    GOOGLE_NEARBY_CACHE_PRECISION: int = int(os.getenv("GOOGLE_NEARBY_CACHE_PRECISION", "7"))
+    GOOGLE_NEARBY_MAX_PAGES: int = int(os.getenv("GOOGLE_NEARBY_MAX_PAGES", "3"))
+    GOOGLE_NEARBY_MIN_RESULTS: int = int(os.getenv("GOOGLE_NEARBY_MIN_RESULTS", "0"))
+    GOOGLE_NEARBY_DEADLINE: float = float(os.getenv("GOOGLE_NEARBY_DEADLINE", "5"))
+    GOOGLE_PAGE_TOKEN_DELAY: float = float(os.getenv("GOOGLE_PAGE_TOKEN_DELAY", "2"))
+    GOOGLE_PAGE_TOKEN_RETRIES: int = int(os.getenv("GOOGLE_PAGE_TOKEN_RETRIES", "2"))
+    GOOGLE_DETAILS_MAX_AGE_HOURS: float = float(os.getenv("GOOGLE_DETAILS_MAX_AGE_HOURS", "168"))
+    GOOGLE_DETAILS_PREFETCH: int = int(os.getenv("GOOGLE_DETAILS_PREFETCH", "0"))
+    GOOGLE_DETAILS_PREFETCH_CONCURRENCY: int = int(os.getenv("GOOGLE_DETAILS_PREFETCH_CONCURRENCY", "2"))
+    GOOGLE_DETAILS_PREFETCH_MIN_QUOTA: int = int(os.getenv("GOOGLE_DETAILS_PREFETCH_MIN_QUOTA", "100"))
+    GOOGLE_RATE_NEARBY: float = float(os.getenv("GOOGLE_RATE_NEARBY", "10"))
+    GOOGLE_RATE_DETAILS: float = float(os.getenv("GOOGLE_RATE_DETAILS", "10"))
+    GOOGLE_RATE_GEOCODE: float = float(os.getenv("GOOGLE_RATE_GEOCODE", "5"))
+    GOOGLE_RATE_BURST: float = float(os.getenv("GOOGLE_RATE_BURST", "20"))
+    GOOGLE_RATE_MAX_WAIT: float = float(os.getenv("GOOGLE_RATE_MAX_WAIT", "2"))
+    GOOGLE_DAILY_QUOTA: int = int(os.getenv("GOOGLE_DAILY_QUOTA", "0"))
+    GEOCODE_CACHE_SIZE: int = int(os.getenv("GEOCODE_CACHE_SIZE", "1024"))
+    GEOCODE_MAX_AGE_HOURS: float = float(os.getenv("GEOCODE_MAX_AGE_HOURS", "720"))
+    GEOCODE_NOT_FOUND_MAX_AGE_MINUTES: float = float(os.getenv("GEOCODE_NOT_FOUND_MAX_AGE_MINUTES", "10"))
+    RATING_CACHE_SIZE: int = int(os.getenv("RATING_CACHE_SIZE", "1024"))
+    RATING_CACHE_SYNC_SECONDS: float = float(os.getenv("RATING_CACHE_SYNC_SECONDS", "5"))
+    CANDIDATE_POOL_SIZE: int = int(os.getenv("CANDIDATE_POOL_SIZE", "1024"))
+    CANDIDATE_POOL_TTL: float = float(os.getenv("CANDIDATE_POOL_TTL", "900"))
+    RESTAURANT_MAX_SUGGESTIONS: int = int(os.getenv("RESTAURANT_MAX_SUGGESTIONS", "5"))
+    WRITE_QUEUE_SIZE: int = int(os.getenv("WRITE_QUEUE_SIZE", "1000"))
+    WRITE_QUEUE_BATCH_SIZE: int = int(os.getenv("WRITE_QUEUE_BATCH_SIZE", "50"))
+
     if os.getenv("POSTGRES_SERVER"):
         SQL_LITE: bool = False
         POSTGRES_USER: str = os.getenv("POSTGRES_USER")
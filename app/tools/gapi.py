@@ -1,33 +1,178 @@
 """Connection to the google api"""
+import asyncio
+import time
 from typing import List
+from typing import Union
 
 import httpx
 
 from schemes.exceptions import GoogleApiException
+from schemes.exceptions import GoogleApiLimitException
+from schemes.exceptions import GoogleApiUnavailableException
+from schemes.exceptions import NoneExcistingLocationException
 from schemes.scheme_filter import FilterRest
 from schemes.scheme_rest import Restaurant
+from schemes.scheme_rest import RestaurantCandidate
+from tools.cache import SingleFlight
+from tools.cache import TTLCache
+from tools.circuit_breaker import CircuitBreaker
 from tools.config import settings
 from tools.my_logging import logger
+from tools.ratelimit import QuotaBudget
+from tools.ratelimit import TokenBucket
 
-# TODO: Asynchrone Funktionen
-# TODO: Asynchrone API Anfragen
+_client: Union[httpx.AsyncClient, None] = None
 
+nearby_cache = TTLCache(maxsize=settings.GOOGLE_NEARBY_CACHE_SIZE, ttl=settings.GOOGLE_NEARBY_CACHE_TTL)
+"""Cache for the results of `nearby_search`. The key is build by `nearby_cache_key`"""
 
-def search_restaurant(res_filter: FilterRest) -> List[Restaurant]:
-    """Search all restaurants for a specific cuisin in a specific location
+inflight = SingleFlight()
+"""Coalesce identical Google API requests that are in flight at the same time"""
+
+rate_limits = {
+    endpoint: TokenBucket(rate=rate, capacity=settings.GOOGLE_RATE_BURST, max_wait=settings.GOOGLE_RATE_MAX_WAIT)
+    for endpoint, rate in (
+        ("nearby", settings.GOOGLE_RATE_NEARBY),
+        ("details", settings.GOOGLE_RATE_DETAILS),
+        ("geocode", settings.GOOGLE_RATE_GEOCODE),
+    )
+}
+"""Token bucket for every endpoint of the Google API"""
+
+quota = QuotaBudget(settings.GOOGLE_DAILY_QUOTA)
+"""Daily request budget of this worker for all endpoints of the Google API"""
+
+breaker = CircuitBreaker(
+    name="google",
+    failure_rate=settings.GOOGLE_BREAKER_FAILURE_RATE,
+    window=settings.GOOGLE_BREAKER_WINDOW,
+    min_calls=settings.GOOGLE_BREAKER_MIN_CALLS,
+    open_seconds=settings.GOOGLE_BREAKER_OPEN_SECONDS,
+)
+"""Circuit breaker for all requests to the Google API"""
+
+_GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def __create_client__() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.GOOGLE_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.GOOGLE_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.GOOGLE_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(settings.GOOGLE_READ_TIMEOUT, connect=settings.GOOGLE_CONNECT_TIMEOUT)
+    return httpx.AsyncClient(http2=settings.GOOGLE_HTTP2, limits=limits, timeout=timeout)
+
+
+async def open_client() -> None:
+    """Open the shared AsyncClient of this worker. Called on the startup of the application"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = __create_client__()
+        logger.info("Opened Google API client... http2:%s", settings.GOOGLE_HTTP2)
+
+
+async def close_client() -> None:
+    """Close the shared AsyncClient and all open connections. Called on the shutdown of the application"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        logger.info("Closed Google API client")
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared AsyncClient. If the client is not opened yet (e.g. outside of the application)
+    a new one will be created
+
+    Returns:
+        httpx.AsyncClient: The client with the connection pool for all Google API requests
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = __create_client__()
+    return _client
+
+
+def stats() -> dict:
+    """Return the state of the Google API client for the monitoring
+
+    Returns:
+        dict: State of the circuit breaker, quota, rate limits, nearby cache and coalesced requests
+    """
+    return {
+        "circuit_breaker": breaker.stats(),
+        "quota": quota.stats(),
+        "rate_limits": {endpoint: bucket.stats() for endpoint, bucket in rate_limits.items()},
+        "nearby_cache": nearby_cache.stats(),
+        "inflight": inflight.stats(),
+    }
+
+
+async def __request__(endpoint: str, url: str, params: dict) -> dict:
+    if not breaker.allow():
+        raise GoogleApiUnavailableException("The Google API is currently not available")
+
+    recorded = False
+    try:
+        if not await rate_limits[endpoint].acquire():
+            logger.warning("Rate limit of the Google API reached... endpoint:%s", endpoint)
+            raise GoogleApiLimitException("Too many requests to the Google API")
+        if not quota.consume():
+            logger.warning("Daily quota of the Google API used up... limit:%s", quota.limit)
+            raise GoogleApiLimitException("The daily quota of the Google API is used up")
+
+        try:
+            response = await get_client().get(url, params=params)
+            logger.debug("Response status: %s", response.status_code)
+            logger.debug("Request url: %s", response.url)
+            response.raise_for_status()
+        except httpx.HTTPStatusError as error:
+            if error.response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            recorded = True
+            raise
+        except httpx.TransportError:
+            breaker.record_failure()
+            recorded = True
+            raise
+        breaker.record_success()
+        recorded = True
+    finally:
+        if not recorded:
+            breaker.release()
+
+    resp_obj = response.json()
+    if resp_obj.get("status") == "OVER_QUERY_LIMIT":
+        raise GoogleApiLimitException("Google API answered with OVER_QUERY_LIMIT")
+    return resp_obj
+
+
+async def search_restaurant(
+    res_filter: FilterRest, max_pages: int = None, min_results: int = None, deadline: float = None
+) -> List[RestaurantCandidate]:
+    """Search all restaurants for a specific cuisin in a specific location.
+    The searches for the cuisines run concurrently (max `settings.GOOGLE_MAX_CONCURRENT_SEARCHES` at once)
+    and the result is merged in the order of the cuisines
 
     Args:
         res_filter (schemes.scheme_filter.FilterRest): Filter for the API
+        max_pages (int, optional): Maximum pages of every cuisine. See `nearby_search`
+        min_results (int, optional): Stop loading pages of a cuisine with this many results. See `nearby_search`
+        deadline (float, optional): Seconds to load further pages. See `nearby_search`
     Raises:
         GoogleApiException: If something with the httpx went wrong
 
     Returns:
-        List[schemes.scheme_rest.Restaurant]: List of all Restaurants from the google api
+        List[schemes.scheme_rest.RestaurantCandidate]: List of all Restaurants from the google api
     """
-    restaurants = []
-    for cuisine in res_filter.cuisines:
+    semaphore = asyncio.Semaphore(settings.GOOGLE_MAX_CONCURRENT_SEARCHES)
+
+    async def search_cuisine(cuisine_name: str) -> List[RestaurantCandidate]:
         params: dict = {
-            "keyword": cuisine.name,
+            "keyword": cuisine_name,
             "location": f"{res_filter.location.lat},{res_filter.location.lng}",
             "opennow": True,
             "radius": res_filter.radius,
@@ -35,48 +180,186 @@ def search_restaurant(res_filter: FilterRest) -> List[Restaurant]:
             "type": "restaurant",
             "language": "de",
         }
+        async with semaphore:
+            return await nearby_search(params, max_pages=max_pages, min_results=min_results, deadline=deadline)
+
+    tasks = [asyncio.ensure_future(search_cuisine(cuisine.name)) for cuisine in res_filter.cuisines]
+    try:
+        results = await asyncio.gather(*tasks)
+    except httpx.HTTPError as error:
+        await __cancel_tasks__(tasks)
+        logger.exception(error)
+        raise GoogleApiException("Can't communicate with the Google API") from error
+    except BaseException:
+        await __cancel_tasks__(tasks)
+        raise
 
-        try:
-            restaurants.extend(nearby_search(params=params))
-        except httpx.HTTPError as error:
-            logger.exception(error)
-            raise GoogleApiException("Can't communicate with the Google API") from error
+    restaurants = []
+    for result in results:
+        restaurants.extend(result)
     return restaurants
 
 
-def nearby_search(params: dict, next_page_token: str = None) -> List[Restaurant]:
-    """Specific google api request to search near a location for restaurants
+async def __cancel_tasks__(tasks: List[asyncio.Future]) -> None:
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def geohash(lat: float, lng: float, precision: int) -> str:
+    """Encode a position as geohash. Positions in the same grid cell got the same hash
 
     Args:
-        params (dict): See all available params
-            -> https://developers.google.com/maps/documentation/places/web-service/search-nearby#optional-parameters
-        next_page_token (str, optional): For recursion if the result got more than 20 results you have to search with
-            the next_page_token. Defaults to None.
+        lat (float): Latitude
+        lng (float): Longitude
+        precision (int): Number of characters. 6 is a cell of ~1.2km x 0.6km, 7 of ~150m x 150m
 
     Returns:
-        List[schemes.scheme_rest.Restaurant]: List of all found restaurants
+        str: The geohash of the cell
     """
-    url: str = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
-    params["pagetoken"] = next_page_token
-    params["key"] = settings.GOOGLE_API_KEY
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    geo_hash = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(geo_hash) < precision:
+        value, value_range = (lng, lng_range) if even else (lat, lat_range)
+        mid = (value_range[0] + value_range[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            value_range[0] = mid
+        else:
+            value_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            geo_hash.append(_GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(geo_hash)
+
+
+def nearby_cache_key(params: dict) -> tuple:
+    """Build the cache key for a nearby search. The location is snapped to the geohash grid
+    with the precision of `settings.GOOGLE_NEARBY_CACHE_PRECISION`
 
-    response = httpx.get(url, params=params)
-    logger.debug("Response status: %s", response.status_code)
-    logger.debug("Request url: %s", response.url)
+    Args:
+        params (dict): Params of the nearby search
 
-    response.raise_for_status()
+    Returns:
+        tuple: The cache key
+    """
+    lat, lng = (float(value) for value in params["location"].split(","))
+    return (
+        geohash(lat, lng, settings.GOOGLE_NEARBY_CACHE_PRECISION),
+        str(params.get("radius")),
+        params.get("keyword"),
+        str(params.get("maxprice")),
+        str(params.get("opennow")),
+    )
+
+
+async def nearby_search(
+    params: dict, max_pages: int = None, min_results: int = None, deadline: float = None
+) -> List[RestaurantCandidate]:
+    """Specific google api request to search near a location for restaurants.
+    The result pages are loaded one after another until there is no next page, `max_pages` are loaded,
+    `min_results` restaurants are found or the `deadline` is over.
+    Complete results are cached in `nearby_cache` for `settings.GOOGLE_NEARBY_CACHE_TTL` seconds, results cut by
+    the deadline only for `settings.GOOGLE_NEARBY_PARTIAL_CACHE_TTL` seconds. Identical searches in flight are
+    coalesced. If the Google API is not available an expired result is used
 
-    resp_obj = response.json()
-    restaurants = [Restaurant.parse_obj(restaurant) for restaurant in resp_obj.get("results")]
+    Args:
+        params (dict): See all available params
+            -> https://developers.google.com/maps/documentation/places/web-service/search-nearby#optional-parameters
+        max_pages (int, optional): Maximum pages to load. Defaults to `settings.GOOGLE_NEARBY_MAX_PAGES`
+        min_results (int, optional): Stop if this many restaurants are found. 0 loads all pages.
+            Defaults to `settings.GOOGLE_NEARBY_MIN_RESULTS`
+        deadline (float, optional): Seconds after no further page is loaded. The first page is always loaded.
+            Defaults to `settings.GOOGLE_NEARBY_DEADLINE`
 
-    if resp_obj.get("next_page_token"):
-        restaurants.extend(nearby_search(params=params, next_page_token=resp_obj.get("next_page_token")))
+    Raises:
+        schemes.exceptions.GoogleApiUnavailableException: If the Google API is not available and nothing is cached
 
+    Returns:
+        List[schemes.scheme_rest.RestaurantCandidate]: List of all found restaurants.
+            Use `to_restaurant` to get the full Restaurant of the selected one
+    """
+    max_pages = settings.GOOGLE_NEARBY_MAX_PAGES if max_pages is None else max_pages
+    min_results = settings.GOOGLE_NEARBY_MIN_RESULTS if min_results is None else min_results
+    deadline = settings.GOOGLE_NEARBY_DEADLINE if deadline is None else deadline
+
+    cache_key = nearby_cache_key(params) + (max_pages, min_results)
+    restaurants = nearby_cache.get(cache_key)
+    if restaurants is not None:
+        logger.debug("Nearby search cache hit: %s", cache_key)
+    else:
+        try:
+            restaurants = await inflight.do(
+                ("nearby",) + cache_key,
+                lambda: __nearby_search__(params, cache_key, max_pages, min_results, time.monotonic() + deadline),
+            )
+        except (GoogleApiUnavailableException, httpx.TransportError):
+            restaurants = nearby_cache.get_stale(cache_key)
+            if restaurants is None:
+                raise
+            logger.warning("Google API not available... use expired nearby search %s", cache_key)
+    return [restaurant.copy() for restaurant in restaurants]
+
+
+async def __nearby_search__(
+    params: dict, cache_key: tuple, max_pages: int, min_results: int, deadline: float
+) -> List[RestaurantCandidate]:
+    url: str = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+    params = dict(params, key=settings.GOOGLE_API_KEY)
+
+    resp_obj = await __request__("nearby", url, params)
+    restaurants = [RestaurantCandidate.from_result(result) for result in resp_obj.get("results")]
+    pages = 1
+    complete = True
+    next_page_token = resp_obj.get("next_page_token")
+    while next_page_token and pages < max_pages and not 0 < min_results <= len(restaurants):
+        resp_obj = await __next_page__(url, dict(params, pagetoken=next_page_token), deadline)
+        if resp_obj is None:
+            logger.info(
+                "Stop loading further pages of the nearby search... pages:%s results:%s", pages, len(restaurants)
+            )
+            complete = False
+            break
+        restaurants.extend(RestaurantCandidate.from_result(result) for result in resp_obj.get("results"))
+        pages += 1
+        next_page_token = resp_obj.get("next_page_token")
+
+    # A result cut by the deadline would hide the missing pages for the whole TTL. Repeated searches of the
+    # same location still use it for a short time, after that the missing pages are tried again
+    if complete:
+        nearby_cache.set(cache_key, restaurants)
+    else:
+        nearby_cache.set(cache_key, restaurants, ttl=settings.GOOGLE_NEARBY_PARTIAL_CACHE_TTL)
     return restaurants
 
 
-def place_details(restaurant: Restaurant) -> Restaurant:
-    """To get additionals informations of a specifict place (restaurant) you have to do a specific api request
+async def __next_page__(url: str, params: dict, deadline: float) -> Union[dict, None]:
+    # A new next_page_token is valid after a short delay. Before that google answers with INVALID_REQUEST
+    for _ in range(settings.GOOGLE_PAGE_TOKEN_RETRIES + 1):
+        if deadline - time.monotonic() <= settings.GOOGLE_PAGE_TOKEN_DELAY:
+            return None
+        await asyncio.sleep(settings.GOOGLE_PAGE_TOKEN_DELAY)
+        try:
+            resp_obj = await asyncio.wait_for(__request__("nearby", url, params), deadline - time.monotonic())
+        except asyncio.TimeoutError:
+            return None
+        if resp_obj.get("status") != "INVALID_REQUEST":
+            return resp_obj
+        logger.debug("next_page_token not valid yet")
+    return None
+
+
+async def place_details(restaurant: Restaurant) -> Restaurant:
+    """To get additionals informations of a specifict place (restaurant) you have to do a specific api request.
+    Identical requests in flight are coalesced
 
     Args:
         restaurant (schemes.scheme_rest.Restaurant): The Restaurant with the palce_id
@@ -84,28 +367,25 @@ def place_details(restaurant: Restaurant) -> Restaurant:
     Returns:
         schemes.scheme_restRestaurant: The restaurant with all informations filled out if google got some
     """
-    url: str = "https://maps.googleapis.com/maps/api/place/details/json"
-    extended_restaurant: Restaurant = None
-
-    params = {"key": settings.GOOGLE_API_KEY, "place_id": restaurant.place_id}
-    response = httpx.get(url, params=params)
-    logger.debug("Response status: %s", response.status_code)
-    logger.debug("Request url: %s", response.url)
-
-    response.raise_for_status()
-
-    resp_obj = response.json().get("result")
+    resp_obj = await inflight.do(("details", restaurant.place_id), lambda: __place_details__(restaurant.place_id))
     restaurant.homepage = resp_obj.get("website")
     restaurant.maps_url = resp_obj.get("url")
     restaurant.phone_number = resp_obj.get("international_phone_number")
     restaurant.geometry.location.adr = resp_obj.get("formatted_address")
 
-    extended_restaurant = restaurant
+    return restaurant
+
+
+async def __place_details__(place_id: str) -> dict:
+    url: str = "https://maps.googleapis.com/maps/api/place/details/json"
 
-    return extended_restaurant
+    params = {"key": settings.GOOGLE_API_KEY, "place_id": place_id}
+    resp_obj = await __request__("details", url, params)
 
+    return resp_obj.get("result")
 
-def geocode(address: str) -> List[dict]:
+
+async def geocode(address: str) -> List[dict]:
     """This does geocoding (get information based on Streed addres / zipcode / plus code).
 
     Args:
@@ -114,7 +394,10 @@ def geocode(address: str) -> List[dict]:
             Additional address elements such as business names and unit, suite or floor numbers should be avoided.
 
     Raises:
-        schemes.exceptions.GoogleApiException: Raises if no result found for the query
+        schemes.exceptions.NoneExcistingLocationException: Raises if Google found no result for the address
+        schemes.exceptions.GoogleApiException: Raises if the request failed (e.g. REQUEST_DENIED)
+        schemes.exceptions.GoogleApiLimitException: Raises if the rate limit or the daily quota is reached
+        schemes.exceptions.GoogleApiUnavailableException: Raises if the circuit breaker rejects the request
 
     Returns:
         List[dict]: Refer to the See Also
@@ -127,15 +410,12 @@ def geocode(address: str) -> List[dict]:
     address = address.replace(" ", "%20")
     params = {"key": settings.GOOGLE_API_KEY, "address": address}
 
-    response = httpx.get(url, params=params)
-    logger.debug("Response status: %s", response.status_code)
-    logger.debug("Request url: %s", response.url)
-
-    response.raise_for_status()
-
-    resp_obj = response.json().get("results")
+    response = await __request__("geocode", url, params)
+    resp_obj = response.get("results") or []
 
     if len(resp_obj) == 0:
-        raise GoogleApiException(f"No geocode result for query {address}")
+        if response.get("status") in ("OK", "ZERO_RESULTS"):
+            raise NoneExcistingLocationException(f"No geocode result for query {address}")
+        raise GoogleApiException(f"Geocode of {address} failed with status {response.get('status')}")
 
     return resp_obj
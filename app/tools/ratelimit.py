@@ -0,0 +1,134 @@
+"""Client side limits for requests to external APIs"""
+import asyncio
+import datetime
+import threading
+import time
+from typing import Awaitable
+from typing import Callable
+from typing import Union
+
+
+class TokenBucket:
+    """Token bucket rate limiter. Calls that get no token wait in order until a token is free,
+    but only up to max_wait seconds
+
+    Note:
+        The bucket only live in one worker. Every worker got his own tokens
+
+    Args:
+        rate (float): Tokens per second
+        capacity (float): Maximum number of tokens (burst)
+        max_wait (float): Maximum seconds to wait for a token
+        clock (Callable[[], float], optional): Timer in seconds. Defaults to time.monotonic
+        sleep (Callable[[float], Awaitable], optional): Async sleep function. Defaults to asyncio.sleep
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        max_wait: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable] = asyncio.sleep,
+    ):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_wait = max_wait
+        self.rejected = 0
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = capacity
+        self._updated = clock()
+
+    @property
+    def tokens(self) -> float:
+        """Available tokens. Negative if calls are waiting for a token"""
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        return self._tokens
+
+    async def acquire(self) -> bool:
+        """Take one token. Wait if no token is available
+
+        Returns:
+            bool: False if the token would not be available in max_wait seconds
+        """
+        tokens = self.tokens
+        if tokens >= 1:
+            self._tokens -= 1
+            return True
+
+        wait = (1 - tokens) / self.rate
+        if wait > self.max_wait:
+            self.rejected += 1
+            return False
+
+        # Reserve the token so later calls wait behind this one
+        self._tokens -= 1
+        await self._sleep(wait)
+        return True
+
+    def stats(self) -> dict:
+        """Return the state of the bucket
+
+        Returns:
+            dict: rate, capacity, available tokens and rejected calls
+        """
+        return {"rate": self.rate, "capacity": self.capacity, "tokens": self.tokens, "rejected": self.rejected}
+
+
+class QuotaBudget:
+    """Count the used requests of a day and refuse requests if the daily limit is reached
+
+    Args:
+        limit (Union[int, None]): Requests per day. None or 0 means no limit
+        today (Callable[[], datetime.date], optional): Returns the current day. Defaults to the day in UTC
+    """
+
+    def __init__(self, limit: Union[int, None], today: Callable[[], datetime.date] = None):
+        self.limit = limit or None
+        self._today = today or (lambda: datetime.datetime.now(datetime.timezone.utc).date())
+        self._day = self._today()
+        self._used = 0
+        self._lock = threading.Lock()
+
+    @property
+    def used(self) -> int:
+        """Used requests of the current day"""
+        self.__roll_over__()
+        return self._used
+
+    @property
+    def remaining(self) -> Union[int, None]:
+        """Remaining requests of the current day. None if there is no limit"""
+        if self.limit is None:
+            return None
+        return max(self.limit - self.used, 0)
+
+    def consume(self) -> bool:
+        """Use one request of the budget
+
+        Returns:
+            bool: False if the daily limit is reached
+        """
+        with self._lock:
+            self.__roll_over__()
+            if self.limit is not None and self._used >= self.limit:
+                return False
+            self._used += 1
+            return True
+
+    def stats(self) -> dict:
+        """Return the state of the budget
+
+        Returns:
+            dict: limit, used and remaining requests of the day
+        """
+        return {"limit": self.limit, "used": self.used, "remaining": self.remaining}
+
+    def __roll_over__(self) -> None:
+        today = self._today()
+        if today != self._day:
+            self._day = today
+            self._used = 0
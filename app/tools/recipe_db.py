@@ -1,76 +1,88 @@
 """Connection to the recipes"""
-import json
+import math
 from datetime import timedelta
 from pathlib import Path
-from typing import Dict
+from typing import Union
 
-import pandas
+import numpy
+
+from schemes.scheme_recipe import Recipe
+from tools import recipe_store
 
 
 class RecipeDB:
-    """Uses Panda to manage the Recipe DB
+    """Manage the Recipe DB. The recipes are read from the memory mapped columnar store (see `tools.recipe_store`)
+    that is build from the JSON lines if needed. No recipe is loaded as python object until it is needed
 
     Warning:
         Use the `recipe_db` from this module and not your own instance of this class
 
     Args:
         json_path (Path): Path to the recipeitems.json. Defaults to data/recipeitems.json
+        store_path (Path, optional): Directory of the store. Defaults to data/recipeitems.store
     """
 
-    def __init__(self, json_path: Path = Path("data/recipeitems.json")):
-        data = self.__read_data__(json_path)
-        self.pd_frame = self.__convert_rows__(data)
+    def __init__(self, json_path: Path = Path("data/recipeitems.json"), store_path: Path = None):
+        self.store = recipe_store.open_store(json_path, store_path)
 
-    @staticmethod
-    def __read_data__(path: Path) -> Dict:
-        data = []
+    @property
+    def size(self) -> int:
+        """Number of recipes"""
+        return self.store.size
 
-        with open(path, mode="r", encoding="utf-8") as file:
-            for line in file:
-                data.append(json.loads(line))
+    def filter_cooktime(self, total_time: timedelta, rows: numpy.ndarray = None) -> numpy.ndarray:
+        """Filter the recipes for the whole cooktime (cookTime+prepTime).
+        Only the recipes with less-equal time are found. Recipes without a time are never found.
+        The recipes are sorted by the time once in the store, so the filter is a binary search.
+        See `tools.recipe_store.TotalTimeIndex.rows`
 
-        return data
+        Args:
+            total_time (timedelta): Max cooktime
+            rows (numpy.ndarray, optional): Sorted rows (e.g. of `filter_keyword`) the result is restricted to.
+                Defaults to None (all recipes)
 
-    @staticmethod
-    def __convert_rows__(data: Dict) -> pandas.DataFrame:
-        pd_frame = pandas.json_normalize(data)
-        pd_frame.cookTime = pandas.to_timedelta(pd_frame.cookTime, errors="coerce")
-        pd_frame.prepTime = pandas.to_timedelta(pd_frame.prepTime, errors="coerce")
-        return pd_frame
+        Returns:
+            numpy.ndarray: Rows of the recipes. Sorted by the cooktime without rows, sorted by the row with rows
+        """
+        return self.store.cooktime_rows(total_time.total_seconds(), rows)
 
-    @staticmethod
-    def filter_cooktime(user_pd_frame: pandas.DataFrame, total_time: timedelta) -> pandas.DataFrame:
-        """Filter the given DataFrame for the whole cooktime (cookTime+prepTime).
-        Only return the recipes with less-equal time
+    def filter_keyword(self, keyword: str) -> numpy.ndarray:
+        """Find the recipes with all words of the keyword in the columns `name`, `description` or
+        `recipeInstrucions`. The words are not case sensitive and can be a part of a word (e.g. "nudel" finds
+        "Bandnudeln"). Every word is plain text (no regular expression) and can be in any order and column.
+        See `tools.recipe_store.RecipeStore.keyword_rows`
 
         Args:
-            user_pd_frame (pandas.DataFrame): DataFrame to filter
-            total_time (timedelta): Max cooktime
+            keyword (str): The words to find
 
         Returns:
-            pandas.DataFrame: DataFrame of booleans
+            numpy.ndarray: Sorted rows of the recipes. All recipes if the keyword contains no word
         """
-        return (user_pd_frame.cookTime + user_pd_frame.prepTime) <= total_time
+        return self.store.keyword_rows(keyword)
 
-    @staticmethod
-    def filter_keyword(user_pd_frame: pandas.DataFrame, keyword: str) -> pandas.DataFrame:
-        """Filter the given DataFrame if the keyword is one of the columns `name`, `description` or `recipeInstrucions`
+    def get_recipe(self, row: int) -> Recipe:
+        """Load one recipe
 
         Args:
-            user_pd_frame (pandas.DataFrame): DataFrame to filter
-            keyword (str): The keyword to find
+            row (int): Index of the recipe
 
         Returns:
-            pandas.DataFrame: DataFrame of booleans
+            schemes.scheme_recipe.Recipe: The recipe
         """
-        tmp_data = [False for _ in range(user_pd_frame.shape[0])]
-        bool_tmp = pandas.core.series.Series(data=tmp_data)
-
-        for label in ["name", "description", "recipeInstructions"]:
-            colum: pandas.core.series.Series = user_pd_frame[label]
-            bool_tmp |= colum.str.contains(pat=keyword, case=False, na=False, regex=True)
+        texts = self.store.texts
+        return Recipe(
+            id=texts("id")[row],
+            name=texts("name")[row] or "",
+            ingredients=texts("ingredients")[row] or "",
+            url=texts("url")[row] or "",
+            image=texts("image")[row],
+            cookTime=self.__duration__(self.store.times("cookTime")[row]),
+            prepTime=self.__duration__(self.store.times("prepTime")[row]),
+        )
 
-        return bool_tmp
+    @staticmethod
+    def __duration__(seconds: float) -> Union[timedelta, None]:
+        return None if math.isnan(seconds) else timedelta(seconds=float(seconds))
 
 
 recipe_db = RecipeDB()
@@ -0,0 +1,881 @@
+"""Columnar on-disk store of the recipes. The JSON lines are converted once into typed columns,
+after that the recipes are loaded from the columns without parsing any JSON.
+All columns are read-only memory maps, so the workers of gunicorn (`--preload`) share one physical copy"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import re
+import time
+from array import array
+from pathlib import Path
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Union
+
+import numpy
+import pandas
+
+from tools.my_logging import logger
+from tools.my_logging import setup_logging
+
+STORE_VERSION = 5
+"""Version of the file layout. A store with another version is build again"""
+
+TEXT_COLUMNS = ("id", "name", "ingredients", "url", "image", "description", "recipeInstructions")
+"""Text columns of the store. `id` is the `_id.$oid` of the JSON"""
+
+TIME_COLUMNS = ("cookTime", "prepTime")
+"""Durations of the store in seconds. NaN if the duration is missing or invalid"""
+
+SEARCH_COLUMNS = ("name", "description", "recipeInstructions")
+"""Text columns that are searched by a keyword"""
+
+SEARCH_SEPARATOR = "\x00"
+"""Ends every column in the search text. A keyword must not contain it"""
+
+TOKEN_PATTERN = re.compile(r"\w+")
+"""A token of the search text is a sequence of word characters"""
+
+
+class StringColumn:
+    """Text column with deduplicated values. Every row got the index (code) of its value in the table of the
+    unique values. The table is one UTF-8 blob with the start offset of every value. Missing values got the code -1
+
+    Args:
+        codes (numpy.ndarray): Code of every row (int32)
+        offsets (numpy.ndarray): Start offset of every unique value in the blob and the end of the blob (int64)
+        blob (Union[bytes, mmap.mmap]): All unique values UTF-8 encoded
+    """
+
+    def __init__(self, codes: numpy.ndarray, offsets: numpy.ndarray, blob: Union[bytes, mmap.mmap]):
+        self.codes = codes
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, row: int) -> Union[str, None]:
+        code = self.codes[row]
+        return None if code < 0 else self.value(code)
+
+    @property
+    def unique(self) -> int:
+        """Number of unique values"""
+        return len(self.offsets) - 1
+
+    def value(self, code: int) -> str:
+        """Decode one value of the table
+
+        Args:
+            code (int): Index of the value
+
+        Returns:
+            str: The value
+        """
+        return bytes(self.blob[self.offsets[code] : self.offsets[code + 1]]).decode("utf-8")
+
+    def find(self, needle: bytes) -> numpy.ndarray:
+        """Find the unique values that contain the needle. The blob is searched without decoding the values
+
+        Args:
+            needle (bytes): UTF-8 encoded text to find
+
+        Returns:
+            numpy.ndarray: Sorted codes of the values
+        """
+        return __find_values__(self.blob, self.offsets, needle)
+
+    def to_numpy(self, missing=None) -> numpy.ndarray:
+        """Decode all rows. Every unique value is decoded only once
+
+        Args:
+            missing (Any, optional): Value of the missing rows. Defaults to None
+
+        Returns:
+            numpy.ndarray: Object array with the value of every row
+        """
+        table = numpy.empty(self.unique + 1, dtype=object)
+        table[:-1] = [self.value(code) for code in range(self.unique)]
+        table[-1] = missing
+        # Code -1 selects the missing value at the end of the table
+        return table[self.codes]
+
+    @classmethod
+    def from_values(cls, values: Iterable[Union[str, None]]) -> "StringColumn":
+        """Create the column and deduplicate the values
+
+        Args:
+            values (Iterable[Union[str, None]]): Value of every row. None for a missing value
+
+        Returns:
+            StringColumn: The column
+        """
+        table: Dict[str, int] = {}
+        codes = [-1 if value is None else table.setdefault(value, len(table)) for value in values]
+        encoded = [value.encode("utf-8") for value in table]
+        offsets = numpy.zeros(len(encoded) + 1, dtype=numpy.int64)
+        numpy.cumsum([len(value) for value in encoded], out=offsets[1:])
+        return cls(numpy.array(codes, dtype=numpy.int32), offsets, b"".join(encoded))
+
+    def save(self, path: Path, name: str) -> None:
+        """Write the column into the directory
+
+        Args:
+            path (Path): Directory of the store
+            name (str): Name of the column
+        """
+        __save_array__(path / f"{name}.codes.npy", self.codes)
+        __save_array__(path / f"{name}.offsets.npy", self.offsets)
+        __write_file__(path / f"{name}.blob", self.blob)
+
+    @classmethod
+    def load(cls, path: Path, name: str) -> "StringColumn":
+        """Map the column of the directory read-only into the memory
+
+        Args:
+            path (Path): Directory of the store
+            name (str): Name of the column
+
+        Returns:
+            StringColumn: The column
+        """
+        return cls(
+            numpy.load(path / f"{name}.codes.npy", mmap_mode="r"),
+            numpy.load(path / f"{name}.offsets.npy", mmap_mode="r"),
+            __map_file__(path / f"{name}.blob"),
+        )
+
+
+class TokenIndex:
+    """Inverted index of the tokens of the search text. Every token got the sorted rows that contain it (posting list).
+    The tokens are sorted, so a token is found with a binary search in the memory mapped blob
+
+    Args:
+        offsets (numpy.ndarray): Start offset of every token in the blob and the end of the blob (int64)
+        blob (Union[bytes, mmap.mmap]): All tokens UTF-8 encoded and sorted
+        postings (numpy.ndarray): Rows of all tokens, one posting list after another (int32)
+        posting_offsets (numpy.ndarray): Start of the posting list of every token and the end (int64)
+    """
+
+    def __init__(
+        self,
+        offsets: numpy.ndarray,
+        blob: Union[bytes, mmap.mmap],
+        postings: numpy.ndarray,
+        posting_offsets: numpy.ndarray,
+    ):
+        self.offsets = offsets
+        self.blob = blob
+        self.postings = postings
+        self.posting_offsets = posting_offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def token(self, token_id: int) -> bytes:
+        """Return one token
+
+        Args:
+            token_id (int): Index of the token
+
+        Returns:
+            bytes: The UTF-8 encoded token
+        """
+        return bytes(self.blob[self.offsets[token_id] : self.offsets[token_id + 1]])
+
+    def lookup(self, token: str) -> int:
+        """Find the index of a token
+
+        Args:
+            token (str): The lower case token
+
+        Returns:
+            int: Index of the token or -1 if no recipe contains it
+        """
+        needle = token.encode("utf-8")
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self.token(middle) < needle:
+                low = middle + 1
+            else:
+                high = middle
+        return low if low < len(self) and self.token(low) == needle else -1
+
+    def rows(self, token_id: int) -> numpy.ndarray:
+        """Return the posting list of a token
+
+        Args:
+            token_id (int): Index of the token
+
+        Returns:
+            numpy.ndarray: Sorted rows that contain the token
+        """
+        return self.postings[self.posting_offsets[token_id] : self.posting_offsets[token_id + 1]]
+
+    def find(self, needle: bytes) -> numpy.ndarray:
+        """Find the tokens that contain the needle with a scan of the blob. See `TrigramIndex` for long needles
+
+        Args:
+            needle (bytes): UTF-8 encoded lower case text
+
+        Returns:
+            numpy.ndarray: Sorted indexes of the tokens
+        """
+        return __find_values__(self.blob, self.offsets, needle)
+
+    def union(self, token_ids: numpy.ndarray, size: int) -> numpy.ndarray:
+        """Find the rows that contain at least one of the tokens
+
+        Args:
+            token_ids (numpy.ndarray): Indexes of the tokens
+            size (int): Number of rows
+
+        Returns:
+            numpy.ndarray: Sorted rows
+        """
+        token_ids = numpy.asarray(token_ids, dtype=numpy.int64)
+        starts = self.posting_offsets[token_ids]
+        lengths = self.posting_offsets[token_ids + 1] - starts
+        # Positions of all posting lists in one array without a python loop
+        positions = numpy.arange(lengths.sum()) + numpy.repeat(starts - (numpy.cumsum(lengths) - lengths), lengths)
+        rows = self.postings[positions]
+        if len(rows) < size // 8:
+            return numpy.unique(rows)
+        found = numpy.zeros(size, dtype=bool)
+        found[rows] = True
+        return numpy.flatnonzero(found).astype(numpy.int32)
+
+    def search(self, tokens: Iterable[str]) -> numpy.ndarray:
+        """Find the rows that contain all tokens
+
+        Args:
+            tokens (Iterable[str]): Lower case tokens. At least one is needed
+
+        Returns:
+            numpy.ndarray: Sorted rows
+        """
+        token_ids = [self.lookup(token) for token in set(tokens)]
+        if -1 in token_ids:
+            return numpy.empty(0, dtype=numpy.int32)
+        return intersect_sorted([self.rows(token_id) for token_id in token_ids])
+
+    @classmethod
+    def build(cls, texts: Iterable[str]) -> "TokenIndex":
+        """Tokenize the texts and create the posting lists
+
+        Args:
+            texts (Iterable[str]): Lower case search text of every row
+
+        Returns:
+            TokenIndex: The index
+        """
+        vocabulary: Dict[str, int] = {}
+        token_ids = array("i")
+        rows = array("i")
+        for row, text in enumerate(texts):
+            for token in set(tokenize(text)):
+                token_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+                rows.append(row)
+
+        encoded = [token.encode("utf-8") for token in vocabulary]
+        order = sorted(range(len(encoded)), key=encoded.__getitem__)
+        sorted_ids = numpy.empty(len(encoded), dtype=numpy.int64)
+        sorted_ids[order] = numpy.arange(len(encoded))
+        ids = sorted_ids[numpy.frombuffer(token_ids, dtype=numpy.intc)]
+        # The stable sort keeps the rows of every token in ascending order
+        postings = numpy.frombuffer(rows, dtype=numpy.intc)[numpy.argsort(ids, kind="stable")]
+
+        offsets = numpy.zeros(len(encoded) + 1, dtype=numpy.int64)
+        numpy.cumsum([len(encoded[token_id]) for token_id in order], out=offsets[1:])
+        posting_offsets = numpy.zeros(len(encoded) + 1, dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(ids, minlength=len(encoded)), out=posting_offsets[1:])
+        blob = b"".join(encoded[token_id] for token_id in order)
+        return cls(offsets, blob, postings.astype(numpy.int32), posting_offsets)
+
+    def save(self, path: Path, name: str) -> None:
+        """Write the index into the directory
+
+        Args:
+            path (Path): Directory of the store
+            name (str): Name of the index
+        """
+        __save_array__(path / f"{name}.offsets.npy", self.offsets)
+        __write_file__(path / f"{name}.blob", self.blob)
+        __save_array__(path / f"{name}.postings.npy", self.postings)
+        __save_array__(path / f"{name}.posting_offsets.npy", self.posting_offsets)
+
+    @classmethod
+    def load(cls, path: Path, name: str) -> "TokenIndex":
+        """Map the index of the directory read-only into the memory
+
+        Args:
+            path (Path): Directory of the store
+            name (str): Name of the index
+
+        Returns:
+            TokenIndex: The index
+        """
+        return cls(
+            numpy.load(path / f"{name}.offsets.npy", mmap_mode="r"),
+            __map_file__(path / f"{name}.blob"),
+            numpy.load(path / f"{name}.postings.npy", mmap_mode="r"),
+            numpy.load(path / f"{name}.posting_offsets.npy", mmap_mode="r"),
+        )
+
+
+class TrigramIndex:
+    """Index of the byte trigrams of the tokens of a `TokenIndex`. The tokens that contain a text are found without
+    a scan: Only tokens with all trigrams of the text are candidates and only the candidates are checked
+
+    Args:
+        keys (numpy.ndarray): Sorted trigrams as 24 bit numbers (uint32)
+        offsets (numpy.ndarray): Start of the tokens of every trigram and the end (int64)
+        postings (numpy.ndarray): Sorted indexes of the tokens of every trigram, one list after another (int32)
+    """
+
+    def __init__(self, keys: numpy.ndarray, offsets: numpy.ndarray, postings: numpy.ndarray):
+        self.keys = keys
+        self.offsets = offsets
+        self.postings = postings
+
+    def candidates(self, needle: bytes) -> numpy.ndarray:
+        """Find the tokens with all trigrams of the needle. They can contain the trigrams at other positions
+
+        Args:
+            needle (bytes): UTF-8 encoded lower case text with at least 3 bytes
+
+        Returns:
+            numpy.ndarray: Sorted indexes of the tokens
+        """
+        lists = []
+        for key in trigrams(needle):
+            position = int(numpy.searchsorted(self.keys, key))
+            if position == len(self.keys) or self.keys[position] != key:
+                return numpy.empty(0, dtype=numpy.int32)
+            lists.append(self.postings[self.offsets[position] : self.offsets[position + 1]])
+        return intersect_sorted(lists)
+
+    @classmethod
+    def build(cls, tokens: TokenIndex) -> "TrigramIndex":
+        """Create the index of all tokens
+
+        Args:
+            tokens (TokenIndex): The tokens
+
+        Returns:
+            TrigramIndex: The index
+        """
+        keys = array("I")
+        token_ids = array("i")
+        for token_id in range(len(tokens)):
+            token_keys = trigrams(tokens.token(token_id))
+            keys.extend(token_keys)
+            token_ids.extend([token_id] * len(token_keys))
+
+        keys = numpy.frombuffer(keys, dtype=numpy.uintc)
+        order = numpy.argsort(keys, kind="stable")
+        unique_keys, counts = numpy.unique(keys[order], return_counts=True)
+        offsets = numpy.zeros(len(unique_keys) + 1, dtype=numpy.int64)
+        numpy.cumsum(counts, out=offsets[1:])
+        postings = numpy.frombuffer(token_ids, dtype=numpy.intc)[order]
+        return cls(unique_keys.astype(numpy.uint32), offsets, postings.astype(numpy.int32))
+
+    def save(self, path: Path, name: str) -> None:
+        """Write the index into the directory
+
+        Args:
+            path (Path): Directory of the store
+            name (str): Name of the index
+        """
+        __save_array__(path / f"{name}.keys.npy", self.keys)
+        __save_array__(path / f"{name}.offsets.npy", self.offsets)
+        __save_array__(path / f"{name}.postings.npy", self.postings)
+
+    @classmethod
+    def load(cls, path: Path, name: str) -> "TrigramIndex":
+        """Map the index of the directory read-only into the memory
+
+        Args:
+            path (Path): Directory of the store
+            name (str): Name of the index
+
+        Returns:
+            TrigramIndex: The index
+        """
+        return cls(
+            numpy.load(path / f"{name}.keys.npy", mmap_mode="r"),
+            numpy.load(path / f"{name}.offsets.npy", mmap_mode="r"),
+            numpy.load(path / f"{name}.postings.npy", mmap_mode="r"),
+        )
+
+
+class TotalTimeIndex:
+    """Total time (cookTime+prepTime) of the recipes in whole seconds. The rows with a time are sorted by the
+    time, so all recipes up to a time are a contiguous range of the order that is found by a binary search.
+    Recipes without a time are not part of the order
+
+    Args:
+        seconds (numpy.ndarray): Total time of every row (int64, `MISSING` if a duration is missing)
+        order (numpy.ndarray): Rows with a time sorted by the time (int32)
+        sorted_seconds (numpy.ndarray): Time of the rows of the order (int64)
+    """
+
+    MISSING = numpy.iinfo(numpy.int64).max
+    """Time of the rows without a total time. It is greater than every limit"""
+
+    def __init__(self, seconds: numpy.ndarray, order: numpy.ndarray, sorted_seconds: numpy.ndarray):
+        self.seconds = seconds
+        self.order = order
+        self.sorted_seconds = sorted_seconds
+
+    def __len__(self) -> int:
+        return len(self.seconds)
+
+    def count(self, limit: float) -> int:
+        """Count the recipes with a total time less-equal the limit
+
+        Args:
+            limit (float): Max total time in seconds
+
+        Returns:
+            int: Length of the range of the order
+        """
+        return int(numpy.searchsorted(self.sorted_seconds, limit, side="right"))
+
+    def rows(self, limit: float, rows: numpy.ndarray = None) -> numpy.ndarray:
+        """Find the recipes with a total time less-equal the limit. Together with other rows the smaller side is
+        checked against the bigger one, so no array with the length of all recipes is created
+
+        Args:
+            limit (float): Max total time in seconds
+            rows (numpy.ndarray, optional): Sorted rows (e.g. of a keyword) the result is restricted to.
+                Defaults to None (all recipes)
+
+        Returns:
+            numpy.ndarray: Without rows the range of the order (sorted by the time). With rows the sorted rows
+            that are in time
+        """
+        end = self.count(limit)
+        if rows is None:
+            return self.order[:end]
+        if len(rows) <= end:
+            return rows[self.seconds[rows] <= limit]
+        # Fewer recipes in time than rows: look up the range in the sorted rows and sort only the found ones
+        in_time = self.order[:end]
+        positions = numpy.searchsorted(rows, in_time)
+        found = positions < len(rows)
+        found[found] = rows[positions[found]] == in_time[found]
+        return numpy.sort(in_time[found])
+
+    @classmethod
+    def build(cls, cook_seconds: numpy.ndarray, prep_seconds: numpy.ndarray) -> "TotalTimeIndex":
+        """Build the index from the durations
+
+        Args:
+            cook_seconds (numpy.ndarray): cookTime of every row (float64, NaN if missing)
+            prep_seconds (numpy.ndarray): prepTime of every row (float64, NaN if missing)
+
+        Returns:
+            TotalTimeIndex: The index
+        """
+        total = cook_seconds + prep_seconds
+        found = numpy.isfinite(total)
+        seconds = numpy.full(len(total), cls.MISSING, dtype=numpy.int64)
+        seconds[found] = numpy.rint(total[found])
+        order = numpy.argsort(seconds, kind="stable")[: numpy.count_nonzero(found)].astype(numpy.int32)
+        return cls(seconds, order, seconds[order])
+
+    def save(self, path: Path, name: str) -> None:
+        """Write the index into the directory
+
+        Args:
+            path (Path): Directory of the store
+            name (str): Name of the index
+        """
+        __save_array__(path / f"{name}.npy", self.seconds)
+        __save_array__(path / f"{name}.order.npy", self.order)
+        __save_array__(path / f"{name}.sorted.npy", self.sorted_seconds)
+
+    @classmethod
+    def load(cls, path: Path, name: str) -> "TotalTimeIndex":
+        """Map the index of the directory read-only into the memory
+
+        Args:
+            path (Path): Directory of the store
+            name (str): Name of the index
+
+        Returns:
+            TotalTimeIndex: The index
+        """
+        return cls(
+            numpy.load(path / f"{name}.npy", mmap_mode="r"),
+            numpy.load(path / f"{name}.order.npy", mmap_mode="r"),
+            numpy.load(path / f"{name}.sorted.npy", mmap_mode="r"),
+        )
+
+
+class RecipeStore:
+    """Columns of all recipes. Use `open_store` to get an up-to-date store
+
+    Args:
+        path (Path): Directory of the store
+        meta (dict): Content of the meta.json of the store
+
+    Attributes:
+        size (int): Number of recipes
+        search (StringColumn): Lower case text of the `SEARCH_COLUMNS` of every recipe.
+            Every column ends with the `SEARCH_SEPARATOR`
+        tokens (TokenIndex): Inverted index of the tokens of the search text
+        trigrams (TrigramIndex): Trigrams of the tokens to find parts of words
+        total_time (TotalTimeIndex): Recipes sorted by the total time
+    """
+
+    def __init__(self, path: Path, meta: dict):
+        self.path = path
+        self.meta = meta
+        self.size: int = meta["rows"]
+        self.search = StringColumn.load(path, "search")
+        self.tokens = TokenIndex.load(path, "tokens")
+        self.trigrams = TrigramIndex.load(path, "trigrams")
+        self.total_time = TotalTimeIndex.load(path, "total_time")
+        self._times = {column: numpy.load(path / f"{column}.npy", mmap_mode="r") for column in TIME_COLUMNS}
+        self._texts = {column: StringColumn.load(path, column) for column in TEXT_COLUMNS}
+
+    def keyword_rows(self, keyword: str) -> numpy.ndarray:
+        """Find the recipes that contain every word (separated by whitespace) of the keyword as part of the search
+        text (e.g. "nudel" finds "Bandnudeln"). The words are not case sensitive and matched as plain text.
+        The candidates of a word come from the indexes, only words with other characters than word characters
+        (e.g. "t-bone") are checked against the search text
+
+        Args:
+            keyword (str): The words to find
+
+        Returns:
+            numpy.ndarray: Sorted rows. All rows if the keyword contains no word
+        """
+        words = set(keyword.replace(SEARCH_SEPARATOR, " ").lower().split())
+        if not words:
+            return numpy.arange(self.size, dtype=numpy.int32)
+        return intersect_sorted([self.__word_rows__(word) for word in words])
+
+    def __word_rows__(self, word: str) -> numpy.ndarray:
+        needle = word.encode("utf-8")
+        pieces = tokenize(word)
+        if not pieces:
+            return self.__scan__(needle)
+
+        if pieces == [word]:
+            # A word without other characters is always part of one token, the tokens are the exact result
+            return self.tokens.union(self.__tokens_with__(word), self.size)
+
+        # Every piece is part of a token of the recipe. Short pieces would match too many tokens
+        pieces = [piece for piece in set(pieces) if len(piece.encode("utf-8")) >= 3] or pieces[:1]
+        rows = intersect_sorted([self.tokens.union(self.__tokens_with__(piece), self.size) for piece in pieces])
+        return self.__verify__(rows, needle)
+
+    def __tokens_with__(self, piece: str) -> numpy.ndarray:
+        needle = piece.encode("utf-8")
+        if len(needle) < 3:
+            return self.tokens.find(needle)
+        candidates = self.trigrams.candidates(needle)
+        if len(needle) == 3:
+            return candidates
+        return numpy.array(
+            [token_id for token_id in candidates.tolist() if needle in self.tokens.token(token_id)], dtype=numpy.int64
+        )
+
+    def __verify__(self, rows: numpy.ndarray, needle: bytes) -> numpy.ndarray:
+        codes = self.search.codes[rows]
+        starts = self.search.offsets[codes].tolist()
+        ends = self.search.offsets[codes + 1].tolist()
+        found = [self.search.blob.find(needle, start, end) >= 0 for start, end in zip(starts, ends)]
+        return rows[numpy.array(found, dtype=bool)]
+
+    def __scan__(self, needle: bytes) -> numpy.ndarray:
+        found = numpy.zeros(self.search.unique, dtype=bool)
+        found[self.search.find(needle)] = True
+        return numpy.flatnonzero(found[self.search.codes]).astype(numpy.int32)
+
+    def cooktime_rows(self, seconds: float, rows: numpy.ndarray = None) -> numpy.ndarray:
+        """Find the recipes with a total time (cookTime+prepTime) less-equal the seconds.
+        Recipes without a time are never found. See `TotalTimeIndex.rows`
+
+        Args:
+            seconds (float): Max total time
+            rows (numpy.ndarray, optional): Sorted rows the result is restricted to. Defaults to None (all recipes)
+
+        Returns:
+            numpy.ndarray: Without rows the recipes sorted by the time, with rows the sorted rows in time
+        """
+        return self.total_time.rows(seconds, rows)
+
+    def times(self, column: str) -> numpy.ndarray:
+        """Return a duration column
+
+        Args:
+            column (str): One of `TIME_COLUMNS`
+
+        Returns:
+            numpy.ndarray: Seconds of every recipe (float64, NaN if missing)
+        """
+        return self._times[column]
+
+    def texts(self, column: str) -> StringColumn:
+        """Return a text column
+
+        Args:
+            column (str): One of `TEXT_COLUMNS`
+
+        Returns:
+            StringColumn: The column
+        """
+        return self._texts[column]
+
+
+def default_store_path(json_path: Path) -> Path:
+    """Return the directory of the store that belongs to the JSON file (`recipeitems.json` -> `recipeitems.store`)
+
+    Args:
+        json_path (Path): Path to the JSON lines
+
+    Returns:
+        Path: Directory of the store
+    """
+    return json_path.with_suffix(".store")
+
+
+def file_checksum(path: Path) -> str:
+    """Calculate the sha256 of a file
+
+    Args:
+        path (Path): The file
+
+    Returns:
+        str: Hex digest of the file
+    """
+    sha = hashlib.sha256()
+    with open(path, mode="rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def open_store(json_path: Path, store_path: Path = None) -> RecipeStore:
+    """Load the store of the JSON file. The store is build if it does not exist or the checksum of the JSON file
+    has changed. The checksum is only calculated if the size or modification time of the file has changed
+
+    Args:
+        json_path (Path): Path to the JSON lines
+        store_path (Path, optional): Directory of the store. Defaults to `default_store_path`
+
+    Returns:
+        RecipeStore: The loaded store
+    """
+    store_path = store_path or default_store_path(json_path)
+    meta = __read_meta__(store_path)
+    if meta is not None and meta.get("version") == STORE_VERSION:
+        if not json_path.exists():
+            logger.warning("Recipe source is missing... use the store %s", store_path)
+            return RecipeStore(store_path, meta)
+
+        stat = json_path.stat()
+        source = meta["source"]
+        if source["size"] == stat.st_size and source["mtime_ns"] == stat.st_mtime_ns:
+            return RecipeStore(store_path, meta)
+        if source["size"] == stat.st_size and source["sha256"] == file_checksum(json_path):
+            # Same content with a new modification time (e.g. a new checkout)
+            source["mtime_ns"] = stat.st_mtime_ns
+            __write_meta__(store_path, meta)
+            return RecipeStore(store_path, meta)
+
+    return build_store(json_path, store_path)
+
+
+def build_store(json_path: Path, store_path: Path = None) -> RecipeStore:
+    """Convert the JSON lines into the columns of the store. An existing store is replaced
+
+    Args:
+        json_path (Path): Path to the JSON lines
+        store_path (Path, optional): Directory of the store. Defaults to `default_store_path`
+
+    Returns:
+        RecipeStore: The new store
+    """
+    store_path = store_path or default_store_path(json_path)
+    start = time.monotonic()
+    stat = json_path.stat()
+    sha = hashlib.sha256()
+    texts: Dict[str, List[Union[str, None]]] = {column: [] for column in TEXT_COLUMNS}
+    durations: Dict[str, List[Union[str, None]]] = {column: [] for column in TIME_COLUMNS}
+
+    with open(json_path, mode="rb") as file:
+        for line in file:
+            sha.update(line)
+            if not line.strip():
+                continue
+            row: dict = json.loads(line)
+            row_id = row.get("_id")
+            texts["id"].append(__text__(row_id.get("$oid") if isinstance(row_id, dict) else row_id))
+            for column in TEXT_COLUMNS[1:]:
+                texts[column].append(__text__(row.get(column)))
+            for column in TIME_COLUMNS:
+                durations[column].append(__text__(row.get(column)))
+
+    store_path.mkdir(parents=True, exist_ok=True)
+    (store_path / "meta.json").unlink(missing_ok=True)
+    for column in TEXT_COLUMNS:
+        StringColumn.from_values(texts[column]).save(store_path, column)
+    search = [search_text(row, texts) for row in range(len(texts["id"]))]
+    StringColumn.from_values(search).save(store_path, "search")
+    tokens = TokenIndex.build(search)
+    tokens.save(store_path, "tokens")
+    TrigramIndex.build(tokens).save(store_path, "trigrams")
+    times = {}
+    for column in TIME_COLUMNS:
+        seconds = pandas.to_timedelta(pandas.Series(durations[column], dtype=object), errors="coerce")
+        times[column] = seconds.dt.total_seconds().to_numpy(dtype=numpy.float64)
+        __save_array__(store_path / f"{column}.npy", times[column])
+    TotalTimeIndex.build(times["cookTime"], times["prepTime"]).save(store_path, "total_time")
+
+    meta = {
+        "version": STORE_VERSION,
+        "rows": len(texts["id"]),
+        "source": {"sha256": sha.hexdigest(), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns},
+    }
+    # The meta.json is written last. A store without it is incomplete and will be build again
+    __write_meta__(store_path, meta)
+    logger.info(
+        "Build recipe store... rows:%s path:%s seconds:%.1f", meta["rows"], store_path, time.monotonic() - start
+    )
+    return RecipeStore(store_path, meta)
+
+
+def tokenize(text: str) -> List[str]:
+    """Split a text into lower case tokens
+
+    Args:
+        text (str): The text
+
+    Returns:
+        List[str]: The tokens in the order of the text
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def trigrams(text: bytes) -> List[int]:
+    """Return the different byte trigrams of a text as 24 bit numbers
+
+    Args:
+        text (bytes): The UTF-8 encoded text
+
+    Returns:
+        List[int]: The trigrams. Empty if the text is shorter than 3 bytes
+    """
+    return list({text[index] << 16 | text[index + 1] << 8 | text[index + 2] for index in range(len(text) - 2)})
+
+
+def intersect_sorted(arrays: List[numpy.ndarray]) -> numpy.ndarray:
+    """Intersect sorted arrays without duplicates. The shortest array is checked against the others,
+    so the costs depend on the shortest array
+
+    Args:
+        arrays (List[numpy.ndarray]): At least one sorted array
+
+    Returns:
+        numpy.ndarray: Sorted values that are in all arrays
+    """
+    arrays = sorted(arrays, key=len)
+    result = numpy.asarray(arrays[0])
+    for other in arrays[1:]:
+        if len(result) == 0:
+            break
+        positions = numpy.searchsorted(other, result)
+        found = positions < len(other)
+        found[found] = other[positions[found]] == result[found]
+        result = result[found]
+    return result
+
+
+def search_text(row: int, texts: Dict[str, List[Union[str, None]]]) -> str:
+    """Create the search text of one recipe
+
+    Args:
+        row (int): Index of the recipe
+        texts (Dict[str, List[Union[str, None]]]): Values of the text columns
+
+    Returns:
+        str: The lower case columns, every column ends with the `SEARCH_SEPARATOR`
+    """
+    return "".join(
+        (texts[column][row] or "").replace(SEARCH_SEPARATOR, " ").lower() + SEARCH_SEPARATOR
+        for column in SEARCH_COLUMNS
+    )
+
+
+def __find_values__(blob: Union[bytes, mmap.mmap], offsets: numpy.ndarray, needle: bytes) -> numpy.ndarray:
+    found = []
+    pos = blob.find(needle)
+    while pos >= 0:
+        value = int(numpy.searchsorted(offsets, pos, side="right")) - 1
+        end = int(offsets[value + 1])
+        # A match that reaches into the next value does not count
+        if pos + len(needle) <= end:
+            found.append(value)
+        pos = blob.find(needle, end)
+    return numpy.array(found, dtype=numpy.int32)
+
+
+def __map_file__(path: Path) -> Union[bytes, mmap.mmap]:
+    with open(path, mode="rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            # Empty files can not be mapped
+            return b""
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def __text__(value) -> Union[str, None]:
+    return value if isinstance(value, str) else None
+
+
+def __read_meta__(store_path: Path) -> Union[dict, None]:
+    try:
+        with open(store_path / "meta.json", mode="r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def __write_meta__(store_path: Path, meta: dict) -> None:
+    __write_file__(store_path / "meta.json", json.dumps(meta, indent=2).encode("utf-8"))
+
+
+def __save_array__(path: Path, array: numpy.ndarray) -> None:
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, mode="wb") as file:
+        numpy.save(file, array, allow_pickle=False)
+    os.replace(tmp_path, path)
+
+
+def __write_file__(path: Path, content: bytes) -> None:
+    # Write into a temporary file and replace the old one, so no reader sees a half written file
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_bytes(content)
+    os.replace(tmp_path, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the columnar store of the recipes")
+    parser.add_argument("json_path", nargs="?", type=Path, default=Path("data/recipeitems.json"))
+    parser.add_argument("--store", type=Path, default=None, help="Directory of the store")
+    parser.add_argument("--force", action="store_true", help="Build the store even if it is up to date")
+    args = parser.parse_args()
+    setup_logging()
+    if args.force:
+        build_store(args.json_path, args.store)
+    else:
+        open_store(args.json_path, args.store)
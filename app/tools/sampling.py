@@ -0,0 +1,109 @@
+"""Random selection with weights"""
+import math
+import random
+from typing import Iterable
+from typing import List
+from typing import Sequence
+from typing import Union
+
+
+class WeightedSampler:
+    """Draw indexes with a probability proportional to their weight. The alias table (Vose's alias method)
+    is build once in O(n), after that every draw is O(1). If all weights are 0 every index got the same probability
+
+    Args:
+        weights (Sequence[float]): Weight (>= 0) of every index
+        seed (Union[int, None], optional): Seed for reproducible draws. Defaults to None
+        rng (random.Random, optional): Random generator to use instead of a new one with the seed. Defaults to None
+
+    Raises:
+        ValueError: If a weight is negative or not a number
+    """
+
+    MAX_REJECTIONS = 32
+    """Rejected draws of `sample_distinct` in a row before the table is build again for the remaining indexes"""
+
+    def __init__(self, weights: Sequence[float], seed: Union[int, None] = None, rng: random.Random = None):
+        if any(math.isnan(weight) or weight < 0 for weight in weights):
+            raise ValueError("Weights have to be numbers >= 0")
+        self.weights = list(weights)
+        self._rng = rng or random.Random(seed)
+        self._uniform = sum(self.weights) <= 0
+        self._prob, self._alias = ([], []) if self._uniform else self.__alias_table__(self.weights)
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    def sample(self) -> int:
+        """Draw one index
+
+        Raises:
+            ValueError: If there are no weights
+
+        Returns:
+            int: The drawn index
+        """
+        if not self.weights:
+            raise ValueError("Can not sample from an empty sequence")
+        index = self._rng.randrange(len(self.weights))
+        if self._uniform or self._rng.random() < self._prob[index]:
+            return index
+        return self._alias[index]
+
+    def sample_distinct(self, k: int, exclude: Iterable[int] = ()) -> List[int]:
+        """Draw k different indexes. Every draw has the probability of the weights of the remaining indexes.
+        Indexes with the weight 0 are only drawn if all other indexes are drawn
+
+        Args:
+            k (int): Number of indexes. If it is greater than the number of remaining indexes all are drawn
+            exclude (Iterable[int], optional): Indexes that are not drawn (e.g. already shown). Defaults to ()
+
+        Returns:
+            List[int]: The drawn indexes in the order of the draws
+        """
+        seen = {index for index in exclude if 0 <= index < len(self.weights)}
+        k = min(k, len(self.weights) - len(seen))
+        if self._uniform:
+            remaining = [index for index in range(len(self.weights)) if index not in seen]
+            return self._rng.sample(remaining, k)
+
+        drawn: List[int] = []
+        positive = sum(1 for index, weight in enumerate(self.weights) if weight > 0 and index not in seen)
+        rejections = 0
+        while len(drawn) < min(k, positive):
+            index = self.sample()
+            if index not in seen:
+                seen.add(index)
+                drawn.append(index)
+                rejections = 0
+                continue
+            rejections += 1
+            if rejections >= self.MAX_REJECTIONS:
+                # The drawn indexes got most of the weight. Draw the rest from a table without them
+                remaining = [index for index in range(len(self.weights)) if index not in seen]
+                sampler = WeightedSampler([self.weights[index] for index in remaining], rng=self._rng)
+                return drawn + [remaining[index] for index in sampler.sample_distinct(k - len(drawn))]
+
+        if len(drawn) < k:
+            zeros = [index for index, weight in enumerate(self.weights) if weight == 0 and index not in seen]
+            drawn.extend(self._rng.sample(zeros, k - len(drawn)))
+        return drawn
+
+    @staticmethod
+    def __alias_table__(weights: List[float]) -> tuple:
+        count = len(weights)
+        total = sum(weights)
+        prob = [weight * count / total for weight in weights]
+        alias = list(range(count))
+        small = [index for index, value in enumerate(prob) if value < 1]
+        large = [index for index, value in enumerate(prob) if value >= 1]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            alias[less] = more
+            prob[more] = prob[more] + prob[less] - 1
+            (small if prob[more] < 1 else large).append(more)
+        # Rounding errors leave values close to 1
+        for index in small + large:
+            prob[index] = 1
+        return prob, alias
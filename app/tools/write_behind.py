@@ -0,0 +1,149 @@
+"""Write changes to the DB in the background after the response"""
+import asyncio
+from collections import OrderedDict
+from typing import Any
+from typing import Callable
+from typing import Hashable
+from typing import List
+from typing import Tuple
+from typing import Union
+
+from sqlalchemy.orm import Session
+
+from db.database import SessionLocal
+from tools.config import settings
+from tools.my_logging import logger
+
+WriteJob = Callable[[Session], Any]
+"""Write to the DB with the given session. The job has to commit by itself"""
+
+
+class WriteBehindQueue:
+    """Bounded queue for writes that do not need to finish before the response. A worker applies the jobs in
+    batches with one session per batch in a thread. Jobs with the same key are coalesced (last write wins).
+    If the worker is not running or the queue is full, the job runs immediately with the session of the caller
+
+    Note:
+        The queue only live in one worker. Pending jobs are lost if the worker got killed
+
+    Args:
+        maxsize (int): Maximum number of pending jobs. 0 runs all jobs immediately
+        batch_size (int): Maximum number of jobs that share one session
+        session_factory (Callable[[], Session], optional): Creates the sessions of the batches.
+            Defaults to SessionLocal
+
+    Attributes:
+        coalesced (int): Number of jobs that replaced a pending job with the same key
+        applied (int): Number of jobs the worker applied
+        failed (int): Number of jobs of the worker that raised an exception or whose batch failed
+            (e.g. the DB was not reachable)
+    """
+
+    def __init__(self, maxsize: int, batch_size: int, session_factory: Callable[[], Session] = SessionLocal):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.coalesced = 0
+        self.applied = 0
+        self.failed = 0
+        self._session_factory = session_factory
+        self._pending: "OrderedDict[Hashable, WriteJob]" = OrderedDict()
+        self._event: Union[asyncio.Event, None] = None
+        self._task: Union[asyncio.Future, None] = None
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        """True if the worker is running"""
+        return self._task is not None and not self._task.done() and not self._stopping
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def enqueue(self, db_session: Session, job: WriteJob, key: Hashable = None) -> None:
+        """Add a job to the queue
+
+        Args:
+            db_session (sqlalchemy.orm.Session): Session of the caller for an immediate run
+            job (WriteJob): The write to the DB
+            key (Hashable, optional): Pending jobs with the same key got replaced. Defaults to None (no coalescing)
+        """
+        key = object() if key is None else key
+        if not self.running or self.maxsize <= 0:
+            job(db_session)
+            return
+        if key in self._pending:
+            self._pending[key] = job
+            self.coalesced += 1
+            return
+        if len(self._pending) >= self.maxsize:
+            logger.warning("Write queue is full... run the write immediately. size:%s", len(self._pending))
+            job(db_session)
+            return
+
+        self._pending[key] = job
+        self._event.set()
+
+    def start(self) -> None:
+        """Start the worker. Called on the startup of the application"""
+        if self._task is not None:
+            return
+        self._stopping = False
+        self._event = asyncio.Event()
+        self._task = asyncio.ensure_future(self.__run__())
+        logger.info("Started write queue... maxsize:%s", self.maxsize)
+
+    async def stop(self) -> None:
+        """Apply all pending jobs and stop the worker. Called on the shutdown of the application"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._event.set()
+        await self._task
+        self._task = None
+        logger.info("Stopped write queue... applied:%s failed:%s", self.applied, self.failed)
+
+    def stats(self) -> dict:
+        """Return the state of the queue for the monitoring
+
+        Returns:
+            dict: depth (pending jobs), maxsize, running and the counters
+        """
+        return {
+            "depth": len(self._pending),
+            "maxsize": self.maxsize,
+            "running": self.running,
+            "coalesced": self.coalesced,
+            "applied": self.applied,
+            "failed": self.failed,
+        }
+
+    async def __run__(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._event.wait()
+            self._event.clear()
+            while self._pending:
+                batch = [self._pending.popitem(last=False) for _ in range(min(self.batch_size, len(self._pending)))]
+                try:
+                    await loop.run_in_executor(None, self.__apply__, batch)
+                except Exception:
+                    # E.g. no session or no rollback possible. The worker must keep running for the next jobs
+                    logger.exception("Batch of the write queue failed... jobs:%s", len(batch))
+                    self.failed += len(batch)
+            if self._stopping:
+                return
+
+    def __apply__(self, batch: List[Tuple[Hashable, WriteJob]]) -> None:
+        with self._session_factory() as session:
+            for _, job in batch:
+                try:
+                    job(session)
+                    self.applied += 1
+                except Exception:
+                    logger.exception("Write of the write queue failed")
+                    session.rollback()
+                    self.failed += 1
+
+
+write_queue = WriteBehindQueue(maxsize=settings.WRITE_QUEUE_SIZE, batch_size=settings.WRITE_QUEUE_BATCH_SIZE)
+"""Write queue of this worker"""
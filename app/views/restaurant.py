@@ -16,6 +16,7 @@ from schemes import scheme_rest
 from schemes.scheme_user import User
 from services import service_res
 from tools.security import get_current_user
+from tools.write_behind import write_queue
 
 
 templates = Jinja2Templates("templates")
@@ -33,10 +34,11 @@ async def findrestaurant(
     manuell_location: str,
     cuisine: Union[str, None] = None,
     allergies: Union[str, None] = None,
+    count: int = 1,
     db_session: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Requests user settings and search for restaurant.
+    """Requests user settings and search for restaurants.
 
     Args:
         request (Request): the http request
@@ -48,6 +50,7 @@ async def findrestaurant(
         manuell_location(str): manuell location for the search
         cuisine (Union[str, None], optional): the selected cuisines. Defaults to None.
         allergies (Union[str, None], optional): the selected allergies. Defaults to None.
+        count (int, optional): number of suggested restaurants. Defaults to 1.
         db_session (Session, optional): the db session. Defaults to Depends(get_db).
         current_user (User, optional): the current user. Defaults to Depends(get_current_user).
 
@@ -57,7 +60,7 @@ async def findrestaurant(
     """
 
     if lat == "" or lng == "":
-        location = service_res.get_coordinates_from_location(manuell_location)
+        location = await service_res.get_coordinates_from_location(db_session, manuell_location)
     else:
         location = scheme_rest.LocationBase(lat=lat, lng=lng)
 
@@ -85,8 +88,42 @@ async def findrestaurant(
         radius=rest_filter.radius,
         manuell_location=manuell_location,
     )
-    service_res.update_rest_filter(db_session=db_session, filter_updated=rest_filter_db, user=current_user)
-    restaurant = service_res.search_for_restaurant(db_session=db_session, user=current_user, user_f=rest_filter)
+    # Only the last filter of the user is saved if the updates pile up
+    write_queue.enqueue(
+        db_session,
+        lambda session: service_res.update_rest_filter(
+            db_session=session, filter_updated=rest_filter_db, user=current_user
+        ),
+        key=("filter", current_user.email),
+    )
+    restaurants = await service_res.search_for_restaurants(
+        db_session=db_session, user=current_user, user_f=rest_filter, count=count
+    )
+    return templates.TemplateResponse(
+        "restaurant/restaurant_result.html", {"request": request, "restaurants": restaurants}
+    )
+
+
+@router.get("/rerollrestaurant", response_class=HTMLResponse)
+async def rerollrestaurant(
+    request: Request,
+    count: int = 1,
+    db_session: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Choose other restaurants of the last search without searching again.
+
+    Args:
+        request (Request): the http request
+        count (int, optional): number of suggested restaurants. Defaults to 1.
+        db_session (Session, optional): the db session. Defaults to Depends(get_db).
+        current_user (User, optional): the current user. Defaults to Depends(get_current_user).
+
+    Returns:
+        RedirectResponse: redirect to /error...
+        TemplateResponse: the http response
+    """
+    restaurants = await service_res.reroll_restaurants(db_session=db_session, user=current_user, count=count)
     return templates.TemplateResponse(
-        "restaurant/restaurant_result.html", {"request": request, "restaurant": restaurant}
+        "restaurant/restaurant_result.html", {"request": request, "restaurants": restaurants}
     )
@@ -0,0 +1,36 @@
+"""Router for the monitoring of the Website. Only for logged in users"""
+import fastapi
+from fastapi import Depends
+
+from schemes.scheme_user import UserLogin
+from tools import gapi
+from tools.security import get_current_user
+from tools.write_behind import write_queue
+
+router = fastapi.APIRouter()
+
+
+@router.get("/status/google")
+def google_status(current_user: UserLogin = Depends(get_current_user)) -> dict:
+    """Return the state of the connection to the Google API (circuit breaker, quota, rate limits and caches)
+
+    Args:
+        current_user (UserLogin, optional): the current user logged in. Defaults to Depends(get_current_user).
+
+    Returns:
+        dict: See `tools.gapi.stats`
+    """
+    return gapi.stats()
+
+
+@router.get("/status/writes")
+def write_queue_status(current_user: UserLogin = Depends(get_current_user)) -> dict:
+    """Return the state of the write queue (depth and counters)
+
+    Args:
+        current_user (UserLogin, optional): the current user logged in. Defaults to Depends(get_current_user).
+
+    Returns:
+        dict: See `tools.write_behind.WriteBehindQueue.stats`
+    """
+    return write_queue.stats()